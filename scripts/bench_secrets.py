@@ -0,0 +1,108 @@
+"""Secret detection throughput benchmark.
+
+Compares the SecretEngine (keyword prefilter + per-line regexes) with the old
+single assignment regex, and with running every pattern regex over the whole
+text, which is what adding vendor patterns to the old ``finditer`` loop would cost.
+
+    python scripts/bench_secrets.py --size-mb 4 --extra-patterns 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import string
+import time
+
+from terraform_guardrail.scanner.rules import (
+    BUILTIN_SECRET_PATTERNS,
+    SENSITIVE_ASSIGN_RE,
+    SecretEngine,
+    SecretPattern,
+)
+
+
+def synthetic_hcl(size_bytes: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    words = ["bucket", "subnet_id", "instance_type", "tags", "region", "name", "cidr_blocks"]
+    lines: list[str] = []
+    total = 0
+    idx = 0
+    while total < size_bytes:
+        if idx % 25 == 0:
+            line = f'resource "aws_s3_bucket" "b{idx}" {{'
+        elif idx % 25 == 24:
+            line = "}"
+        elif idx % 997 == 0:
+            line = f'  token = "{"".join(rng.choices(string.ascii_letters, k=24))}"'
+        elif idx % 1499 == 0:
+            key = "AKIA" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=16))
+            line = f'  access_key_id = "{key}"'
+        else:
+            value = "".join(rng.choices(string.ascii_lowercase + "-", k=rng.randint(8, 40)))
+            line = f'  {rng.choice(words)} = "{value}"'
+        lines.append(line)
+        total += len(line) + 1
+        idx += 1
+    return "\n".join(lines) + "\n"
+
+
+def vendor_like_patterns(count: int) -> list[SecretPattern]:
+    patterns = []
+    for idx in range(count):
+        prefix = f"v{idx:03d}tk_"
+        patterns.append(
+            SecretPattern(
+                pattern_id=f"vendor-{idx}",
+                regex=re.compile(rf"\b{prefix}[A-Za-z0-9]{{32}}\b"),
+                keywords=(prefix,),
+                description=f"Vendor {idx} token",
+            )
+        )
+    return patterns
+
+
+def bench(label: str, func, text: str, repeat: int) -> None:
+    best = float("inf")
+    hits = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = func(text)
+        best = min(best, time.perf_counter() - start)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"{label:<28} {mb / best:8.1f} MB/s  ({hits} matches, {best * 1000:.1f} ms)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--extra-patterns", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip-naive", action="store_true", help="Skip the slow per-pattern baseline"
+    )
+    args = parser.parse_args()
+
+    text = synthetic_hcl(int(args.size_mb * 1024 * 1024))
+    patterns = list(BUILTIN_SECRET_PATTERNS) + vendor_like_patterns(args.extra_patterns)
+    engine = SecretEngine(patterns)
+
+    def naive(content: str) -> int:
+        return sum(1 for pattern in patterns for _ in pattern.regex.finditer(content))
+
+    def prefiltered(content: str) -> int:
+        return sum(1 for _ in engine.scan_text(content))
+
+    def legacy(content: str) -> int:
+        return sum(1 for _ in SENSITIVE_ASSIGN_RE.finditer(content))
+
+    print(f"{len(patterns)} patterns over {args.size_mb:g} MB of synthetic HCL")
+    bench("legacy assignment regex", legacy, text, args.repeat)
+    if not args.skip_naive:
+        bench("per-pattern full scan", naive, text, args.repeat)
+    bench("SecretEngine", prefiltered, text, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import itertools
+import os
 import time
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from terraform_guardrail.generator import generate_snippet
 from terraform_guardrail.policy_registry import (
@@ -16,7 +19,11 @@ from terraform_guardrail.policy_registry import (
     list_policy_bundles,
 )
 from terraform_guardrail.registry_client import RegistryError, get_provider_metadata
-from terraform_guardrail.scanner.scan import scan_path
+from terraform_guardrail.scanner.models import ScanSummary
+from terraform_guardrail.scanner.scan import iter_raw_scan, scan_path
+from terraform_guardrail.scanner.streaming import iter_ndjson, ndjson_error
+
+MAX_SCAN_JOBS = os.cpu_count() or 1
 
 REQUEST_COUNT = Counter(
     "guardrail_requests_total",
@@ -41,6 +48,15 @@ class ScanRequest(BaseModel):
     policy_app: str | None = None
     policy_registry: str | None = None
     policy_query: str | None = None
+    full_policy_input: bool = False
+    # 0 means one per CPU; more than that would only oversubscribe the server.
+    policy_jobs: int | None = Field(default=None, ge=0, le=MAX_SCAN_JOBS)
+    jobs: int = Field(default=1, ge=0, le=MAX_SCAN_JOBS)
+    cache: bool = False
+    include: list[str] | None = None
+    exclude: list[str] | None = None
+    config_file: str | None = None
+    stream: bool = False
 
 
 class ProviderRequest(BaseModel):
@@ -53,6 +69,15 @@ class SnippetRequest(BaseModel):
     name: str = "example"
 
 
+def _end_on_error(lines: Iterator[str]) -> Iterator[str]:
+    # The 200 status is already sent, so a late failure becomes the stream's last record
+    # instead of a silently truncated body.
+    try:
+        yield from lines
+    except Exception as exc:  # noqa: BLE001
+        yield ndjson_error(str(exc))
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="Terraform Guardrail MCP (TerraGuard) API", version="1.0.5")
 
@@ -78,22 +103,40 @@ def create_app() -> FastAPI:
         return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
     @app.post("/scan")
-    def scan(request: ScanRequest) -> dict[str, Any]:
+    def scan(request: ScanRequest) -> Any:
         path = Path(request.path)
-        state_path = Path(request.state_path) if request.state_path else None
-        try:
-            report = scan_path(
-                path,
-                state_path=state_path,
-                use_schema=request.use_schema,
-                policy_bundle=request.policy_bundle,
-                policy_layers=request.policy_layers,
-                policy_base=request.policy_base,
-                policy_env=request.policy_env,
-                policy_app=request.policy_app,
-                policy_registry=request.policy_registry,
-                policy_query=request.policy_query,
+        scan_kwargs = dict(
+            state_path=Path(request.state_path) if request.state_path else None,
+            use_schema=request.use_schema,
+            policy_bundle=request.policy_bundle,
+            policy_layers=request.policy_layers,
+            policy_base=request.policy_base,
+            policy_env=request.policy_env,
+            policy_app=request.policy_app,
+            policy_registry=request.policy_registry,
+            policy_query=request.policy_query,
+            full_policy_input=request.full_policy_input,
+            policy_jobs=request.policy_jobs,
+            jobs=request.jobs,
+            cache=request.cache,
+            include=request.include,
+            exclude=request.exclude,
+            config_file=request.config_file,
+        )
+        if request.stream:
+            summary = ScanSummary()
+            findings = iter_raw_scan(path, **scan_kwargs, summary=summary)
+            lines = iter_ndjson(findings, summary, str(path))
+            # Pull the first line eagerly so invalid requests still get a 400.
+            try:
+                first = next(lines)
+            except Exception as exc:  # noqa: BLE001
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            return StreamingResponse(
+                itertools.chain([first], _end_on_error(lines)), media_type="application/x-ndjson"
             )
+        try:
+            report = scan_path(path, **scan_kwargs)
         except Exception as exc:  # noqa: BLE001
             raise HTTPException(status_code=400, detail=str(exc)) from exc
         return report.model_dump()
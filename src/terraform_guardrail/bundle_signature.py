@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import re
+import tarfile
+from typing import IO, Any
+
+SIGNATURES_FILE = ".signatures.json"
+MANIFEST_FILE = ".manifest"
+DEFAULT_FILE_ALGORITHM = "SHA-256"
+HASH_CHUNK_SIZE = 1024 * 1024
+FILE_ALGORITHMS = {
+    "MD5": "md5",
+    "SHA-1": "sha1",
+    "SHA-224": "sha224",
+    "SHA-256": "sha256",
+    "SHA-384": "sha384",
+    "SHA-512": "sha512",
+    "SHA-512-224": "sha512_224",
+    "SHA-512-256": "sha512_256",
+}
+# DER-encoded DigestInfo prefixes for EMSA-PKCS1-v1_5 (RFC 8017, section 9.2).
+RSA_ALGORITHMS = {
+    "RS256": ("sha256", bytes.fromhex("3031300d060960864801650304020105000420")),
+    "RS384": ("sha384", bytes.fromhex("3041300d060960864801650304020205000430")),
+    "RS512": ("sha512", bytes.fromhex("3051300d060960864801650304020305000440")),
+}
+HMAC_ALGORITHMS = {"HS256": "sha256", "HS384": "sha384", "HS512": "sha512"}
+# Matches ``opa build --verification-key``, which assumes RS256 unless told otherwise.
+DEFAULT_SIGNING_ALGORITHM = "RS256"
+_RSA_ENCRYPTION_OID = bytes.fromhex("2a864886f70d010101")
+_PEM_RE = re.compile(
+    r"-----BEGIN (RSA )?PUBLIC KEY-----(.*?)-----END (?:RSA )?PUBLIC KEY-----", re.DOTALL
+)
+
+
+class BundleSignatureError(RuntimeError):
+    pass
+
+
+def verify_bundle(
+    archive: IO[bytes],
+    key: str,
+    key_id: str | None = None,
+    scope: str | None = None,
+    algorithm: str = DEFAULT_SIGNING_ALGORITHM,
+) -> dict[str, Any]:
+    """Verify a gzipped OPA bundle the way ``opa build --verification-key`` does.
+
+    The ``.signatures.json`` JWT must be signed with ``algorithm`` by ``key`` (an
+    RSA public key in PEM form for RS*, the shared secret for HS*); the token's
+    own ``alg`` header must agree and is never trusted on its own. Every file in
+    the bundle must match the digest it lists. Members are streamed through their hashers;
+    only JSON files, which OPA hashes in canonical form, are parsed. Returns the
+    verified JWT payload.
+    """
+    archive.seek(0)
+    token, digests = _scan_bundle(archive)
+    if token is None:
+        raise BundleSignatureError(f"bundle has no {SIGNATURES_FILE}")
+    payload = _verify_token(token, key, key_id, scope, algorithm)
+    signed = _signed_files(payload)
+    # Files signed with something other than SHA-256 need a second pass.
+    others = {
+        name: algorithm
+        for name, (algorithm, _) in signed.items()
+        if algorithm != DEFAULT_FILE_ALGORITHM and name in digests
+    }
+    if others:
+        archive.seek(0)
+        _, extra = _scan_bundle(archive, others)
+        digests.update(extra)
+    unsigned = sorted(set(digests) - set(signed))
+    if unsigned:
+        raise BundleSignatureError(f"file {unsigned[0]} is not included in the bundle signature")
+    missing = sorted(set(signed) - set(digests))
+    if missing:
+        raise BundleSignatureError(f"signed file(s) {missing} not found in the bundle")
+    for name, (_, expected) in signed.items():
+        if not hmac.compare_digest(digests[name], expected.lower()):
+            raise BundleSignatureError(f"digest mismatch for file {name}")
+    return payload
+
+
+def _scan_bundle(
+    archive: IO[bytes], algorithms: dict[str, str] | None = None
+) -> tuple[str | None, dict[str, str]]:
+    """The signature token and file digests; ``algorithms`` limits and overrides the hashing."""
+    token: str | None = None
+    digests: dict[str, str] = {}
+    try:
+        with tarfile.open(fileobj=archive, mode="r:gz") as tar:
+            for member in tar:
+                name = member.name.lstrip("/")
+                if member.isdir():
+                    continue
+                if not member.isfile():
+                    # Links and devices carry no digest, so they would slip past the signature.
+                    raise BundleSignatureError(f"bundle entry {name} is not a regular file")
+                handle = tar.extractfile(member)
+                if handle is None:
+                    continue
+                if name == SIGNATURES_FILE:
+                    if algorithms is None:
+                        token = _read_token(handle)
+                    continue
+                if algorithms is not None and name not in algorithms:
+                    continue
+                algorithm = (algorithms or {}).get(name, DEFAULT_FILE_ALGORITHM)
+                digests[name] = _file_digest(name, handle, algorithm)
+    except (tarfile.TarError, OSError, EOFError) as exc:
+        raise BundleSignatureError(f"unreadable bundle: {exc}") from exc
+    return token, digests
+
+
+def _read_token(handle: IO[bytes]) -> str:
+    try:
+        signatures = json.load(handle).get("signatures")
+    except (ValueError, AttributeError) as exc:
+        raise BundleSignatureError(f"invalid {SIGNATURES_FILE}") from exc
+    if not isinstance(signatures, list) or not signatures:
+        raise BundleSignatureError(f"{SIGNATURES_FILE} has no signatures")
+    if len(signatures) != 1 or not isinstance(signatures[0], str):
+        raise BundleSignatureError("expected exactly one signature")
+    return signatures[0]
+
+
+def _file_digest(name: str, handle: IO[bytes], algorithm: str) -> str:
+    hash_name = FILE_ALGORITHMS.get(algorithm)
+    if hash_name is None:
+        raise BundleSignatureError(f"unsupported hashing algorithm {algorithm} for {name}")
+    hasher = hashlib.new(hash_name)
+    if name.endswith(".json") or name.rsplit("/", 1)[-1] == MANIFEST_FILE:
+        try:
+            document = json.load(handle, parse_int=_RawNumber, parse_float=_RawNumber)
+        except ValueError as exc:
+            raise BundleSignatureError(f"invalid JSON in {name}") from exc
+        hasher.update(_canonical_json(document).encode("utf-8"))
+    else:
+        while chunk := handle.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class _RawNumber(str):
+    """A JSON number kept as its source text, as OPA's ``json.Number`` does."""
+
+
+def _canonical_json(value: Any) -> str:
+    """OPA's order-independent JSON encoding: sorted keys, no whitespace, Go string escapes."""
+    if isinstance(value, dict):
+        items = (f"{_go_string(key)}:{_canonical_json(value[key])}" for key in sorted(value))
+        return "{" + ",".join(items) + "}"
+    if isinstance(value, list):
+        return "[" + ",".join(_canonical_json(item) for item in value) + "]"
+    if isinstance(value, _RawNumber):
+        return str(value)
+    if isinstance(value, str):
+        return _go_string(value)
+    return json.dumps(value)
+
+
+def _go_string(value: str) -> str:
+    encoded = json.dumps(value, ensure_ascii=False)
+    for char, escape in (
+        ("<", "\\u003c"),
+        (">", "\\u003e"),
+        ("&", "\\u0026"),
+        ("\u2028", "\\u2028"),
+        ("\u2029", "\\u2029"),
+    ):
+        encoded = encoded.replace(char, escape)
+    return encoded
+
+
+def _verify_token(
+    token: str, key: str, key_id: str | None, scope: str | None, algorithm: str
+) -> dict[str, Any]:
+    if algorithm not in RSA_ALGORITHMS and algorithm not in HMAC_ALGORITHMS:
+        raise BundleSignatureError(f"unsupported signing algorithm {algorithm}")
+    parts = token.split(".")
+    if len(parts) != 3:
+        raise BundleSignatureError("signature is not a JWS compact token")
+    try:
+        header = json.loads(_b64decode(parts[0]))
+        payload = json.loads(_b64decode(parts[1]))
+        signature = _b64decode(parts[2])
+    except ValueError as exc:
+        raise BundleSignatureError("malformed signature token") from exc
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        raise BundleSignatureError("malformed signature token")
+    token_key_id = header.get("kid") or payload.get("keyid")
+    if key_id and token_key_id and token_key_id != key_id:
+        raise BundleSignatureError(f"verification key corresponding to ID {token_key_id} not found")
+    signing_input = f"{parts[0]}.{parts[1]}".encode("ascii")
+    if header.get("alg") != algorithm:
+        raise BundleSignatureError(
+            f"token is signed with {header.get('alg')}, expected {algorithm}"
+        )
+    if algorithm in RSA_ALGORITHMS:
+        _verify_rsa(key, algorithm, signing_input, signature)
+    else:
+        # A public key is not a secret; using one as an HMAC key would let anyone sign.
+        if _PEM_RE.search(key) or "-----BEGIN" in key:
+            raise BundleSignatureError(f"{algorithm} needs a shared secret, not a PEM key")
+        expected = hmac.new(key.encode("utf-8"), signing_input, HMAC_ALGORITHMS[algorithm])
+        if not hmac.compare_digest(expected.digest(), signature):
+            raise BundleSignatureError("invalid token signature")
+    if scope and payload.get("scope") != scope:
+        raise BundleSignatureError("scope mismatch")
+    return payload
+
+
+def _signed_files(payload: dict[str, Any]) -> dict[str, tuple[str, str]]:
+    files = payload.get("files")
+    if not isinstance(files, list) or not files:
+        raise BundleSignatureError("signature payload lists no files")
+    signed: dict[str, tuple[str, str]] = {}
+    for entry in files:
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("hash"):
+            raise BundleSignatureError("signature payload has an invalid file entry")
+        algorithm = entry.get("algorithm") or DEFAULT_FILE_ALGORITHM
+        signed[str(entry["name"]).lstrip("/")] = (algorithm, str(entry["hash"]))
+    return signed
+
+
+def _verify_rsa(key: str, algorithm: str, signing_input: bytes, signature: bytes) -> None:
+    modulus, exponent = _rsa_public_key(key)
+    hash_name, prefix = RSA_ALGORITHMS[algorithm]
+    size = (modulus.bit_length() + 7) // 8
+    encoded = prefix + hashlib.new(hash_name, signing_input).digest()
+    value = int.from_bytes(signature, "big")
+    if len(signature) != size or value >= modulus or size < len(encoded) + 11:
+        raise BundleSignatureError("invalid token signature")
+    message = pow(value, exponent, modulus).to_bytes(size, "big")
+    expected = b"\x00\x01" + b"\xff" * (size - len(encoded) - 3) + b"\x00" + encoded
+    if not hmac.compare_digest(message, expected):
+        raise BundleSignatureError("invalid token signature")
+
+
+def _rsa_public_key(pem: str) -> tuple[int, int]:
+    """Modulus and exponent from a PKCS#1 or SubjectPublicKeyInfo PEM public key."""
+    match = _PEM_RE.search(pem)
+    if match is None:
+        raise BundleSignatureError("verification key is not a PEM RSA public key")
+    try:
+        der = base64.b64decode("".join(match.group(2).split()), validate=True)
+        if match.group(1) is None:
+            algorithm, key_bits = _der_children(_der_value(der, 0x30), 0x30, 0x03)
+            if _der_children(algorithm, 0x06)[0] != _RSA_ENCRYPTION_OID:
+                raise BundleSignatureError("verification key is not an RSA key")
+            if not key_bits or key_bits[0] != 0:
+                raise BundleSignatureError("malformed verification key")
+            der = key_bits[1:]
+        modulus, exponent = _der_children(_der_value(der, 0x30), 0x02, 0x02)
+    except (binascii.Error, IndexError, ValueError) as exc:
+        raise BundleSignatureError("malformed verification key") from exc
+    return int.from_bytes(modulus, "big"), int.from_bytes(exponent, "big")
+
+
+def _der_value(data: bytes, tag: int) -> bytes:
+    value, end = _der_read(data, 0, tag)
+    if end != len(data):
+        raise ValueError("trailing DER data")
+    return value
+
+
+def _der_children(data: bytes, *tags: int) -> list[bytes]:
+    """The leading children of a constructed DER value, checked against ``tags``."""
+    children: list[bytes] = []
+    offset = 0
+    for tag in tags:
+        value, offset = _der_read(data, offset, tag)
+        children.append(value)
+    return children
+
+
+def _der_read(data: bytes, offset: int, tag: int) -> tuple[bytes, int]:
+    if data[offset] != tag:
+        raise ValueError(f"expected DER tag {tag:#x}")
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7F
+        length = int.from_bytes(data[offset : offset + count], "big")
+        offset += count
+    value = data[offset : offset + length]
+    if len(value) != length:
+        raise ValueError("truncated DER value")
+    return value, offset + length
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.scanner.cache import get_cache_dir
+
+BUNDLE_STORE_SUBDIR = "bundles"
+BUNDLE_STORE_ENV = "GUARDRAIL_BUNDLE_STORE"
+BUNDLE_STORE_MAX_MB_ENV = "GUARDRAIL_BUNDLE_STORE_MAX_MB"
+DEFAULT_BUNDLE_STORE_MAX_MB = 1024
+ENTRY_META_NAME = "entry.json"
+ENTRY_CONTENT_NAME = "bundle"
+# Entries used this recently are never evicted, so a parallel job's bundle stays put.
+EVICT_MIN_IDLE_SECONDS = 600
+# Leftovers from killed writers are removed once they are this old.
+STALE_TEMP_SECONDS = 3600
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BundleStoreError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class StoreEntry:
+    sha256: str
+    path: Path
+    size_bytes: int
+    last_used: float
+
+
+class BundleStore:
+    """Extracted policy bundles on disk, keyed by tarball sha256.
+
+    Each entry records the verification settings its signature was checked
+    with, so a hit skips download, verification, and extraction. Entries are
+    staged in a temp directory and renamed into place, which keeps concurrent
+    writers (parallel CI jobs sharing a cache) from seeing partial bundles.
+    Callers must treat the returned directories as read-only.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None):
+        self.root = root
+        self.max_bytes = max_bytes if max_bytes is not None else bundle_store_max_bytes()
+
+    def lookup(self, sha256: str, verification: str | None = None) -> Path | None:
+        """Return the stored bundle, or None if absent or not yet verified with ``verification``."""
+        entry = self._entry_dir(sha256)
+        meta = _read_meta(entry)
+        if meta is None:
+            return None
+        if verification is not None and verification not in meta.get("verified", []):
+            return None
+        _touch(entry / ENTRY_META_NAME)
+        return entry / ENTRY_CONTENT_NAME
+
+    def add(
+        self,
+        sha256: str,
+        populate: Callable[[Path], Path],
+        verification: str | None = None,
+    ) -> Path:
+        """Store the bundle ``populate`` extracts under a staging dir and return its location.
+
+        ``populate`` must download, check the digest, and verify the signature;
+        ``verification`` identifies the settings it verified with.
+        """
+        entry = self._entry_dir(sha256)
+        self.root.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.root, prefix=".incoming-") as tmp_dir:
+            staging = Path(tmp_dir) / "entry"
+            staging.mkdir()
+            extracted = populate(Path(tmp_dir) / "download")
+            extracted.rename(staging / ENTRY_CONTENT_NAME)
+            meta = {
+                "sha256": sha256,
+                "verified": [verification] if verification else [],
+                "size_bytes": _tree_size(staging),
+            }
+            _write_meta(staging, meta)
+            try:
+                staging.rename(entry)
+            except OSError:
+                # Another writer stored the same bundle first; keep theirs.
+                if _read_meta(entry) is None:
+                    raise
+                if verification:
+                    self._record_verification(entry, verification)
+        _touch(entry / ENTRY_META_NAME)
+        self.prune()
+        return entry / ENTRY_CONTENT_NAME
+
+    def entries(self) -> list[StoreEntry]:
+        entries: list[StoreEntry] = []
+        if not self.root.is_dir():
+            return entries
+        for item in self.root.iterdir():
+            if not _SHA256_RE.match(item.name):
+                continue
+            meta_path = item / ENTRY_META_NAME
+            meta = _read_meta(item)
+            if meta is None:
+                continue
+            try:
+                last_used = meta_path.stat().st_mtime
+            except OSError:
+                continue
+            entries.append(StoreEntry(item.name, item, int(meta.get("size_bytes", 0)), last_used))
+        return entries
+
+    def usage(self) -> tuple[int, int]:
+        entries = self.entries()
+        return len(entries), sum(entry.size_bytes for entry in entries)
+
+    def prune(self, max_bytes: int | None = None, min_idle: float = EVICT_MIN_IDLE_SECONDS) -> int:
+        """Evict least recently used entries above ``max_bytes``; returns the number removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        now = time.time()
+        self._remove_stale_temp(now)
+        entries = sorted(self.entries(), key=lambda entry: entry.last_used)
+        total = sum(entry.size_bytes for entry in entries)
+        removed = 0
+        for entry in entries:
+            if total <= limit:
+                break
+            if now - entry.last_used < min_idle:
+                continue
+            self._remove(entry.path)
+            total -= entry.size_bytes
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        return self.prune(max_bytes=0, min_idle=0)
+
+    def _entry_dir(self, sha256: str) -> Path:
+        digest = sha256.lower()
+        if not _SHA256_RE.match(digest):
+            raise BundleStoreError(f"Invalid bundle sha256: {sha256}")
+        return self.root / digest
+
+    def _record_verification(self, entry: Path, verification: str) -> None:
+        meta = _read_meta(entry)
+        if meta is None or verification in meta.get("verified", []):
+            return
+        meta["verified"] = [*meta.get("verified", []), verification]
+        _write_meta(entry, meta)
+
+    def _remove(self, entry: Path) -> None:
+        # Renaming first makes the entry disappear atomically for concurrent readers.
+        graveyard = self.root / f".evict-{entry.name}-{os.getpid()}-{time.monotonic_ns()}"
+        try:
+            entry.rename(graveyard)
+        except OSError:
+            return
+        shutil.rmtree(graveyard, ignore_errors=True)
+
+    def _remove_stale_temp(self, now: float) -> None:
+        if not self.root.is_dir():
+            return
+        for item in self.root.glob(".*"):
+            try:
+                if now - item.stat().st_mtime > STALE_TEMP_SECONDS:
+                    shutil.rmtree(item, ignore_errors=True)
+            except OSError:
+                continue
+
+
+def bundle_store_enabled() -> bool:
+    return os.getenv(BUNDLE_STORE_ENV, "").strip().lower() not in {"0", "false", "no"}
+
+
+def bundle_store_max_bytes() -> int:
+    try:
+        max_mb = int(os.getenv(BUNDLE_STORE_MAX_MB_ENV, str(DEFAULT_BUNDLE_STORE_MAX_MB)))
+    except ValueError:
+        max_mb = DEFAULT_BUNDLE_STORE_MAX_MB
+    return max_mb * 1024 * 1024
+
+
+def get_bundle_store(cache_dir: Path | str | None = None) -> BundleStore:
+    return BundleStore(get_cache_dir(cache_dir) / BUNDLE_STORE_SUBDIR)
+
+
+def _read_meta(entry: Path) -> dict[str, Any] | None:
+    try:
+        meta = json.loads((entry / ENTRY_META_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) else None
+
+
+def _write_meta(entry: Path, meta: dict[str, Any]) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=entry, prefix=".meta-")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+    os.replace(tmp_name, entry / ENTRY_META_NAME)
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _tree_size(root: Path) -> int:
+    return sum(item.stat().st_size for item in root.rglob("*") if item.is_file())
@@ -4,6 +4,7 @@ import importlib.metadata
 import json
 import shutil
 import subprocess
+import sys
 import tempfile
 from pathlib import Path
 from typing import Annotated
@@ -13,24 +14,45 @@ from rich.console import Console
 from rich.json import JSON
 
 from terraform_guardrail.api.app import create_app as create_api_app
+from terraform_guardrail.bundle_store import get_bundle_store
 from terraform_guardrail.generator import generate_snippet
 from terraform_guardrail.mcp.server import run_stdio
+from terraform_guardrail.policy_lock import (
+    LOCKFILE_NAME,
+    PolicyLockError,
+    load_policy_lock,
+    lock_policy_bundles,
+    sync_policy_lock,
+)
 from terraform_guardrail.policy_registry import (
+    RULE_PACK_KIND,
     PolicyRegistryError,
     download_bundle,
     get_policy_bundle,
     list_policy_bundles,
 )
 from terraform_guardrail.registry_api import create_registry_app
-from terraform_guardrail.scanner.rules import RULES
-from terraform_guardrail.scanner.scan import scan_path
+from terraform_guardrail.scanner.cache import CacheError, ScanCache
+from terraform_guardrail.scanner.config import (
+    REGISTRY_RULE_PACK_PREFIX,
+    ConfigError,
+    load_scan_config,
+)
+from terraform_guardrail.scanner.models import ScanSummary
+from terraform_guardrail.scanner.opa_wasm import clear_wasm_cache, wasm_cache_usage
+from terraform_guardrail.scanner.rule_registry import get_rule_registry
+from terraform_guardrail.scanner.scan import iter_raw_scan, scan_path
+from terraform_guardrail.scanner.streaming import iter_ndjson, iter_sarif
+from terraform_guardrail.schema import clear_schema_cache, schema_cache_usage
 from terraform_guardrail.web.app import create_app
 
 app = typer.Typer(add_completion=False)
 policy_app = typer.Typer(help="Policy registry commands.")
 rules_app = typer.Typer(help="Rule catalog commands.")
+cache_app = typer.Typer(help="Scan cache commands.")
 app.add_typer(policy_app, name="policy")
 app.add_typer(rules_app, name="rules")
+app.add_typer(cache_app, name="cache")
 console = Console()
 
 
@@ -59,7 +81,9 @@ def _root(
 def scan(
     path: Annotated[Path, typer.Argument(help="Path to a Terraform file or directory.")],
     state: Annotated[Path | None, typer.Option(help="Optional path to a .tfstate file.")] = None,
-    format: Annotated[str, typer.Option(help="pretty or json")] = "pretty",
+    format: Annotated[
+        str, typer.Option(help="pretty, json, ndjson, or sarif (ndjson/sarif stream)")
+    ] = "pretty",
     schema: Annotated[bool, typer.Option(help="Enable schema-aware validation")] = False,
     policy_bundle: Annotated[str | None, typer.Option(help="Policy bundle ID to evaluate")] = None,
     policy_bundle_path: Annotated[
@@ -75,25 +99,91 @@ def scan(
     policy_app: Annotated[str | None, typer.Option(help="Application policy bundle ID")] = None,
     policy_registry: Annotated[str | None, typer.Option(help="Policy registry URL")] = None,
     policy_query: Annotated[str | None, typer.Option(help="OPA query override")] = None,
+    full_policy_input: Annotated[
+        bool,
+        typer.Option(help="Send all HCL and state to OPA, ignoring bundle input projections"),
+    ] = False,
+    policy_jobs: Annotated[
+        int | None,
+        typer.Option(help="Parallel OPA evaluations per bundle (0 = all cores)"),
+    ] = None,
+    jobs: Annotated[
+        int,
+        typer.Option("--jobs", "-j", help="Parallel scan processes (0 = all cores)"),
+    ] = 1,
+    cache: Annotated[
+        bool, typer.Option(help="Reuse parsed HCL and findings for unchanged files")
+    ] = False,
+    cache_dir: Annotated[
+        Path | None, typer.Option(help="Scan cache directory (implies --cache)")
+    ] = None,
+    incremental: Annotated[
+        bool, typer.Option(help="Only re-scan files changed since the last incremental run")
+    ] = False,
+    manifest: Annotated[
+        Path | None,
+        typer.Option(help="Incremental manifest path (default: <path>/.guardrail/manifest.json)"),
+    ] = None,
+    include: Annotated[
+        list[str] | None,
+        typer.Option(help="Only scan files matching this gitignore-style glob (repeatable)"),
+    ] = None,
+    exclude: Annotated[
+        list[str] | None,
+        typer.Option(help="Skip files/directories matching this glob (repeatable)"),
+    ] = None,
+    config: Annotated[
+        Path | None,
+        typer.Option(help="guardrail.toml settings file (default: <path>/guardrail.toml)"),
+    ] = None,
     fail_on: Annotated[
         str | None,
         typer.Option(help="Fail if findings at/above severity: low, medium, high"),
     ] = None,
 ) -> None:
+    scan_kwargs = dict(
+        path=path,
+        state_path=state,
+        use_schema=schema,
+        policy_bundle=policy_bundle,
+        policy_bundle_path=policy_bundle_path,
+        policy_layers=policy_layers,
+        policy_base=policy_base,
+        policy_env=policy_env,
+        policy_app=policy_app,
+        policy_registry=policy_registry,
+        policy_query=policy_query,
+        full_policy_input=full_policy_input,
+        policy_jobs=policy_jobs,
+        jobs=jobs,
+        cache=cache,
+        cache_dir=cache_dir,
+        incremental=incremental,
+        manifest_path=manifest,
+        include=include,
+        exclude=exclude,
+        config_file=config,
+    )
+    if format in {"ndjson", "sarif"}:
+        summary = ScanSummary()
+        findings = iter_raw_scan(**scan_kwargs, summary=summary)
+        if format == "ndjson":
+            chunks = iter_ndjson(findings, summary, str(path))
+        else:
+            chunks = iter_sarif(findings)
+        try:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+        except Exception as exc:  # noqa: BLE001
+            typer.echo(f"Scan failed: {exc}", err=True)
+            raise typer.Exit(code=1) from exc
+        if fail_on:
+            _maybe_fail(summary, fail_on.lower())
+        return
+
     try:
-        report = scan_path(
-            path=path,
-            state_path=state,
-            use_schema=schema,
-            policy_bundle=policy_bundle,
-            policy_bundle_path=policy_bundle_path,
-            policy_layers=policy_layers,
-            policy_base=policy_base,
-            policy_env=policy_env,
-            policy_app=policy_app,
-            policy_registry=policy_registry,
-            policy_query=policy_query,
-        )
+        report = scan_path(**scan_kwargs)
     except Exception as exc:  # noqa: BLE001
         console.print(f"Scan failed: {exc}")
         raise typer.Exit(code=1) from exc
@@ -175,7 +265,8 @@ def list_policies(
         console.print(f"Policy registry error: {exc}")
         raise typer.Exit(code=1) from exc
     for bundle in bundles:
-        console.print(f"- {bundle.bundle_id} ({bundle.version or 'unknown'}) {bundle.title}")
+        kind = " [rule pack]" if bundle.kind == RULE_PACK_KIND else ""
+        console.print(f"- {bundle.bundle_id} ({bundle.version or 'unknown'}) {bundle.title}{kind}")
 
 
 @policy_app.command("fetch")
@@ -195,6 +286,58 @@ def fetch_policy(
     console.print(f"Bundle downloaded to {bundle_path}")
 
 
+@policy_app.command("lock")
+def lock_policies(
+    bundle_ids: Annotated[
+        list[str] | None,
+        typer.Argument(
+            help="Bundle IDs to pin (default: the layers and registry rule packs "
+            "configured for --path)"
+        ),
+    ] = None,
+    path: Annotated[Path, typer.Option(help="Directory whose guardrail.toml to read")] = Path("."),
+    lockfile: Annotated[
+        Path | None, typer.Option(help=f"Lockfile to write (default: <path>/{LOCKFILE_NAME})")
+    ] = None,
+    registry: Annotated[str | None, typer.Option(help="Policy registry URL")] = None,
+) -> None:
+    try:
+        if not bundle_ids:
+            config = load_scan_config(workdir=path, policy_registry=registry, use_lockfile=False)
+            bundle_ids = list(config.bundle_ids) + [
+                pack.removeprefix(REGISTRY_RULE_PACK_PREFIX)
+                for pack in config.rule_packs
+                if pack.startswith(REGISTRY_RULE_PACK_PREFIX)
+            ]
+            registry = registry or config.policy_registry
+        if not bundle_ids:
+            console.print("No policy bundles configured; pass bundle IDs to pin.")
+            raise typer.Exit(code=1)
+        lock = lock_policy_bundles(bundle_ids, registry, lockfile or path / LOCKFILE_NAME)
+    except (ConfigError, PolicyLockError, PolicyRegistryError) as exc:
+        console.print(f"Policy lock error: {exc}")
+        raise typer.Exit(code=1) from exc
+    for bundle in lock.bundles:
+        console.print(f"- {bundle.bundle_id} {bundle.version or 'unknown'} sha256:{bundle.sha256}")
+    console.print(f"Wrote {lock.path}")
+
+
+@policy_app.command("sync")
+def sync_policies(
+    lockfile: Annotated[Path, typer.Option(help="Lockfile to sync")] = Path(LOCKFILE_NAME),
+    jobs: Annotated[int, typer.Option("--jobs", "-j", help="Parallel downloads")] = 8,
+) -> None:
+    try:
+        lock = load_policy_lock(lockfile)
+        synced = sync_policy_lock(lock, jobs=jobs)
+    except (PolicyLockError, PolicyRegistryError) as exc:
+        console.print(f"Policy sync error: {exc}")
+        raise typer.Exit(code=1) from exc
+    for bundle, bundle_path in synced:
+        console.print(f"- {bundle.bundle_id} {bundle.version or 'unknown'} -> {bundle_path}")
+    console.print(f"Synced {len(synced)} bundle(s) into the bundle store")
+
+
 @policy_app.command("init")
 def init_policy_bundle(
     destination: Annotated[
@@ -280,10 +423,62 @@ def validate_policy_bundle(
 
 @rules_app.command("list")
 def list_rules() -> None:
-    for rule_id, message in sorted(RULES.items()):
+    for rule_id, message in sorted(get_rule_registry().catalog().items()):
         console.print(f"- {rule_id}: {message}")
 
 
+@cache_app.command("stats")
+def cache_stats(
+    cache_dir: Annotated[Path | None, typer.Option(help="Scan cache directory")] = None,
+) -> None:
+    try:
+        with ScanCache(cache_dir) as scan_cache:
+            stats = scan_cache.stats()
+    except CacheError as exc:
+        console.print(f"Cache error: {exc}")
+        raise typer.Exit(code=1) from exc
+    console.print(f"Cache: {stats.path}")
+    console.print(f"Entries: {stats.entries}")
+    for namespace, count in sorted(stats.namespaces.items()):
+        console.print(f"- {namespace}: {count}")
+    console.print(
+        f"Size: {stats.size_bytes / 1024 / 1024:.1f} MiB "
+        f"of {stats.max_bytes / 1024 / 1024:.0f} MiB"
+    )
+    schemas, schema_bytes = schema_cache_usage(cache_dir)
+    console.print(f"Provider schemas: {schemas} ({schema_bytes / 1024 / 1024:.1f} MiB)")
+    modules, module_bytes = wasm_cache_usage(cache_dir)
+    console.print(f"Compiled policies: {modules} ({module_bytes / 1024 / 1024:.1f} MiB)")
+    bundles, bundle_bytes = get_bundle_store(cache_dir).usage()
+    console.print(f"Policy bundles: {bundles} ({bundle_bytes / 1024 / 1024:.1f} MiB)")
+
+
+@cache_app.command("prune")
+def cache_prune(
+    cache_dir: Annotated[Path | None, typer.Option(help="Scan cache directory")] = None,
+    max_size: Annotated[
+        int | None, typer.Option(help="Evict least recently used entries above this many MiB")
+    ] = None,
+    all_entries: Annotated[bool, typer.Option("--all", help="Remove every entry")] = False,
+) -> None:
+    try:
+        with ScanCache(cache_dir) as scan_cache:
+            if all_entries:
+                removed = (
+                    scan_cache.clear()
+                    + clear_schema_cache(cache_dir)
+                    + clear_wasm_cache(cache_dir)
+                    + get_bundle_store(cache_dir).clear()
+                )
+            else:
+                limit = max_size * 1024 * 1024 if max_size is not None else None
+                removed = scan_cache.prune(limit) + get_bundle_store(cache_dir).prune()
+    except CacheError as exc:
+        console.print(f"Cache error: {exc}")
+        raise typer.Exit(code=1) from exc
+    console.print(f"Removed {removed} cache entries.")
+
+
 def main() -> None:
     app()
 
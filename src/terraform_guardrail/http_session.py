@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Enough for parallel bundle prefetches plus API worker threads hitting one registry.
+POOL_MAXSIZE = 16
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+_session_pid: int | None = None
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide session so registry calls reuse keep-alive connections.
+
+    A forked worker gets a fresh session rather than sharing its parent's sockets.
+    """
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def http_get(
+    url: str, timeout: float, headers: dict[str, str] | None = None, stream: bool = False
+) -> requests.Response:
+    return get_http_session().get(url, timeout=timeout, headers=headers, stream=stream)
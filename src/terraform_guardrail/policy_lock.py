@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import re
+import tempfile
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.bundle_store import BundleStore, get_bundle_store
+from terraform_guardrail.policy_registry import (
+    REGO_BUNDLE_KIND,
+    BundleVerification,
+    PolicyBundle,
+    fetch_bundle,
+    get_policy_bundle,
+    get_policy_registry_url,
+)
+
+LOCKFILE_NAME = "guardrail.lock"
+LOCKFILE_ENV = "GUARDRAIL_LOCKFILE"
+LOCKFILE_VERSION = 1
+DEFAULT_SYNC_JOBS = 8
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+
+
+class PolicyLockError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class PolicyLock:
+    """Registry bundles pinned to a version, URL, and sha256 by ``guardrail.lock``."""
+
+    path: str
+    registry: str
+    bundles: tuple[PolicyBundle, ...]
+
+    def get(self, bundle_id: str) -> PolicyBundle:
+        for bundle in self.bundles:
+            if bundle.bundle_id == bundle_id:
+                return bundle
+        raise PolicyLockError(
+            f"Bundle '{bundle_id}' is not pinned in {self.path}; "
+            "run `terraform-guardrail policy lock` to update it."
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": LOCKFILE_VERSION,
+            "registry": self.registry,
+            "bundles": [bundle.to_dict() for bundle in self.bundles],
+        }
+
+
+def find_lockfile(workdir: Path | str | None) -> Path | None:
+    """``GUARDRAIL_LOCKFILE`` if set, else ``<workdir>/guardrail.lock`` when it exists."""
+    configured = os.getenv(LOCKFILE_ENV)
+    if configured:
+        path = Path(configured)
+        if not path.is_file():
+            raise PolicyLockError(f"Lockfile not found: {path}")
+        return path.resolve()
+    if workdir:
+        candidate = Path(workdir) / LOCKFILE_NAME
+        if candidate.is_file():
+            return candidate.resolve()
+    return None
+
+
+def load_policy_lock(path: Path) -> PolicyLock:
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError as exc:
+        raise PolicyLockError(f"Lockfile not found: {path}") from exc
+    return _load_policy_lock(str(path), mtime_ns)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_policy_lock(path: str, mtime_ns: int) -> PolicyLock:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise PolicyLockError(f"Invalid lockfile {path}: {exc}") from exc
+    if not isinstance(data, dict) or data.get("version") != LOCKFILE_VERSION:
+        raise PolicyLockError(f"Unsupported lockfile version in {path}.")
+    entries = data.get("bundles")
+    if not isinstance(entries, list):
+        raise PolicyLockError(f"Lockfile {path} must define a 'bundles' list.")
+    return PolicyLock(
+        path=path,
+        registry=str(data.get("registry") or ""),
+        bundles=tuple(_bundle_from_entry(entry, path) for entry in entries),
+    )
+
+
+def lock_policy_bundles(
+    bundle_ids: Iterable[str], registry_url: str | None = None, path: Path | None = None
+) -> PolicyLock:
+    """Resolve ``bundle_ids`` against the registry and write them to ``path``."""
+    path = (path or Path(LOCKFILE_NAME)).resolve()
+    bundles: dict[str, PolicyBundle] = {}
+    for bundle_id in bundle_ids:
+        bundle = get_policy_bundle(bundle_id, registry_url)
+        if not bundle.sha256:
+            raise PolicyLockError(f"Bundle '{bundle_id}' has no sha256 in the registry.")
+        bundles[bundle.bundle_id] = bundle
+    lock = PolicyLock(
+        path=str(path),
+        registry=get_policy_registry_url(registry_url),
+        bundles=tuple(bundles[bundle_id] for bundle_id in sorted(bundles)),
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".guardrail-lock-")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(lock.to_dict(), handle, indent=2)
+        handle.write("\n")
+    os.replace(tmp_name, path)
+    return lock
+
+
+def sync_policy_lock(
+    lock: PolicyLock, jobs: int | None = None, store: BundleStore | None = None
+) -> list[tuple[PolicyBundle, Path]]:
+    """Download every pinned bundle into the bundle store in parallel.
+
+    Bundles already stored are not downloaded again, so scans that resolve
+    layers from the lockfile afterwards need no network access.
+    """
+    store = store or get_bundle_store()
+    if not lock.bundles:
+        return []
+    workers = max(1, min(jobs or DEFAULT_SYNC_JOBS, len(lock.bundles)))
+    with tempfile.TemporaryDirectory() as tmp_dir, ThreadPoolExecutor(workers) as executor:
+        paths = executor.map(
+            lambda bundle: fetch_bundle(bundle, Path(tmp_dir), store), lock.bundles
+        )
+        return list(zip(lock.bundles, paths, strict=True))
+
+
+def _bundle_from_entry(entry: Any, path: str) -> PolicyBundle:
+    if not isinstance(entry, dict) or not all(entry.get(key) for key in ("id", "url", "sha256")):
+        raise PolicyLockError(f"Bundles in {path} need 'id', 'url', and 'sha256'.")
+    if not _SHA256_RE.match(str(entry["sha256"])):
+        raise PolicyLockError(f"Bundle '{entry['id']}' in {path} has an invalid sha256.")
+    verification = entry.get("verification")
+    if verification is not None and not isinstance(verification, dict):
+        raise PolicyLockError(f"Bundle '{entry['id']}' in {path} has invalid verification.")
+    return PolicyBundle(
+        bundle_id=str(entry["id"]),
+        title=str(entry.get("title") or entry["id"]),
+        description=str(entry.get("description") or ""),
+        version=entry.get("version"),
+        url=str(entry["url"]),
+        sha256=str(entry["sha256"]),
+        entrypoint=entry.get("entrypoint"),
+        verification=(
+            _verification_from_entry(verification, Path(path).parent) if verification else None
+        ),
+        kind=entry.get("kind") or REGO_BUNDLE_KIND,
+    )
+
+
+def _verification_from_entry(data: dict[str, Any], base: Path) -> BundleVerification:
+    fields = BundleVerification.__dataclass_fields__
+    settings = {key: value for key, value in data.items() if key in fields and value is not None}
+    if settings.get("public_key_path"):
+        # Key paths are relative to the lockfile, not to wherever the scan runs.
+        settings["public_key_path"] = str(base / settings["public_key_path"])
+    return BundleVerification(**settings)
+
+
+def check_lock_registry(lock: PolicyLock, registry_url: str | None) -> None:
+    """Fail when an explicitly configured registry is not the one ``lock`` was made from."""
+    if not registry_url or not lock.registry:
+        return
+    if registry_url.rstrip("/") != lock.registry.rstrip("/"):
+        raise PolicyLockError(
+            f"{lock.path} pins bundles from {lock.registry}, but the configured policy "
+            f"registry is {registry_url}; run `terraform-guardrail policy lock` or unset it."
+        )
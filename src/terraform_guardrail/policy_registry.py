@@ -1,20 +1,39 @@
 from __future__ import annotations
 
 import hashlib
-import io
+import json
 import os
-import shutil
-import subprocess
 import tarfile
 import tempfile
-from dataclasses import dataclass
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 from urllib.parse import urljoin
 
 import requests
 
+from terraform_guardrail.bundle_signature import (
+    DEFAULT_SIGNING_ALGORITHM,
+    SIGNATURES_FILE,
+    BundleSignatureError,
+    verify_bundle,
+)
+from terraform_guardrail.bundle_store import BundleStore, bundle_store_enabled, get_bundle_store
+from terraform_guardrail.http_session import http_get
+
 DEFAULT_POLICY_REGISTRY_URL = "http://localhost:8081"
+POLICY_REGISTRY_URL_ENV = "GUARDRAIL_POLICY_REGISTRY_URL"
+# Registry entries are Rego bundles unless ``"kind": "rules"`` marks a native rule pack.
+REGO_BUNDLE_KIND = "rego"
+RULE_PACK_KIND = "rules"
+REGISTRY_INDEX_TTL_ENV = "GUARDRAIL_REGISTRY_INDEX_TTL"
+DEFAULT_REGISTRY_INDEX_TTL = 60.0
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Smaller bundles stay in memory; larger ones spill to a temp file while downloading.
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
 
 
 class PolicyRegistryError(RuntimeError):
@@ -28,6 +47,7 @@ class BundleVerification:
     public_key_path: str | None = None
     key_id: str | None = None
     scope: str | None = None
+    algorithm: str = DEFAULT_SIGNING_ALGORITHM
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -36,6 +56,7 @@ class BundleVerification:
             "public_key_path": self.public_key_path,
             "key_id": self.key_id,
             "scope": self.scope,
+            "algorithm": self.algorithm,
         }
 
 
@@ -49,6 +70,7 @@ class PolicyBundle:
     sha256: str | None
     entrypoint: str | None = None
     verification: BundleVerification | None = None
+    kind: str = REGO_BUNDLE_KIND
 
     def to_dict(self) -> dict[str, Any]:
         payload = {
@@ -59,6 +81,7 @@ class PolicyBundle:
             "url": self.url,
             "sha256": self.sha256,
             "entrypoint": self.entrypoint,
+            "kind": self.kind,
         }
         if self.verification:
             payload["verification"] = self.verification.to_dict()
@@ -66,15 +89,106 @@ class PolicyBundle:
 
 
 def get_policy_registry_url(override: str | None = None) -> str:
-    return override or os.getenv("GUARDRAIL_POLICY_REGISTRY_URL", DEFAULT_POLICY_REGISTRY_URL)
+    return override or os.getenv(POLICY_REGISTRY_URL_ENV, DEFAULT_POLICY_REGISTRY_URL)
+
+
+@dataclass
+class _IndexEntry:
+    data: dict[str, Any]
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    bundles: list[PolicyBundle] | None = field(default=None)
+
+
+_index_lock = threading.Lock()
+_index_cache: dict[str, _IndexEntry] = {}
+# One lock per index URL, held while it is fetched, so concurrent lookups of the same
+# registry share one request and other registries are not blocked behind it.
+_index_url_locks: dict[str, threading.Lock] = {}
+# (tarball sha256, verification fingerprint) pairs whose signature already checked out.
+_verified_bundles: set[tuple[str, str | None]] = set()
+
+
+def registry_index_ttl() -> float:
+    try:
+        return float(os.getenv(REGISTRY_INDEX_TTL_ENV, str(DEFAULT_REGISTRY_INDEX_TTL)))
+    except ValueError:
+        return DEFAULT_REGISTRY_INDEX_TTL
+
+
+def clear_registry_index_cache() -> None:
+    with _index_lock:
+        _index_cache.clear()
+        _index_url_locks.clear()
 
 
 def fetch_registry_index(registry_url: str | None = None) -> dict[str, Any]:
     base_url = get_policy_registry_url(registry_url).rstrip("/") + "/"
-    response = requests.get(urljoin(base_url, "registry.json"), timeout=10)
+    return _registry_index(base_url).data
+
+
+def _registry_index(base_url: str) -> _IndexEntry:
+    """The cached index for ``base_url``, revalidated once it is older than the TTL.
+
+    Revalidation is conditional (ETag/Last-Modified). When the registry is
+    unreachable or failing the stale copy is served and kept for another TTL
+    before the next attempt.
+    """
+    index_url = urljoin(base_url, "registry.json")
+    with _index_lock:
+        cached = _index_cache.get(index_url)
+        if cached is not None and time.monotonic() - cached.fetched_at < registry_index_ttl():
+            return cached
+        url_lock = _index_url_locks.setdefault(index_url, threading.Lock())
+    with url_lock:
+        with _index_lock:
+            cached = _index_cache.get(index_url)
+        if cached is not None and time.monotonic() - cached.fetched_at < registry_index_ttl():
+            # Another thread revalidated it while this one waited.
+            return cached
+        entry = _fetch_registry_index(index_url, cached)
+        with _index_lock:
+            _index_cache[index_url] = entry
+        return entry
+
+
+def _fetch_registry_index(index_url: str, cached: _IndexEntry | None) -> _IndexEntry:
+    headers: dict[str, str] = {}
+    if cached is not None and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached is not None and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+    try:
+        response = http_get(index_url, timeout=10, headers=headers or None)
+    except requests.RequestException as exc:
+        if cached is not None:
+            return _refreshed(cached)
+        raise PolicyRegistryError(f"Registry lookup failed: {exc}") from exc
+    if response.status_code == 304 and cached is not None:
+        return _refreshed(cached)
     if response.status_code != 200:
+        if cached is not None and response.status_code >= 500:
+            return _refreshed(cached)
         raise PolicyRegistryError(f"Registry lookup failed: {response.status_code}")
-    return response.json()
+    try:
+        data = response.json()
+    except ValueError as exc:
+        if cached is not None:
+            return _refreshed(cached)
+        raise PolicyRegistryError(f"Registry index is not valid JSON: {exc}") from exc
+    return _IndexEntry(
+        data=data,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        fetched_at=time.monotonic(),
+    )
+
+
+def _refreshed(entry: _IndexEntry) -> _IndexEntry:
+    # Restarts the TTL: after a 304 it is fresh, after a failure this backs off retries.
+    entry.fetched_at = time.monotonic()
+    return entry
 
 
 def _resolve_bundle_url(base_url: str, bundle_url: str) -> str:
@@ -85,7 +199,13 @@ def _resolve_bundle_url(base_url: str, bundle_url: str) -> str:
 
 def list_policy_bundles(registry_url: str | None = None) -> list[PolicyBundle]:
     base_url = get_policy_registry_url(registry_url).rstrip("/") + "/"
-    data = fetch_registry_index(base_url)
+    entry = _registry_index(base_url)
+    if entry.bundles is None:
+        entry.bundles = _parse_bundles(entry.data, base_url)
+    return list(entry.bundles)
+
+
+def _parse_bundles(data: dict[str, Any], base_url: str) -> list[PolicyBundle]:
     bundles = data.get("bundles", [])
     if not isinstance(bundles, list):
         raise PolicyRegistryError("Registry bundles must be a list.")
@@ -113,6 +233,7 @@ def list_policy_bundles(registry_url: str | None = None) -> list[PolicyBundle]:
                 sha256=selected_version.get("sha256") or bundle.get("sha256"),
                 entrypoint=entrypoint,
                 verification=verification,
+                kind=bundle.get("kind") or REGO_BUNDLE_KIND,
             )
         )
     return parsed
@@ -126,13 +247,43 @@ def get_policy_bundle(bundle_id: str, registry_url: str | None = None) -> Policy
     raise PolicyRegistryError(f"Bundle '{bundle_id}' not found.")
 
 
-def _safe_extract(tar: tarfile.TarFile, destination: Path) -> None:
+def _safe_extract(
+    tar: tarfile.TarFile,
+    destination: Path,
+    exclude: frozenset[str] = frozenset(),
+    regular_only: bool = False,
+) -> None:
+    """Extract ``tar`` below ``destination``, refusing entries that would land or point outside.
+
+    With ``regular_only`` only files and directories are extracted, as for signed
+    bundles whose file digests were verified.
+    """
     destination = destination.resolve()
+    members: list[tarfile.TarInfo] = []
     for member in tar.getmembers():
+        # ``opa build`` writes member names with a leading slash.
+        member.name = member.name.lstrip("/")
+        if member.name in exclude:
+            continue
         member_path = (destination / member.name).resolve()
-        if not str(member_path).startswith(str(destination)):
+        if not member_path.is_relative_to(destination):
             raise PolicyRegistryError("Unsafe path detected in bundle.")
-    tar.extractall(destination)
+        if member.isfile() or member.isdir():
+            members.append(member)
+            continue
+        if regular_only or not (member.issym() or member.islnk()):
+            raise PolicyRegistryError(f"Unsupported entry type in bundle: {member.name}")
+        if member.issym():
+            if Path(member.linkname).is_absolute():
+                raise PolicyRegistryError("Unsafe link detected in bundle.")
+            target = member_path.parent / member.linkname
+        else:
+            member.linkname = member.linkname.lstrip("/")
+            target = destination / member.linkname
+        if not target.resolve().is_relative_to(destination):
+            raise PolicyRegistryError("Unsafe link detected in bundle.")
+        members.append(member)
+    tar.extractall(destination, members=members)
 
 
 def _select_bundle_version(bundle: dict[str, Any]) -> dict[str, Any]:
@@ -162,6 +313,7 @@ def _parse_verification(data: Any, base_url: str) -> BundleVerification | None:
         public_key_path=data.get("public_key_path"),
         key_id=data.get("key_id"),
         scope=data.get("scope"),
+        algorithm=data.get("algorithm") or DEFAULT_SIGNING_ALGORITHM,
     )
 
 
@@ -174,76 +326,91 @@ def _load_verification_key(verification: BundleVerification) -> str:
             raise PolicyRegistryError("Verification key path not found.")
         return key_path.read_text(encoding="utf-8")
     if verification.public_key_url:
-        response = requests.get(verification.public_key_url, timeout=10)
+        response = http_get(verification.public_key_url, timeout=10)
         if response.status_code != 200:
             raise PolicyRegistryError("Failed to download verification key.")
         return response.text
     raise PolicyRegistryError("Verification key is missing.")
 
 
-def _verify_bundle_signature(bundle: PolicyBundle, bundle_path: Path) -> Path:
+def _verify_bundle_signature(bundle: PolicyBundle, archive: IO[bytes], digest: str) -> None:
+    """Check the bundle's signature in-process; a digest verified once is trusted after that."""
     if not bundle.verification:
-        return bundle_path
-
-    opa_path = shutil.which("opa")
-    if not opa_path:
-        raise PolicyRegistryError("OPA CLI not found for bundle signature verification.")
-
+        return
+    cache_key = (digest, _verification_fingerprint(bundle.verification))
+    if cache_key in _verified_bundles:
+        return
     key_text = _load_verification_key(bundle.verification)
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_dir_path = Path(tmp_dir)
-        key_path = tmp_dir_path / "bundle.pub"
-        key_path.write_text(key_text, encoding="utf-8")
-
-        verified_path = tmp_dir_path / "verified.tar.gz"
-        cmd = [
-            opa_path,
-            "build",
-            "--bundle",
-            str(bundle_path),
-            "--verification-key",
-            str(key_path),
-            "--output",
-            str(verified_path),
-        ]
-        if bundle.verification.key_id:
-            cmd.extend(["--verification-key-id", bundle.verification.key_id])
-        if bundle.verification.scope:
-            cmd.extend(["--scope", bundle.verification.scope])
-
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        if result.returncode != 0:
-            raise PolicyRegistryError(
-                f"Bundle signature verification failed: {result.stderr.strip()}"
-            )
-
-        verified_path_final = bundle_path.parent / f"{bundle.bundle_id}-verified.tar.gz"
-        shutil.copy(verified_path, verified_path_final)
-        return verified_path_final
+    try:
+        verify_bundle(
+            archive,
+            key_text,
+            key_id=bundle.verification.key_id,
+            scope=bundle.verification.scope,
+            algorithm=bundle.verification.algorithm,
+        )
+    except BundleSignatureError as exc:
+        raise PolicyRegistryError(f"Bundle signature verification failed: {exc}") from exc
+    _verified_bundles.add(cache_key)
+
+
+def fetch_bundle(
+    bundle: PolicyBundle, destination: Path, store: BundleStore | None = None
+) -> Path:
+    """Return an extracted, verified copy of ``bundle`` for read-only use.
+
+    Bundles pinned by sha256 come from the local bundle store, downloading and
+    verifying them only on the first use; others are downloaded into
+    ``destination``. ``GUARDRAIL_BUNDLE_STORE=0`` disables the store.
+    """
+    if not bundle.sha256 or not (store is not None or bundle_store_enabled()):
+        return download_bundle(bundle, destination)
+    store = store or get_bundle_store()
+    verification = _verification_fingerprint(bundle.verification)
+    cached = store.lookup(bundle.sha256, verification)
+    if cached is not None:
+        return cached
+    return store.add(
+        bundle.sha256, lambda staging: download_bundle(bundle, staging), verification
+    )
 
 
-def download_bundle(bundle: PolicyBundle, destination: Path) -> Path:
-    response = requests.get(bundle.url, timeout=30)
-    if response.status_code != 200:
-        raise PolicyRegistryError(f"Bundle download failed: {response.status_code}")
-    content = response.content
+def _verification_fingerprint(verification: BundleVerification | None) -> str | None:
+    """Identify the settings a stored bundle's signature was checked with."""
+    if verification is None:
+        return None
+    material = json.dumps(verification.to_dict(), sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
-    if bundle.sha256:
-        digest = hashlib.sha256(content).hexdigest()
-        if digest.lower() != bundle.sha256.lower():
-            raise PolicyRegistryError("Bundle checksum mismatch.")
 
+def download_bundle(bundle: PolicyBundle, destination: Path) -> Path:
     destination.mkdir(parents=True, exist_ok=True)
     bundle_dir = destination / bundle.bundle_id
     bundle_dir.mkdir(parents=True, exist_ok=True)
 
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_bundle_path = Path(tmp_dir) / f"{bundle.bundle_id}.tar.gz"
-        tmp_bundle_path.write_bytes(content)
-        verified_path = _verify_bundle_signature(bundle, tmp_bundle_path)
-        bundle_bytes = verified_path.read_bytes()
-
-    with tarfile.open(fileobj=io.BytesIO(bundle_bytes), mode="r:gz") as tar:
-        _safe_extract(tar, bundle_dir)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        digest = _stream_bundle(bundle, spool)
+        _verify_bundle_signature(bundle, spool, digest)
+        spool.seek(0)
+        # Verified bundles are extracted without their signatures, like ``opa build`` output.
+        exclude = frozenset({SIGNATURES_FILE}) if bundle.verification else frozenset()
+        with tarfile.open(fileobj=spool, mode="r:gz") as tar:
+            _safe_extract(tar, bundle_dir, exclude, regular_only=bundle.verification is not None)
 
     return bundle_dir
+
+
+def _stream_bundle(bundle: PolicyBundle, sink: IO[bytes]) -> str:
+    """Copy the bundle tarball into ``sink`` chunk by chunk, checking its sha256 on the way."""
+    response = http_get(bundle.url, timeout=30, stream=True)
+    with closing(response):
+        if response.status_code != 200:
+            raise PolicyRegistryError(f"Bundle download failed: {response.status_code}")
+        hasher = hashlib.sha256()
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            sink.write(chunk)
+    digest = hasher.hexdigest()
+    if bundle.sha256 and digest != bundle.sha256.lower():
+        raise PolicyRegistryError("Bundle checksum mismatch.")
+    return digest
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 
 DEFAULT_REGISTRY_ROOT = Path("ops/policy-registry")
+REGISTRY_MAX_AGE_ENV = "GUARDRAIL_REGISTRY_MAX_AGE"
+DEFAULT_REGISTRY_MAX_AGE = 60
+# Files are stat'ed at most this often; edits show up within this window.
+RELOAD_CHECK_SECONDS = 1.0
 
 
 def _registry_root() -> Path:
@@ -20,53 +29,154 @@ def _load_json(path: Path) -> dict[str, Any]:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
+@dataclass(frozen=True)
+class _CachedResponse:
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    stamp: tuple[int, int, int]
+    responses: dict[str, _CachedResponse]
+
+
+class _WatchedDocument:
+    """Precomputed responses for one JSON file, rebuilt when the file changes.
+
+    Requests read the current snapshot without locking; a reload builds a new
+    one and swaps it in, so readers never see a half-built index. If the file
+    turns invalid mid-edit, the last good snapshot keeps being served.
+    """
+
+    def __init__(self, path: Path, build: Callable[[dict[str, Any]], dict[str, Any]]):
+        self.path = path
+        self._build = build
+        self._snapshot: _Snapshot | None = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> _CachedResponse | None:
+        snapshot = self._current()
+        return snapshot.responses.get(key)
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < RELOAD_CHECK_SECONDS:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            self._checked_at = time.monotonic()
+            try:
+                stat = self.path.stat()
+            except OSError:
+                if snapshot is not None:
+                    return snapshot
+                raise FileNotFoundError(f"Registry file not found: {self.path}") from None
+            stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if snapshot is not None and snapshot.stamp == stamp:
+                return snapshot
+            try:
+                payloads = self._build(_load_json(self.path))
+                responses = {key: _cached_response(value) for key, value in payloads.items()}
+            except (OSError, ValueError, AttributeError):
+                if snapshot is not None:
+                    return snapshot
+                raise
+            snapshot = _Snapshot(stamp, responses)
+            self._snapshot = snapshot
+            return snapshot
+
+
+def _cached_response(payload: Any) -> _CachedResponse:
+    # Same encoding as FastAPI's JSONResponse.
+    body = json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+    return _CachedResponse(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def _registry_responses(registry: dict[str, Any]) -> dict[str, Any]:
+    entries = registry.get("bundles", [])
+    responses: dict[str, Any] = {"bundles": {"bundles": entries}}
+    for entry in entries:
+        if not isinstance(entry, dict) or "id" not in entry:
+            continue
+        # The first entry wins, matching the old linear search.
+        if f"bundle:{entry['id']}" not in responses:
+            responses[f"bundle:{entry['id']}"] = entry
+            responses[f"versions:{entry['id']}"] = {"versions": entry.get("versions", [])}
+    return responses
+
+
+def _audit_responses(audit: dict[str, Any]) -> dict[str, Any]:
+    by_bundle: dict[str, list[Any]] = {}
+    for entry in audit.get("events", []):
+        if isinstance(entry, dict) and entry.get("bundle_id") is not None:
+            by_bundle.setdefault(entry["bundle_id"], []).append(entry)
+    responses: dict[str, Any] = {"audit": audit}
+    for bundle_id, events in by_bundle.items():
+        responses[f"audit:{bundle_id}"] = {"events": events}
+    return responses
+
+
+def _registry_max_age() -> int:
+    try:
+        return int(os.getenv(REGISTRY_MAX_AGE_ENV, str(DEFAULT_REGISTRY_MAX_AGE)))
+    except ValueError:
+        return DEFAULT_REGISTRY_MAX_AGE
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {item.strip().removeprefix("W/") for item in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
 def create_registry_app() -> FastAPI:
     app = FastAPI(title="Terraform Guardrail Policy Registry", version="0.2.11")
+    root = _registry_root()
+    registry = _WatchedDocument(root / "registry.json", _registry_responses)
+    audit = _WatchedDocument(root / "audit.json", _audit_responses)
+
+    def respond(request: Request, document: _WatchedDocument, key: str, missing: str) -> Response:
+        try:
+            cached = document.get(key)
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+        if cached is None:
+            raise HTTPException(status_code=404, detail=missing)
+        headers = {
+            "ETag": cached.etag,
+            "Cache-Control": f"public, max-age={_registry_max_age()}",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
 
     @app.get("/health")
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
     @app.get("/bundles")
-    def bundles() -> dict[str, Any]:
-        try:
-            registry = _load_json(_registry_root() / "registry.json")
-        except Exception as exc:  # noqa: BLE001
-            raise HTTPException(status_code=500, detail=str(exc)) from exc
-        return {"bundles": registry.get("bundles", [])}
+    def bundles(request: Request) -> Response:
+        return respond(request, registry, "bundles", "Registry not found.")
 
     @app.get("/bundles/{bundle_id}")
-    def bundle(bundle_id: str) -> dict[str, Any]:
-        registry = _load_json(_registry_root() / "registry.json")
-        for entry in registry.get("bundles", []):
-            if entry.get("id") == bundle_id:
-                return entry
-        raise HTTPException(status_code=404, detail="Bundle not found.")
+    def bundle(bundle_id: str, request: Request) -> Response:
+        return respond(request, registry, f"bundle:{bundle_id}", "Bundle not found.")
 
     @app.get("/bundles/{bundle_id}/versions")
-    def bundle_versions(bundle_id: str) -> dict[str, Any]:
-        registry = _load_json(_registry_root() / "registry.json")
-        for entry in registry.get("bundles", []):
-            if entry.get("id") == bundle_id:
-                return {"versions": entry.get("versions", [])}
-        raise HTTPException(status_code=404, detail="Bundle not found.")
+    def bundle_versions(bundle_id: str, request: Request) -> Response:
+        return respond(request, registry, f"versions:{bundle_id}", "Bundle not found.")
 
     @app.get("/audit")
-    def audit_log() -> dict[str, Any]:
-        try:
-            audit = _load_json(_registry_root() / "audit.json")
-        except Exception as exc:  # noqa: BLE001
-            raise HTTPException(status_code=500, detail=str(exc)) from exc
-        return audit
+    def audit_log(request: Request) -> Response:
+        return respond(request, audit, "audit", "Audit log not found.")
 
     @app.get("/bundles/{bundle_id}/audit")
-    def bundle_audit(bundle_id: str) -> dict[str, Any]:
-        audit = _load_json(_registry_root() / "audit.json")
-        entries = [
-            entry for entry in audit.get("events", []) if entry.get("bundle_id") == bundle_id
-        ]
-        if not entries:
-            raise HTTPException(status_code=404, detail="Audit entries not found.")
-        return {"events": entries}
+    def bundle_audit(bundle_id: str, request: Request) -> Response:
+        return respond(request, audit, f"audit:{bundle_id}", "Audit entries not found.")
 
     return app
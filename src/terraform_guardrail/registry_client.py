@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-import requests
+from terraform_guardrail.http_session import http_get
 
 PROVIDER_MAP = {
     "aws": ("hashicorp", "aws"),
@@ -30,7 +30,7 @@ def get_provider_metadata(provider: str) -> dict[str, Any]:
 
     namespace, name = PROVIDER_MAP[provider]
     url = f"https://registry.terraform.io/v1/providers/{namespace}/{name}"
-    response = requests.get(url, timeout=10)
+    response = http_get(url, timeout=10)
     if response.status_code != 200:
         raise RegistryError(f"Registry lookup failed: {response.status_code}")
     data = response.json()
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+from terraform_guardrail.scanner.models import RawFinding
+from terraform_guardrail.scanner.rule_registry import ResourceContext, RuleRegistry
+from terraform_guardrail.scanner.rules import RULES, recommendation_detail
+
+PUBLIC_ACLS = {"public-read", "public-read-write"}
+PUBLIC_CIDRS = {"0.0.0.0/0", "::/0"}
+
+
+def register_rules(registry: RuleRegistry) -> None:
+    # Registration order is the order findings are reported for a resource.
+    registry.register("TG006", ["aws_s3_bucket"])(s3_public_acl)
+    registry.register("TG011", ["aws_s3_bucket"])(s3_missing_encryption)
+    registry.register("TG007", ["aws_s3_bucket_public_access_block"])(s3_public_block_disabled)
+    registry.register("TG008", ["aws_security_group", "aws_security_group_rule"])(
+        security_group_public_ingress
+    )
+    registry.register("TG009", ["aws_iam_policy", "aws_iam_role_policy"])(iam_wildcard_policy)
+    registry.register("TG010", ["aws_instance"])(instance_public_ip)
+    registry.register("TG014", ["aws_instance"])(instance_missing_subnet)
+    registry.register("TG012", ["aws_db_instance", "aws_rds_cluster"])(rds_unencrypted)
+    registry.register("TG015", ["aws_db_instance", "aws_rds_cluster"])(rds_public)
+    registry.register("TG013", ["aws_lb_listener", "aws_alb_listener"])(lb_http_listener)
+    registry.register("TG020", ["aws_ebs_volume"])(ebs_unencrypted)
+    registry.register("TG019", ["azurerm_storage_account"])(azure_storage_public)
+    registry.register("TG016")(missing_required_tags)
+    registry.register("TG017")(region_not_allowed)
+    registry.register("TG018")(instance_type_not_allowed)
+
+
+def s3_public_acl(ctx: ResourceContext) -> Iterator[RawFinding]:
+    acl = _string_value(ctx.attrs.get("acl"))
+    if acl and acl.lower() in PUBLIC_ACLS:
+        yield RawFinding(
+            rule_id="TG006",
+            severity="high",
+            message=f"{RULES['TG006']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Remove public ACLs and use bucket policies."),
+        )
+
+
+def s3_missing_encryption(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if "server_side_encryption_configuration" not in ctx.attrs:
+        yield RawFinding(
+            rule_id="TG011",
+            severity="medium",
+            message=f"{RULES['TG011']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Enable default SSE with KMS or AES256."),
+        )
+
+
+def s3_public_block_disabled(ctx: ResourceContext) -> Iterator[RawFinding]:
+    keys = [
+        "block_public_acls",
+        "block_public_policy",
+        "ignore_public_acls",
+        "restrict_public_buckets",
+    ]
+    for key in keys:
+        value = ctx.attrs.get(key)
+        if value is False or (isinstance(value, str) and value.lower() == "false"):
+            yield RawFinding(
+                rule_id="TG007",
+                severity="high",
+                message=f"{RULES['TG007']}: {ctx.resource_id}",
+                path=ctx.path,
+                detail=recommendation_detail("Enable all public access block flags."),
+            )
+            return
+
+
+def security_group_public_ingress(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if _security_group_is_public(ctx.resource_type, ctx.attrs):
+        yield RawFinding(
+            rule_id="TG008",
+            severity="high",
+            message=f"{RULES['TG008']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Restrict ingress CIDRs to approved ranges."),
+        )
+
+
+def iam_wildcard_policy(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if _iam_policy_is_wildcard(ctx.attrs):
+        yield RawFinding(
+            rule_id="TG009",
+            severity="high",
+            message=f"{RULES['TG009']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Scope IAM actions/resources explicitly."),
+        )
+
+
+def instance_public_ip(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if _truthy(ctx.attrs.get("associate_public_ip_address")):
+        yield RawFinding(
+            rule_id="TG010",
+            severity="medium",
+            message=f"{RULES['TG010']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Remove public IP association for private hosts."),
+        )
+
+
+def instance_missing_subnet(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if "subnet_id" not in ctx.attrs:
+        yield RawFinding(
+            rule_id="TG014",
+            severity="low",
+            message=f"{RULES['TG014']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Attach to an explicit subnet/VPC boundary."),
+        )
+
+
+def rds_unencrypted(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if not _truthy(ctx.attrs.get("storage_encrypted")):
+        yield RawFinding(
+            rule_id="TG012",
+            severity="medium",
+            message=f"{RULES['TG012']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Enable storage_encrypted and KMS keys."),
+        )
+
+
+def rds_public(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if _truthy(ctx.attrs.get("publicly_accessible")):
+        yield RawFinding(
+            rule_id="TG015",
+            severity="high",
+            message=f"{RULES['TG015']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Disable publicly_accessible for databases."),
+        )
+
+
+def lb_http_listener(ctx: ResourceContext) -> Iterator[RawFinding]:
+    protocol = _string_value(ctx.attrs.get("protocol"))
+    if protocol and protocol.upper() == "HTTP":
+        yield RawFinding(
+            rule_id="TG013",
+            severity="medium",
+            message=f"{RULES['TG013']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Use HTTPS listeners with TLS certificates."),
+        )
+
+
+def ebs_unencrypted(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if not _truthy(ctx.attrs.get("encrypted")):
+        yield RawFinding(
+            rule_id="TG020",
+            severity="medium",
+            message=f"{RULES['TG020']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Enable encrypted volumes with KMS."),
+        )
+
+
+def azure_storage_public(ctx: ResourceContext) -> Iterator[RawFinding]:
+    if _truthy(ctx.attrs.get("public_network_access_enabled")):
+        yield RawFinding(
+            rule_id="TG019",
+            severity="medium",
+            message=f"{RULES['TG019']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail=recommendation_detail("Disable public network access or use private endpoints."),
+        )
+
+
+def missing_required_tags(ctx: ResourceContext) -> Iterator[RawFinding]:
+    required = ctx.config.required_tags
+    if not required:
+        return
+    tags = ctx.attrs.get("tags")
+    if not isinstance(tags, dict):
+        tags_all = ctx.attrs.get("tags_all")
+        tags = tags_all if isinstance(tags_all, dict) else {}
+    missing = [tag for tag in required if tag not in tags]
+    if missing:
+        yield RawFinding(
+            rule_id="TG016",
+            severity="low",
+            message=f"{RULES['TG016']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail={"missing_tags": missing},
+        )
+
+
+def region_not_allowed(ctx: ResourceContext) -> Iterator[RawFinding]:
+    allowed_regions = ctx.config.allowed_regions
+    blocked_regions = ctx.config.blocked_regions
+    if not allowed_regions and not blocked_regions:
+        return
+    for key in ("region", "location"):
+        value = _string_value(ctx.attrs.get(key))
+        if not value:
+            continue
+        if allowed_regions and value not in allowed_regions:
+            yield RawFinding(
+                rule_id="TG017",
+                severity="medium",
+                message=f"{RULES['TG017']}: {ctx.resource_id}",
+                path=ctx.path,
+                detail={"value": value, "allowed": list(allowed_regions.values)},
+            )
+            return
+        if blocked_regions and value in blocked_regions:
+            yield RawFinding(
+                rule_id="TG017",
+                severity="medium",
+                message=f"{RULES['TG017']}: {ctx.resource_id}",
+                path=ctx.path,
+                detail={"value": value, "blocked": list(blocked_regions.values)},
+            )
+            return
+
+
+def instance_type_not_allowed(ctx: ResourceContext) -> Iterator[RawFinding]:
+    allowed_instance_types = ctx.config.allowed_instance_types
+    allowed_skus = ctx.config.allowed_skus
+    if not allowed_instance_types and not allowed_skus:
+        return
+    instance_type = _string_value(ctx.attrs.get("instance_type"))
+    if instance_type and allowed_instance_types and instance_type not in allowed_instance_types:
+        yield RawFinding(
+            rule_id="TG018",
+            severity="medium",
+            message=f"{RULES['TG018']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail={"value": instance_type, "allowed": list(allowed_instance_types.values)},
+        )
+    sku = _string_value(ctx.attrs.get("vm_size") or ctx.attrs.get("sku"))
+    if sku and allowed_skus and sku not in allowed_skus:
+        yield RawFinding(
+            rule_id="TG018",
+            severity="medium",
+            message=f"{RULES['TG018']}: {ctx.resource_id}",
+            path=ctx.path,
+            detail={"value": sku, "allowed": list(allowed_skus.values)},
+        )
+
+
+def _as_list(value: object) -> list:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _string_value(value: object) -> str | None:
+    if isinstance(value, str):
+        return value
+    return None
+
+
+def _truthy(value: object) -> bool:
+    if value is True:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in {"true", "yes", "1", "enabled"}
+    return False
+
+
+def _security_group_is_public(resource_type: str, attrs: dict) -> bool:
+    if resource_type == "aws_security_group_rule":
+        if attrs.get("type") != "ingress":
+            return False
+        cidrs = _as_list(attrs.get("cidr_blocks")) + _as_list(attrs.get("ipv6_cidr_blocks"))
+        return any(str(cidr) in PUBLIC_CIDRS for cidr in cidrs)
+
+    for ingress in _as_list(attrs.get("ingress")):
+        if not isinstance(ingress, dict):
+            continue
+        cidrs = _as_list(ingress.get("cidr_blocks")) + _as_list(ingress.get("ipv6_cidr_blocks"))
+        if any(str(cidr) in PUBLIC_CIDRS for cidr in cidrs):
+            return True
+    return False
+
+
+def _iam_policy_is_wildcard(attrs: dict) -> bool:
+    policy = attrs.get("policy")
+    if isinstance(policy, str):
+        text = policy.replace(" ", "")
+        return "\"Action\":\"*\"" in text or "\"Resource\":\"*\"" in text
+    if isinstance(policy, dict):
+        statements = policy.get("Statement") or []
+        for statement in _as_list(statements):
+            if not isinstance(statement, dict):
+                continue
+            actions = _as_list(statement.get("Action"))
+            resources = _as_list(statement.get("Resource"))
+            if "*" in actions or "*" in resources:
+                return True
+    return False
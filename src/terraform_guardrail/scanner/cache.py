@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.scanner.rules import RULESET_VERSION
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "terraform-guardrail"
+DEFAULT_CACHE_MAX_MB = 512
+CACHE_DB_NAME = "scan-cache.sqlite3"
+# Evict down to this fraction of the budget so the next scan does not evict again.
+EVICT_TARGET_RATIO = 0.9
+
+
+class CacheError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    path: str
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    namespaces: dict[str, int] = field(default_factory=dict)
+
+
+def get_cache_dir(override: Path | str | None = None) -> Path:
+    if override:
+        return Path(override)
+    env_dir = os.getenv("GUARDRAIL_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir)
+    return DEFAULT_CACHE_DIR
+
+
+def get_cache_max_bytes(override: int | None = None) -> int:
+    if override is not None:
+        return override
+    try:
+        megabytes = int(os.getenv("GUARDRAIL_CACHE_MAX_MB") or DEFAULT_CACHE_MAX_MB)
+    except ValueError:
+        megabytes = DEFAULT_CACHE_MAX_MB
+    return megabytes * 1024 * 1024
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return "0"
+
+
+HCL2_VERSION = _package_version("python-hcl2")
+GUARDRAIL_VERSION = _package_version("terraform-guardrail")
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def hcl_cache_key(digest: str) -> str:
+    return f"{digest}:hcl2-{HCL2_VERSION}"
+
+
+def findings_cache_key(digest: str, settings_fingerprint: str, suffix: str = "") -> str:
+    # Some rules only apply to certain file types (TG002 to ``.tfvars``), so identical
+    # content under another suffix has different findings.
+    return (
+        f"{digest}{suffix}:hcl2-{HCL2_VERSION}:guardrail-{GUARDRAIL_VERSION}:"
+        f"rules-{RULESET_VERSION}:{settings_fingerprint}"
+    )
+
+
+class ScanCache:
+    """Size-bounded LRU store for parsed HCL trees and per-file findings.
+
+    Entries live in a single SQLite database so parallel CI jobs sharing a cache
+    directory get atomic writes and readers never observe partial values.
+    """
+
+    def __init__(self, root: Path | str | None = None, max_bytes: int | None = None):
+        self.root = get_cache_dir(root)
+        self.max_bytes = get_cache_max_bytes(max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / CACHE_DB_NAME
+        try:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " accessed REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+        except sqlite3.Error as exc:
+            raise CacheError(f"Cache database unavailable: {exc}") from exc
+        self._touched: list[tuple[float, str, str]] = []
+        self._pending: list[tuple[str, str, bytes, int, float]] = []
+
+    def __enter__(self) -> ScanCache:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        row = self._conn.execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        self._touched.append((time.time(), namespace, key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def contains(self, namespace: str, key: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        return row is not None
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 1)
+        self._pending.append((namespace, key, blob, len(blob), time.time()))
+
+    def flush(self) -> None:
+        if not self._touched and not self._pending:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                self._touched,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._touched.clear()
+        self._pending.clear()
+
+    def prune(self, max_bytes: int | None = None) -> int:
+        """Evict least recently used entries until the cache fits in max_bytes."""
+        self.flush()
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        total = self._total_size()
+        if total <= limit:
+            return 0
+        target = int(limit * EVICT_TARGET_RATIO) if limit else 0
+        removed = 0
+        rows = self._conn.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall()
+        doomed: list[tuple[str, str]] = []
+        for namespace, key, size in rows:
+            if total <= target:
+                break
+            doomed.append((namespace, key))
+            total -= size
+            removed += 1
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?", doomed
+            )
+        return removed
+
+    def clear(self) -> int:
+        self.flush()
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM entries")
+        self._conn.execute("VACUUM")
+        return cursor.rowcount
+
+    def stats(self) -> CacheStats:
+        self.flush()
+        namespaces = {
+            namespace: count
+            for namespace, count in self._conn.execute(
+                "SELECT namespace, COUNT(*) FROM entries GROUP BY namespace"
+            )
+        }
+        return CacheStats(
+            path=str(self.db_path),
+            entries=sum(namespaces.values()),
+            size_bytes=self._total_size(),
+            max_bytes=self.max_bytes,
+            namespaces=namespaces,
+        )
+
+    def close(self) -> None:
+        try:
+            self.flush()
+            self.prune()
+        finally:
+            self._conn.close()
+
+    def _total_size(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(row[0])
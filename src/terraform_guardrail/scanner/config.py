@@ -0,0 +1,526 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections.abc import Iterable, Mapping
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.policy_lock import (
+    PolicyLock,
+    PolicyLockError,
+    check_lock_registry,
+    find_lockfile,
+    load_policy_lock,
+)
+from terraform_guardrail.policy_registry import (
+    POLICY_REGISTRY_URL_ENV,
+    RULE_PACK_KIND,
+    PolicyBundle,
+    PolicyRegistryError,
+    fetch_bundle,
+    get_policy_bundle,
+)
+from terraform_guardrail.scanner.native_rules import (
+    RULE_PACK_FILES,
+    NativeRule,
+    RulePackError,
+    load_rule_pack,
+)
+from terraform_guardrail.scanner.rules import BUILTIN_SECRET_PATTERNS, SecretEngine, SecretPattern
+
+try:  # Python 3.11+
+    import tomllib
+except ModuleNotFoundError:  # pragma: no cover - Python 3.10
+    import tomli as tomllib
+
+CONFIG_FILE_NAME = "guardrail.toml"
+DEFAULT_REQUIRED_TAGS = ("owner", "environment", "cost_center")
+CONFIG_ENV_VARS = (
+    "GUARDRAIL_REQUIRED_TAGS",
+    "GUARDRAIL_ALLOWED_REGIONS",
+    "GUARDRAIL_BLOCKED_REGIONS",
+    "GUARDRAIL_ALLOWED_INSTANCE_TYPES",
+    "GUARDRAIL_ALLOWED_SKUS",
+    "GUARDRAIL_POLICY_BASE",
+    "GUARDRAIL_POLICY_ENV",
+    "GUARDRAIL_POLICY_APP",
+    "GUARDRAIL_POLICY_LAYERS",
+    "GUARDRAIL_POLICY_BUNDLE_ID",
+    "GUARDRAIL_SECRET_PACKS",
+    "GUARDRAIL_RULE_PACKS",
+)
+# Rule pack entries with this prefix name a ``"kind": "rules"`` policy registry bundle.
+REGISTRY_RULE_PACK_PREFIX = "registry:"
+
+
+class ConfigError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ValueMatcher:
+    """Allow/deny list matcher: exact values hit a frozenset, glob entries a compiled regex.
+
+    Globs support ``*`` and ``?`` only, matched case-sensitively against the
+    whole value; any other character, ``[`` included, is literal.
+    """
+
+    values: tuple[str, ...] = ()
+    literals: frozenset[str] = field(default=frozenset(), compare=False)
+    pattern: re.Pattern[str] | None = field(default=None, compare=False)
+
+    @classmethod
+    def of(cls, values: Iterable[str]) -> ValueMatcher:
+        ordered = tuple(dict.fromkeys(value for value in values if value))
+        globs = [value for value in ordered if any(char in value for char in "*?")]
+        literals = frozenset(value for value in ordered if value not in globs)
+        pattern = None
+        if globs:
+            pattern = re.compile("|".join(_glob_regex(value) for value in globs))
+        return cls(values=ordered, literals=literals, pattern=pattern)
+
+    def __bool__(self) -> bool:
+        return bool(self.values)
+
+    def __contains__(self, value: object) -> bool:
+        if value in self.literals:
+            return True
+        return bool(self.pattern and isinstance(value, str) and self.pattern.fullmatch(value))
+
+
+def _glob_regex(value: str) -> str:
+    out = []
+    for char in value:
+        if char == "*":
+            out.append(".*")
+        elif char == "?":
+            out.append(".")
+        else:
+            out.append(re.escape(char))
+    return "".join(out)
+
+
+@dataclass(frozen=True)
+class ScanConfig:
+    """Immutable per-scan settings resolved once from flags, env vars, and guardrail.toml."""
+
+    required_tags: tuple[str, ...] = DEFAULT_REQUIRED_TAGS
+    allowed_regions: ValueMatcher = ValueMatcher()
+    blocked_regions: ValueMatcher = ValueMatcher()
+    allowed_instance_types: ValueMatcher = ValueMatcher()
+    allowed_skus: ValueMatcher = ValueMatcher()
+    bundle_ids: tuple[str, ...] = ()
+    layer_names: tuple[str, ...] = ()
+    policy_registry: str | None = None
+    policy_query: str | None = None
+    source: str | None = None
+    secret_packs: tuple[str, ...] = ()
+    secret_patterns: tuple[SecretPattern, ...] = ()
+    rule_packs: tuple[str, ...] = ()
+    native_rules: tuple[NativeRule, ...] = ()
+    policy_lock: PolicyLock | None = None
+
+    @functools.cached_property
+    def fingerprint(self) -> str:
+        """Digest of every setting that changes built-in rule results."""
+        parts = [
+            ",".join(self.required_tags),
+            ",".join(self.allowed_regions.values),
+            ",".join(self.blocked_regions.values),
+            ",".join(self.allowed_instance_types.values),
+            ",".join(self.allowed_skus.values),
+            *(
+                f"{item.pattern_id}:{item.regex.pattern}:{','.join(item.keywords)}"
+                for item in self.secret_patterns
+            ),
+            *(_native_rule_key(rule) for rule in self.native_rules),
+        ]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    @functools.cached_property
+    def secret_engine(self) -> SecretEngine:
+        return SecretEngine(BUILTIN_SECRET_PATTERNS + self.secret_patterns)
+
+
+def _native_rule_key(rule: NativeRule) -> str:
+    # Not repr(): frozenset order follows the per-process string hash seed.
+    data = asdict(rule)
+    if rule.resource_types is not None:
+        data["resource_types"] = sorted(rule.resource_types)
+    return json.dumps(data, sort_keys=True)
+
+
+def load_scan_config(
+    workdir: Path | str | None = None,
+    config_file: Path | str | None = None,
+    policy_bundle: str | None = None,
+    policy_layers: Iterable[str] | None = None,
+    policy_base: str | None = None,
+    policy_env: str | None = None,
+    policy_app: str | None = None,
+    policy_registry: str | None = None,
+    policy_query: str | None = None,
+    use_lockfile: bool = True,
+) -> ScanConfig:
+    """Resolve a ScanConfig; identical inputs (flags, env, file mtime) share one instance.
+
+    Precedence is explicit arguments, then environment variables, then
+    ``guardrail.toml`` (``config_file`` or ``<workdir>/guardrail.toml``).
+    Registry bundles resolve from ``guardrail.lock`` (``GUARDRAIL_LOCKFILE`` or
+    ``<workdir>/guardrail.lock``) when one exists, unless ``use_lockfile`` is False.
+    """
+    toml_path = _find_config_file(workdir, config_file)
+    toml_key = None
+    if toml_path is not None:
+        toml_key = (str(toml_path), toml_path.stat().st_mtime_ns)
+    env = tuple(os.getenv(name) for name in CONFIG_ENV_VARS)
+    config = _build_scan_config(
+        toml_key,
+        env,
+        # Relative pack paths from the environment resolve against it.
+        os.getcwd(),
+        policy_bundle,
+        tuple(policy_layers or ()),
+        policy_base,
+        policy_env,
+        policy_app,
+        policy_registry,
+        policy_query,
+    )
+    if config.secret_packs:
+        pack_keys = []
+        for pack in config.secret_packs:
+            try:
+                pack_keys.append((pack, Path(pack).stat().st_mtime_ns))
+            except OSError as exc:
+                raise ConfigError(f"Secret pattern pack not found: {pack}") from exc
+        config = _with_secret_patterns(config, tuple(pack_keys))
+    if use_lockfile:
+        try:
+            lock_path = find_lockfile(workdir)
+            if lock_path is not None:
+                lock = load_policy_lock(lock_path)
+                check_lock_registry(
+                    lock, config.policy_registry or os.getenv(POLICY_REGISTRY_URL_ENV)
+                )
+                config = _with_policy_lock(config, lock)
+        except PolicyLockError as exc:
+            raise ConfigError(str(exc)) from exc
+    if config.rule_packs:
+        rule_pack_keys = tuple(
+            _rule_pack_key(pack, config.policy_registry, config.policy_lock)
+            for pack in config.rule_packs
+        )
+        config = _with_rule_packs(config, rule_pack_keys)
+    return config
+
+
+@functools.lru_cache(maxsize=64)
+def _build_scan_config(
+    toml_key: tuple[str, int] | None,
+    env_values: tuple[str | None, ...],
+    cwd: str,
+    policy_bundle: str | None,
+    policy_layers: tuple[str, ...],
+    policy_base: str | None,
+    policy_env: str | None,
+    policy_app: str | None,
+    policy_registry: str | None,
+    policy_query: str | None,
+) -> ScanConfig:
+    env = {name: value for name, value in zip(CONFIG_ENV_VARS, env_values, strict=True) if value}
+    file_data = _read_config_file(Path(toml_key[0])) if toml_key else {}
+    rules = file_data.get("rules", {})
+    policy = file_data.get("policy", {})
+    secrets = file_data.get("secrets", {})
+
+    def setting(env_name: str, key: str) -> list[str]:
+        if env_name in env:
+            return split_csv(env[env_name])
+        return _string_list(rules.get(key), key)
+
+    bundle_ids, layer_names = resolve_policy_layers(
+        policy_bundle=policy_bundle,
+        policy_layers=list(policy_layers),
+        policy_base=policy_base,
+        policy_env=policy_env,
+        policy_app=policy_app,
+        environ={**_policy_file_env(policy), **env},
+    )
+    return ScanConfig(
+        required_tags=tuple(setting("GUARDRAIL_REQUIRED_TAGS", "required_tags"))
+        or DEFAULT_REQUIRED_TAGS,
+        allowed_regions=ValueMatcher.of(setting("GUARDRAIL_ALLOWED_REGIONS", "allowed_regions")),
+        blocked_regions=ValueMatcher.of(setting("GUARDRAIL_BLOCKED_REGIONS", "blocked_regions")),
+        allowed_instance_types=ValueMatcher.of(
+            setting("GUARDRAIL_ALLOWED_INSTANCE_TYPES", "allowed_instance_types")
+        ),
+        allowed_skus=ValueMatcher.of(setting("GUARDRAIL_ALLOWED_SKUS", "allowed_skus")),
+        bundle_ids=tuple(bundle_ids),
+        layer_names=tuple(layer_names),
+        policy_registry=policy_registry or policy.get("registry"),
+        policy_query=policy_query or policy.get("query"),
+        source=toml_key[0] if toml_key else None,
+        secret_packs=tuple(_secret_pack_paths(env, secrets, toml_key, Path(cwd))),
+        rule_packs=tuple(_rule_pack_refs(env, rules, toml_key, Path(cwd))),
+    )
+
+
+def _secret_pack_paths(
+    env: Mapping[str, str],
+    secrets: dict[str, Any],
+    toml_key: tuple[str, int] | None,
+    cwd: Path,
+) -> list[str]:
+    if "GUARDRAIL_SECRET_PACKS" in env:
+        return [str((cwd / item).resolve()) for item in split_csv(env["GUARDRAIL_SECRET_PACKS"])]
+    # Packs listed in guardrail.toml are relative to the file itself.
+    base = Path(toml_key[0]).parent if toml_key else cwd
+    return [str((base / item).resolve()) for item in _string_list(secrets.get("packs"), "packs")]
+
+
+def _rule_pack_refs(
+    env: Mapping[str, str],
+    rules: dict[str, Any],
+    toml_key: tuple[str, int] | None,
+    cwd: Path,
+) -> list[str]:
+    if "GUARDRAIL_RULE_PACKS" in env:
+        refs, base = split_csv(env["GUARDRAIL_RULE_PACKS"]), cwd
+    else:
+        refs = _string_list(rules.get("packs"), "packs")
+        base = Path(toml_key[0]).parent if toml_key else cwd
+    return [
+        ref if ref.startswith(REGISTRY_RULE_PACK_PREFIX) else str((base / ref).resolve())
+        for ref in refs
+    ]
+
+
+def _rule_pack_key(
+    pack: str, registry_url: str | None, lock: PolicyLock | None = None
+) -> tuple[str, str]:
+    """Identify a pack's current content: file mtime, or registry URL and digest."""
+    if pack.startswith(REGISTRY_RULE_PACK_PREFIX):
+        bundle = _registry_rule_pack(pack, registry_url, lock)
+        return pack, f"{bundle.url}#{bundle.sha256 or bundle.version or ''}"
+    path = Path(pack)
+    files = [path / name for name in RULE_PACK_FILES] if path.is_dir() else [path]
+    mtimes = [str(item.stat().st_mtime_ns) for item in files if item.exists()]
+    if not mtimes:
+        raise ConfigError(f"Rule pack not found: {pack}")
+    return pack, ",".join(mtimes)
+
+
+def _registry_rule_pack(
+    pack: str, registry_url: str | None, lock: PolicyLock | None = None
+) -> PolicyBundle:
+    bundle_id = pack.removeprefix(REGISTRY_RULE_PACK_PREFIX)
+    try:
+        bundle = lock.get(bundle_id) if lock else get_policy_bundle(bundle_id, registry_url)
+    except (PolicyRegistryError, PolicyLockError) as exc:
+        raise ConfigError(f"Rule pack {pack}: {exc}") from exc
+    if bundle.kind != RULE_PACK_KIND:
+        raise ConfigError(f"Registry bundle '{bundle_id}' is not a rule pack.")
+    return bundle
+
+
+@functools.lru_cache(maxsize=64)
+def _with_policy_lock(config: ScanConfig, lock: PolicyLock) -> ScanConfig:
+    return replace(config, policy_lock=lock)
+
+
+@functools.lru_cache(maxsize=64)
+def _with_rule_packs(config: ScanConfig, pack_keys: tuple[tuple[str, str], ...]) -> ScanConfig:
+    rules: list[NativeRule] = []
+    for pack, _ in pack_keys:
+        try:
+            if pack.startswith(REGISTRY_RULE_PACK_PREFIX):
+                bundle = _registry_rule_pack(pack, config.policy_registry, config.policy_lock)
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    rules.extend(load_rule_pack(fetch_bundle(bundle, Path(tmp_dir))))
+            else:
+                rules.extend(load_rule_pack(Path(pack)))
+        except (RulePackError, PolicyRegistryError) as exc:
+            raise ConfigError(str(exc)) from exc
+    return replace(config, native_rules=tuple(rules))
+
+
+@functools.lru_cache(maxsize=64)
+def _with_secret_patterns(
+    config: ScanConfig, pack_keys: tuple[tuple[str, int], ...]
+) -> ScanConfig:
+    patterns: list[SecretPattern] = []
+    for pack, _ in pack_keys:
+        patterns.extend(load_secret_patterns(Path(pack)))
+    return replace(config, secret_patterns=tuple(patterns))
+
+
+def load_secret_patterns(path: Path) -> list[SecretPattern]:
+    """Load a custom secret pattern pack (JSON or TOML) with a ``patterns`` list.
+
+    Each entry needs ``id``, ``regex``, and ``keywords`` (literals that must
+    appear on a line before the regex is tried); ``description`` and ``severity``
+    are optional.
+    """
+    try:
+        if path.suffix == ".toml":
+            with path.open("rb") as handle:
+                data = tomllib.load(handle)
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ConfigError(f"Invalid secret pattern pack {path}: {exc}") from exc
+    entries = data.get("patterns") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise ConfigError(f"Secret pattern pack {path} must define a 'patterns' list.")
+    patterns = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("id") or not entry.get("regex"):
+            raise ConfigError(f"Secret patterns in {path} need 'id' and 'regex'.")
+        keywords = _string_list(entry.get("keywords"), "keywords")
+        if not keywords:
+            raise ConfigError(f"Secret pattern '{entry['id']}' in {path} needs 'keywords'.")
+        severity = entry.get("severity", "high")
+        if severity not in {"low", "medium", "high"}:
+            raise ConfigError(f"Secret pattern '{entry['id']}' has invalid severity: {severity}")
+        try:
+            regex = re.compile(entry["regex"])
+        except re.error as exc:
+            raise ConfigError(f"Invalid regex for secret pattern '{entry['id']}': {exc}") from exc
+        patterns.append(
+            SecretPattern(
+                pattern_id=str(entry["id"]),
+                regex=regex,
+                keywords=tuple(keywords),
+                description=str(entry.get("description", "")),
+                severity=severity,
+            )
+        )
+    return patterns
+
+
+def resolve_policy_layers(
+    policy_bundle: str | None,
+    policy_layers: list[str] | None,
+    policy_base: str | None,
+    policy_env: str | None,
+    policy_app: str | None,
+    environ: Mapping[str, str] | None = None,
+) -> tuple[list[str], list[str]]:
+    environ = os.environ if environ is None else environ
+    layers: list[str] = []
+    layer_names: list[str] = []
+
+    if policy_base or policy_env or policy_app:
+        if policy_base:
+            layers.append(policy_base)
+            layer_names.append("base")
+        if policy_env:
+            layers.append(policy_env)
+            layer_names.append("env")
+        if policy_app:
+            layers.append(policy_app)
+            layer_names.append("app")
+        return layers, layer_names
+
+    if policy_layers:
+        for idx, bundle in enumerate(policy_layers):
+            if bundle:
+                layers.append(bundle)
+                layer_names.append(f"layer{idx + 1}")
+        if layers:
+            return layers, layer_names
+
+    env_base = environ.get("GUARDRAIL_POLICY_BASE")
+    env_env = environ.get("GUARDRAIL_POLICY_ENV")
+    env_app = environ.get("GUARDRAIL_POLICY_APP")
+    if env_base or env_env or env_app:
+        if env_base:
+            layers.append(env_base)
+            layer_names.append("base")
+        if env_env:
+            layers.append(env_env)
+            layer_names.append("env")
+        if env_app:
+            layers.append(env_app)
+            layer_names.append("app")
+        return layers, layer_names
+
+    env_layers = environ.get("GUARDRAIL_POLICY_LAYERS")
+    if env_layers:
+        for idx, bundle in enumerate(split_csv(env_layers)):
+            layers.append(bundle)
+            layer_names.append(f"layer{idx + 1}")
+        return layers, layer_names
+
+    bundle_id = policy_bundle or environ.get("GUARDRAIL_POLICY_BUNDLE_ID")
+    if bundle_id:
+        layers = split_csv(bundle_id)
+        layer_names = [f"layer{idx + 1}" for idx in range(len(layers))]
+        return layers, layer_names
+
+    return [], []
+
+
+def split_csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _policy_file_env(policy: dict[str, Any]) -> dict[str, str]:
+    # guardrail.toml policy keys map onto the env var names so they share precedence rules.
+    mapping = {
+        "base": "GUARDRAIL_POLICY_BASE",
+        "env": "GUARDRAIL_POLICY_ENV",
+        "app": "GUARDRAIL_POLICY_APP",
+        "layers": "GUARDRAIL_POLICY_LAYERS",
+        "bundle": "GUARDRAIL_POLICY_BUNDLE_ID",
+    }
+    values: dict[str, str] = {}
+    for key, env_name in mapping.items():
+        value = policy.get(key)
+        if isinstance(value, list):
+            value = ",".join(_string_list(value, key))
+        if value:
+            values[env_name] = str(value)
+    return values
+
+
+def _find_config_file(workdir: Path | str | None, config_file: Path | str | None) -> Path | None:
+    if config_file:
+        path = Path(config_file)
+        if not path.exists():
+            raise ConfigError(f"Config file not found: {path}")
+        return path.resolve()
+    if workdir:
+        candidate = Path(workdir) / CONFIG_FILE_NAME
+        if candidate.is_file():
+            return candidate.resolve()
+    return None
+
+
+def _read_config_file(path: Path) -> dict[str, Any]:
+    try:
+        with path.open("rb") as handle:
+            data = tomllib.load(handle)
+    except tomllib.TOMLDecodeError as exc:
+        raise ConfigError(f"Invalid config file {path}: {exc}") from exc
+    for section in ("rules", "policy", "secrets"):
+        if not isinstance(data.get(section, {}), dict):
+            raise ConfigError(f"[{section}] in {path} must be a table.")
+    return data
+
+
+def _string_list(value: Any, key: str) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return split_csv(value)
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return [item.strip() for item in value if item.strip()]
+    raise ConfigError(f"'{key}' must be a list of strings.")
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.scanner.cache import content_digest
+from terraform_guardrail.scanner.models import RawFinding
+
+MANIFEST_VERSION = 2
+DEFAULT_MANIFEST_PATH = Path(".guardrail") / "manifest.json"
+
+
+class WorkspaceManifest:
+    """Per-workspace record of (mtime, size, sha256) and findings from the last scan.
+
+    A file is unchanged when its mtime and size match the stored entry, or when
+    only the mtime moved but the content hash is identical (e.g. after a checkout).
+    """
+
+    def __init__(self, path: Path, root: Path, fingerprint: str):
+        self.path = path
+        self.root = root
+        self.fingerprint = fingerprint
+        self._previous: dict[str, dict[str, Any]] = {}
+        self._current: dict[str, dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: Path, root: Path, fingerprint: str) -> WorkspaceManifest:
+        manifest = cls(path, root, fingerprint)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return manifest
+        if (
+            isinstance(data, dict)
+            and data.get("version") == MANIFEST_VERSION
+            and data.get("fingerprint") == fingerprint
+            and isinstance(data.get("files"), dict)
+        ):
+            manifest._previous = data["files"]
+        return manifest
+
+    def unchanged_findings(self, file_path: Path) -> list[RawFinding] | None:
+        key = self._key(file_path)
+        entry = self._previous.get(key)
+        if entry is None:
+            return None
+        stat = file_path.stat()
+        if entry.get("size") != stat.st_size:
+            return None
+        if entry.get("mtime_ns") != stat.st_mtime_ns:
+            if entry.get("sha256") != content_digest(file_path.read_bytes()):
+                return None
+            entry = {**entry, "mtime_ns": stat.st_mtime_ns}
+        self._current[key] = entry
+        path = sys.intern(str(file_path))
+        return [RawFinding.from_record(item, path) for item in entry.get("findings", [])]
+
+    def record(self, file_path: Path, findings: list[RawFinding]) -> None:
+        stat = file_path.stat()
+        self._current[self._key(file_path)] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": content_digest(file_path.read_bytes()),
+            "findings": [finding.to_record() for finding in findings],
+        }
+
+    def save(self) -> None:
+        payload = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "files": self._current,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so an interrupted scan never leaves a truncated manifest.
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=".manifest-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle, separators=(",", ":"))
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _key(self, file_path: Path) -> str:
+        try:
+            return file_path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return file_path.resolve().as_posix()
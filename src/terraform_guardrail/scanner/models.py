@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import sys
+from collections.abc import Mapping
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Literal
+from typing import Any, Literal, NamedTuple
 
 from pydantic import BaseModel, Field
 
@@ -15,6 +17,63 @@ class Finding(BaseModel):
     detail: dict[str, Any] | None = None
 
 
+class RawFinding(NamedTuple):
+    """Tuple-backed finding used inside the scanner.
+
+    Rule IDs and paths are interned and constant ``detail`` mappings are shared
+    between findings, so they must not be mutated; ``to_model``/``to_dict``
+    copy them at the API/CLI boundary.
+    """
+
+    rule_id: str
+    severity: str
+    message: str
+    path: str | None = None
+    detail: Mapping[str, Any] | None = None
+
+    def to_model(self) -> Finding:
+        # Validated construction runs in pydantic-core and beats model_construct().
+        return Finding(
+            rule_id=self.rule_id,
+            severity=self.severity,
+            message=self.message,
+            path=self.path,
+            detail=self.detail_dict(),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Same shape as ``Finding.model_dump()``."""
+        return {
+            "rule_id": self.rule_id,
+            "severity": self.severity,
+            "message": self.message,
+            "path": self.path,
+            "detail": self.detail_dict(),
+        }
+
+    def to_record(self) -> list[Any]:
+        """Path-free form stored in the scan cache and incremental manifest."""
+        return [self.rule_id, self.severity, self.message, self.detail_dict()]
+
+    def detail_dict(self) -> dict[str, Any] | None:
+        return dict(self.detail) if self.detail is not None else None
+
+    @classmethod
+    def from_record(cls, record: list[Any], path: str) -> RawFinding:
+        rule_id, severity, message, detail = record
+        return cls(sys.intern(rule_id), sys.intern(severity), message, path, detail)
+
+    @classmethod
+    def from_model(cls, finding: Finding) -> RawFinding:
+        return cls(
+            sys.intern(finding.rule_id),
+            finding.severity,
+            finding.message,
+            finding.path,
+            finding.detail,
+        )
+
+
 class ScanSummary(BaseModel):
     scanned_files: int = 0
     findings: int = 0
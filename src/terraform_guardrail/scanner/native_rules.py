@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from terraform_guardrail.scanner.models import RawFinding
+
+if TYPE_CHECKING:
+    from terraform_guardrail.scanner.rule_registry import ResourceContext
+
+try:  # Python 3.11+
+    import tomllib
+except ModuleNotFoundError:  # pragma: no cover - Python 3.10
+    import tomli as tomllib
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - optional dependency
+    yaml = None  # type: ignore[assignment]
+
+# A directory pack (such as one downloaded from the policy registry) holds one of these.
+RULE_PACK_FILES = ("rules.json", "rules.toml", "rules.yaml", "rules.yml")
+CHECK_OPERATORS = ("exists", "equals", "not_equals", "in", "not_in", "matches", "not_matches")
+SEVERITIES = {"low", "medium", "high"}
+_YAML_ERRORS: tuple[type[Exception], ...] = (yaml.YAMLError,) if yaml is not None else ()
+
+
+class RulePackError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class NativeCheck:
+    attribute: str
+    operator: str
+    # Hashable form of the JSON operand: lists become tuples.
+    operand: Any
+    optional: bool = False
+
+
+@dataclass(frozen=True)
+class NativeRule:
+    """One declarative attribute rule; resources violating any of its checks get a finding."""
+
+    rule_id: str
+    description: str
+    severity: str
+    checks: tuple[NativeCheck, ...]
+    resource_types: frozenset[str] | None = None
+    recommendation: str | None = None
+
+
+def load_rule_pack(path: Path) -> list[NativeRule]:
+    """Load a rule pack (JSON, TOML, or YAML with PyYAML) with a ``rules`` list.
+
+    ``path`` may be the file itself or a directory containing ``rules.json``,
+    ``rules.toml``, ``rules.yaml``, or ``rules.yml``.
+    """
+    if path.is_dir():
+        candidates = [path / name for name in RULE_PACK_FILES if (path / name).is_file()]
+        if not candidates:
+            raise RulePackError(f"Rule pack directory {path} has no {' or '.join(RULE_PACK_FILES)}")
+        path = candidates[0]
+    try:
+        if path.suffix == ".toml":
+            with path.open("rb") as handle:
+                data = tomllib.load(handle)
+        elif path.suffix in {".yaml", ".yml"}:
+            if yaml is None:
+                raise RulePackError("YAML rule packs require PyYAML: pip install pyyaml")
+            data = yaml.safe_load(path.read_text(encoding="utf-8"))
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError, *_YAML_ERRORS) as exc:
+        raise RulePackError(f"Invalid rule pack {path}: {exc}") from exc
+    entries = data.get("rules") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise RulePackError(f"Rule pack {path} must define a 'rules' list.")
+    return [_parse_rule(entry, path) for entry in entries]
+
+
+def compile_native_rule(rule: NativeRule) -> Callable[[ResourceContext], Iterator[RawFinding]]:
+    """Turn ``rule`` into a registry handler; checks become closures over their operands."""
+    predicates = [(check, _compile_check(check)) for check in rule.checks]
+
+    def handler(ctx: ResourceContext) -> Iterator[RawFinding]:
+        for check, predicate in predicates:
+            if predicate(ctx.attrs):
+                continue
+            detail: dict[str, Any] = {"attribute": check.attribute}
+            if rule.recommendation:
+                detail["recommendation"] = rule.recommendation
+            yield RawFinding(
+                rule_id=rule.rule_id,
+                severity=rule.severity,
+                message=f"{rule.description}: {ctx.resource_id}",
+                path=ctx.path,
+                detail=detail,
+            )
+            return
+
+    return handler
+
+
+def _parse_rule(entry: Any, path: Path) -> NativeRule:
+    if not isinstance(entry, dict) or not entry.get("id") or not entry.get("description"):
+        raise RulePackError(f"Rules in {path} need 'id' and 'description'.")
+    rule_id = str(entry["id"])
+    severity = entry.get("severity", "medium")
+    if severity not in SEVERITIES:
+        raise RulePackError(f"Rule '{rule_id}' has invalid severity: {severity}")
+    # A rule lists its checks under ``require``, or is itself a single check.
+    raw_checks = entry.get("require", [entry])
+    if not isinstance(raw_checks, list) or not raw_checks:
+        raise RulePackError(f"Rule '{rule_id}' in {path} needs at least one check.")
+    types = entry.get("resource_types")
+    if types is not None and not (
+        isinstance(types, list) and all(isinstance(item, str) for item in types)
+    ):
+        raise RulePackError(f"Rule '{rule_id}': 'resource_types' must be a list of strings.")
+    recommendation = entry.get("recommendation")
+    return NativeRule(
+        rule_id=rule_id,
+        description=str(entry["description"]),
+        severity=severity,
+        checks=tuple(_parse_check(check, rule_id) for check in raw_checks),
+        resource_types=frozenset(types) if types else None,
+        recommendation=str(recommendation) if recommendation else None,
+    )
+
+
+def _parse_check(check: Any, rule_id: str) -> NativeCheck:
+    if not isinstance(check, dict) or not isinstance(check.get("attribute"), str):
+        raise RulePackError(f"Checks in rule '{rule_id}' need an 'attribute'.")
+    operators = [name for name in CHECK_OPERATORS if name in check]
+    if len(operators) != 1:
+        raise RulePackError(
+            f"Rule '{rule_id}' check on '{check['attribute']}' needs exactly one of "
+            f"{', '.join(CHECK_OPERATORS)}."
+        )
+    operator = operators[0]
+    operand = check[operator]
+    if operator == "exists" and not isinstance(operand, bool):
+        raise RulePackError(f"Rule '{rule_id}': 'exists' takes true or false.")
+    if operator in {"in", "not_in"} and not isinstance(operand, list):
+        raise RulePackError(f"Rule '{rule_id}': '{operator}' takes a list.")
+    if operator in {"matches", "not_matches"}:
+        try:
+            re.compile(operand)
+        except (re.error, TypeError) as exc:
+            raise RulePackError(f"Invalid regex in rule '{rule_id}': {exc}") from exc
+    if isinstance(operand, dict):
+        raise RulePackError(f"Rule '{rule_id}': operands must be scalars or lists.")
+    return NativeCheck(
+        attribute=check["attribute"],
+        operator=operator,
+        operand=_freeze(operand),
+        optional=bool(check.get("optional", False)),
+    )
+
+
+def _compile_check(check: NativeCheck) -> Callable[[dict[str, Any]], bool]:
+    keys = check.attribute.split(".")
+    operand = check.operand
+    test: Callable[[Any], bool]
+    if check.operator == "exists":
+
+        def exists(attrs: dict[str, Any]) -> bool:
+            return bool(_resolve(attrs, keys)) is operand
+
+        return exists
+    if check.operator == "equals":
+        test = lambda value: _freeze(value) == operand  # noqa: E731
+    elif check.operator == "not_equals":
+        test = lambda value: _freeze(value) != operand  # noqa: E731
+    elif check.operator == "in":
+        test = lambda value: _freeze(value) in operand  # noqa: E731
+    elif check.operator == "not_in":
+        test = lambda value: _freeze(value) not in operand  # noqa: E731
+    else:
+        regex = re.compile(operand)
+        expected = check.operator == "matches"
+
+        def test(value: Any) -> bool:
+            return isinstance(value, str) and (regex.search(value) is not None) is expected
+
+    def predicate(attrs: dict[str, Any]) -> bool:
+        values = _resolve(attrs, keys)
+        if not values:
+            return check.optional
+        # Interpolations are unknown until plan time, so they never fail a check.
+        return all(_is_interpolated(value) or test(value) for value in values)
+
+    return predicate
+
+
+def _resolve(attrs: dict[str, Any], keys: list[str]) -> list[Any]:
+    """Values at a dotted path, descending into every instance of repeated blocks."""
+    nodes: list[Any] = [attrs]
+    for key in keys:
+        found: list[Any] = []
+        for node in nodes:
+            for item in node if isinstance(node, list) else (node,):
+                if not isinstance(item, dict):
+                    continue
+                # python-hcl2 8.x keeps quotes on quoted map keys.
+                if key in item:
+                    found.append(item[key])
+                elif f'"{key}"' in item:
+                    found.append(item[f'"{key}"'])
+        nodes = found
+    return [_unquote(node) for node in nodes]
+
+
+def _unquote(value: Any) -> Any:
+    if isinstance(value, str) and len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    if isinstance(value, list):
+        return [_unquote(item) for item in value]
+    return value
+
+
+def _is_interpolated(value: Any) -> bool:
+    return isinstance(value, str) and "${" in value
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OPA_MODE_ENV = "GUARDRAIL_OPA_MODE"
+MAX_SERVERS_ENV = "GUARDRAIL_OPA_MAX_SERVERS"
+IDLE_TIMEOUT_ENV = "GUARDRAIL_OPA_IDLE_TIMEOUT"
+DEFAULT_MAX_SERVERS = 8
+DEFAULT_IDLE_TIMEOUT = 300.0
+OPA_SERVER_HOST = "127.0.0.1"
+SERVER_START_TIMEOUT = 15.0
+REQUEST_TIMEOUT = 120.0
+_DATA_QUERY_RE = re.compile(r"^data((?:\.[A-Za-z_][A-Za-z0-9_]*)+)$")
+
+
+class OpaServerError(RuntimeError):
+    pass
+
+
+def server_mode_enabled() -> bool:
+    return os.getenv(OPA_MODE_ENV, "").strip().lower() == "server"
+
+
+def max_opa_servers() -> int:
+    try:
+        return max(1, int(os.getenv(MAX_SERVERS_ENV, str(DEFAULT_MAX_SERVERS))))
+    except ValueError:
+        return DEFAULT_MAX_SERVERS
+
+
+def opa_idle_timeout() -> float:
+    try:
+        return float(os.getenv(IDLE_TIMEOUT_ENV, str(DEFAULT_IDLE_TIMEOUT)))
+    except ValueError:
+        return DEFAULT_IDLE_TIMEOUT
+
+
+def query_data_path(query: str) -> str | None:
+    """Map ``data.a.b.c`` to the ``/v1/data`` path ``a/b/c``.
+
+    Other query forms return None and are left to ``opa eval``.
+    """
+    match = _DATA_QUERY_RE.match(query.strip())
+    if not match:
+        return None
+    return match.group(1)[1:].replace(".", "/")
+
+
+class OpaServer:
+    """One ``opa run --server`` process serving a single bundle over localhost.
+
+    The process is started lazily, reused across evaluations through a pooled
+    HTTP session, and restarted if it has exited, drops a connection, or was
+    stopped for being idle. Once closed it refuses to start again.
+    """
+
+    def __init__(
+        self,
+        opa_path: str,
+        prepare: Callable[[Path], Path],
+        fingerprint: tuple[Any, ...] = (),
+    ):
+        self.opa_path = opa_path
+        self.fingerprint = fingerprint
+        self._prepare = prepare
+        self._bundle_path: Path | None = None
+        self._workdir: Path | None = None
+        self._process: subprocess.Popen[bytes] | None = None
+        self._base_url: str | None = None
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._retired = False
+        self._closed = False
+        self.last_used = time.monotonic()
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+
+    @property
+    def pid(self) -> int | None:
+        return self._process.pid if self._process is not None else None
+
+    @property
+    def in_use(self) -> bool:
+        return self._in_use > 0
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._in_use += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_use -= 1
+            self.last_used = time.monotonic()
+            close = self._retired and not self._in_use
+        if close:
+            self.close()
+
+    def retire(self) -> None:
+        """Close now, or when the last holder releases it."""
+        with self._lock:
+            self._retired = True
+            close = not self._in_use
+        if close:
+            self.close()
+
+    def evaluate(self, data_path: str, input_payload: dict[str, Any]) -> Any:
+        self.acquire()
+        try:
+            return self._evaluate(data_path, input_payload)
+        finally:
+            self.release()
+
+    def _evaluate(self, data_path: str, input_payload: dict[str, Any]) -> Any:
+        body = json.dumps({"input": input_payload}).encode("utf-8")
+        for attempt in range(2):
+            base_url = self._ensure_running()
+            try:
+                response = self._session.post(
+                    f"{base_url}/v1/data/{data_path}",
+                    data=body,
+                    headers={"Content-Type": "application/json"},
+                    timeout=REQUEST_TIMEOUT,
+                )
+            except requests.ConnectionError as exc:
+                # The server died between the liveness check and the request.
+                if attempt:
+                    raise OpaServerError(f"OPA server unreachable: {exc}") from exc
+                with self._lock:
+                    self._stop_process()
+                continue
+            if response.status_code != 200:
+                raise OpaServerError(
+                    f"OPA server returned {response.status_code}: {response.text.strip()[:500]}"
+                )
+            try:
+                return response.json().get("result")
+            except ValueError as exc:
+                raise OpaServerError(f"OPA server response is not valid JSON: {exc}") from exc
+        raise OpaServerError("OPA server unreachable")
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._stop_process()
+            self._session.close()
+            if self._workdir is not None:
+                shutil.rmtree(self._workdir, ignore_errors=True)
+                self._workdir = None
+                self._bundle_path = None
+
+    def stop_if_idle(self, max_idle: float) -> bool:
+        """Stop the process (keeping the bundle) if unused for ``max_idle`` seconds."""
+        with self._lock:
+            idle = time.monotonic() - self.last_used
+            if self._process is None or self._in_use or idle < max_idle:
+                return False
+            self._stop_process()
+            return True
+
+    def prepared_bundle(self) -> Path:
+        """Materialise the bundle (once) without starting the server."""
+        with self._lock:
+            return self._prepare_bundle()
+
+    def _prepare_bundle(self) -> Path:
+        if self._closed:
+            raise OpaServerError("OPA server was closed")
+        if self._bundle_path is None:
+            workdir = Path(tempfile.mkdtemp(prefix="guardrail-opa-"))
+            try:
+                self._bundle_path = self._prepare(workdir)
+            except BaseException:
+                shutil.rmtree(workdir, ignore_errors=True)
+                raise
+            self._workdir = workdir
+        return self._bundle_path
+
+    def _ensure_running(self) -> str:
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            assert self._base_url is not None
+            return self._base_url
+
+    def _start(self) -> None:
+        self._stop_process()
+        bundle_path = self._prepare_bundle()
+        port = _free_port()
+        base_url = f"http://{OPA_SERVER_HOST}:{port}"
+        cmd = [
+            self.opa_path,
+            "run",
+            "--server",
+            "--addr",
+            f"{OPA_SERVER_HOST}:{port}",
+            "--log-level",
+            "error",
+            "--bundle",
+            str(bundle_path),
+        ]
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr)
+            deadline = time.monotonic() + SERVER_START_TIMEOUT
+            while True:
+                if process.poll() is not None:
+                    stderr.seek(0)
+                    message = stderr.read().decode("utf-8", "replace").strip()
+                    raise OpaServerError(message or "OPA server exited during startup")
+                try:
+                    if self._session.get(f"{base_url}/health", timeout=1).status_code == 200:
+                        break
+                except requests.ConnectionError:
+                    pass
+                if time.monotonic() > deadline:
+                    _terminate(process)
+                    raise OpaServerError("OPA server did not become healthy in time")
+                time.sleep(0.05)
+        self._process = process
+        self._base_url = base_url
+
+    def _stop_process(self) -> None:
+        if self._process is not None:
+            _terminate(self._process)
+        self._process = None
+        self._base_url = None
+
+
+_SERVERS: OrderedDict[str, OpaServer] = OrderedDict()
+_SERVERS_LOCK = threading.Lock()
+_reaper_pid: int | None = None
+
+
+@contextlib.contextmanager
+def lease_opa_server(
+    slot: str,
+    opa_path: str,
+    prepare: Callable[[Path], Path],
+    fingerprint: tuple[Any, ...] = (),
+) -> Iterator[OpaServer]:
+    """Lease the server for ``slot``, replacing it when the bundle fingerprint changed.
+
+    ``prepare`` receives a private working directory and returns the bundle path
+    to load; it only runs when a new server is created. At most
+    ``GUARDRAIL_OPA_MAX_SERVERS`` servers are kept, closing the least recently
+    used one that is not leased, and processes idle for
+    ``GUARDRAIL_OPA_IDLE_TIMEOUT`` seconds are stopped until their next evaluation.
+    """
+    _start_reaper()
+    evicted: list[OpaServer] = []
+    with _SERVERS_LOCK:
+        server = _SERVERS.get(slot)
+        if server is None or server.fingerprint != fingerprint or server.opa_path != opa_path:
+            if server is not None:
+                evicted.append(server)
+            server = _SERVERS[slot] = OpaServer(opa_path, prepare, fingerprint)
+        _SERVERS.move_to_end(slot)
+        # Taken under the pool lock so a concurrent lease cannot evict it first.
+        server.acquire()
+        limit = max_opa_servers()
+        # Leased servers are skipped; the pool shrinks back once they are released.
+        for other_slot, other in list(_SERVERS.items()):
+            if len(_SERVERS) <= limit:
+                break
+            if other is not server and not other.in_use:
+                evicted.append(_SERVERS.pop(other_slot))
+    for stale in evicted:
+        stale.retire()
+    try:
+        yield server
+    finally:
+        server.release()
+
+
+def stop_idle_opa_servers(max_idle: float | None = None) -> int:
+    """Stop server processes idle for ``max_idle`` seconds; return how many were stopped."""
+    max_idle = opa_idle_timeout() if max_idle is None else max_idle
+    with _SERVERS_LOCK:
+        servers = list(_SERVERS.values())
+    return sum(server.stop_if_idle(max_idle) for server in servers)
+
+
+def _start_reaper() -> None:
+    global _reaper_pid
+    with _SERVERS_LOCK:
+        # Threads do not survive fork, so a forked worker starts its own.
+        if _reaper_pid == os.getpid() or opa_idle_timeout() <= 0:
+            return
+        _reaper_pid = os.getpid()
+
+    def reap() -> None:
+        while True:
+            timeout = opa_idle_timeout()
+            time.sleep(max(1.0, timeout / 2))
+            if timeout > 0:
+                stop_idle_opa_servers(timeout)
+
+    threading.Thread(target=reap, name="guardrail-opa-reaper", daemon=True).start()
+
+
+def bundle_path_fingerprint(path: Path) -> tuple[Any, ...]:
+    """Cheap change detector for a local bundle file or directory."""
+    try:
+        if path.is_dir():
+            stats = [item.stat() for item in path.rglob("*") if item.is_file()]
+            return (len(stats), max((s.st_mtime_ns for s in stats), default=0))
+        stat = path.stat()
+    except OSError:
+        return ()
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def shutdown_opa_servers() -> None:
+    with _SERVERS_LOCK:
+        servers = list(_SERVERS.values())
+        _SERVERS.clear()
+    for server in servers:
+        server.close()
+
+
+atexit.register(shutdown_opa_servers)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((OPA_SERVER_HOST, 0))
+        return int(sock.getsockname()[1])
+
+
+def _terminate(process: subprocess.Popen[bytes]) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
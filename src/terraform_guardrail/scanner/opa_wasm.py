@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.scanner.cache import get_cache_dir
+from terraform_guardrail.scanner.opa_server import OPA_MODE_ENV
+from terraform_guardrail.scanner.policy_input import MANIFEST_NAME, read_bundle_manifest
+
+WASM_CACHE_SUBDIR = "policy-wasm"
+WASM_MODULE_NAME = "policy.wasm"
+WASM_DATA_NAME = "data.json"
+# Instantiated modules hold their own linear memory, so only a few stay loaded.
+WASM_MEMO_SIZE = 8
+_WASM_PAGE_SIZE = 65536
+_FORMAT_VERB_RE = re.compile(r"%([-+# 0]*)(\d+)?(?:\.(\d+))?([%vsdqtfeEgGxXob])")
+
+
+class WasmPolicyError(RuntimeError):
+    pass
+
+
+class WasmUnsupported(RuntimeError):
+    """The module needs builtins the in-process engine does not provide; use the OPA CLI."""
+
+
+_POLICIES: OrderedDict[Path, WasmPolicy] = OrderedDict()
+_POLICIES_LOCK = threading.Lock()
+
+
+def wasm_mode_enabled() -> bool:
+    return os.getenv(OPA_MODE_ENV, "").strip().lower() == "wasm"
+
+
+def wasm_cache_key(bundle_digest: str, entrypoint: str) -> str:
+    return hashlib.sha256(f"{bundle_digest}\0{entrypoint}".encode()).hexdigest()
+
+
+def wasm_cache_dir(cache_dir: Path | str | None = None) -> Path:
+    return get_cache_dir(cache_dir) / WASM_CACHE_SUBDIR
+
+
+def wasm_cache_usage(cache_dir: Path | str | None = None) -> tuple[int, int]:
+    """Return the number of compiled policies and their total size in bytes."""
+    root = wasm_cache_dir(cache_dir)
+    modules = list(root.glob(f"*/{WASM_MODULE_NAME}"))
+    size = sum(item.stat().st_size for module in modules for item in module.parent.iterdir())
+    return len(modules), size
+
+
+def clear_wasm_cache(cache_dir: Path | str | None = None) -> int:
+    removed = 0
+    for compiled in wasm_cache_dir(cache_dir).glob("*/"):
+        shutil.rmtree(compiled, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def compiled_wasm_bundle(
+    opa_path: str | None,
+    materialize: Callable[[Path], Path],
+    entrypoint: str,
+    key: str,
+    cache_dir: Path | str | None = None,
+) -> Path:
+    """Return the cached ``opa build -t wasm`` output for ``key``, building it on a miss.
+
+    The directory holds ``policy.wasm``, ``data.json`` and the source bundle's
+    ``.manifest``. ``materialize`` is only called, and OPA only needed, on a miss.
+    """
+    target = wasm_cache_dir(cache_dir) / key
+    if (target / WASM_MODULE_NAME).is_file():
+        return target
+    if opa_path is None:
+        raise WasmPolicyError("OPA CLI not found. Install OPA to compile policy bundles.")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=target.parent, prefix=".build-") as tmp_dir:
+        tmp_dir_path = Path(tmp_dir)
+        source = materialize(tmp_dir_path / "source")
+        output = tmp_dir_path / "bundle.tar.gz"
+        cmd = [
+            opa_path,
+            "build",
+            "--target",
+            "wasm",
+            "--entrypoint",
+            entrypoint,
+            "--output",
+            str(output),
+            "--bundle",
+            str(source),
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise WasmPolicyError(result.stderr.strip() or "opa build failed")
+        staging = tmp_dir_path / "compiled"
+        staging.mkdir()
+        _extract_wasm_output(output, staging)
+        manifest = read_bundle_manifest(source)
+        (staging / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+        try:
+            staging.rename(target)
+        except OSError:
+            # Another process finished the same build first.
+            if not (target / WASM_MODULE_NAME).is_file():
+                raise
+    return target
+
+
+def load_wasm_policy(compiled_dir: Path) -> WasmPolicy:
+    """Instantiate (or reuse) the module compiled into ``compiled_dir``."""
+    with _POLICIES_LOCK:
+        if compiled_dir in _POLICIES:
+            _POLICIES.move_to_end(compiled_dir)
+            return _POLICIES[compiled_dir]
+    data_path = compiled_dir / WASM_DATA_NAME
+    data = json.loads(data_path.read_text(encoding="utf-8")) if data_path.is_file() else {}
+    policy = WasmPolicy((compiled_dir / WASM_MODULE_NAME).read_bytes(), data)
+    with _POLICIES_LOCK:
+        _POLICIES[compiled_dir] = policy
+        while len(_POLICIES) > WASM_MEMO_SIZE:
+            _POLICIES.popitem(last=False)
+    return policy
+
+
+class WasmPolicy:
+    """An OPA Wasm module instantiated in-process with ``wasmtime``.
+
+    Evaluations are serialised on a lock; each one resets the heap to where it
+    stood after ``data`` was loaded, so the module's memory does not grow with
+    the number of scans.
+    """
+
+    def __init__(self, module: bytes, data: Any = None):
+        wasmtime = _import_wasmtime()
+        self._lock = threading.Lock()
+        self._store = wasmtime.Store(wasmtime.Engine())
+        compiled = wasmtime.Module(self._store.engine, module)
+        self._memory: Any = None
+        imports: list[Any] = []
+        for item in compiled.imports:
+            if item.name == "memory":
+                self._memory = wasmtime.Memory(self._store, item.type)
+                imports.append(self._memory)
+            else:
+                handler = self._import_handler(item.name)
+                imports.append(wasmtime.Func(self._store, item.type, handler))
+        if self._memory is None:
+            raise WasmPolicyError("Policy module does not import its memory")
+        instance = wasmtime.Instance(self._store, compiled, imports)
+        self._exports = instance.exports(self._store)
+
+        builtins = self._dump(self._call("builtins"))
+        unsupported = sorted(set(builtins) - HOST_BUILTINS.keys())
+        if unsupported:
+            raise WasmUnsupported(f"Policy uses builtins not available in-process: {unsupported}")
+        self._builtins = {builtin_id: HOST_BUILTINS[name] for name, builtin_id in builtins.items()}
+        self._entrypoints: dict[str, int] = self._dump(self._call("entrypoints"))
+        self._data = self._parse_json(json.dumps(data or {}).encode("utf-8"))
+        self._base_heap = self._call("opa_heap_ptr_get")
+
+    def evaluate(self, input_payload: Any, entrypoint: str | None = None) -> Any:
+        """Return the entrypoint's value for ``input_payload``, or None if undefined."""
+        if entrypoint is None:
+            entrypoint_id = 0
+        elif entrypoint in self._entrypoints:
+            entrypoint_id = self._entrypoints[entrypoint]
+        else:
+            raise WasmPolicyError(f"Policy module has no entrypoint {entrypoint}")
+        raw = json.dumps(input_payload, separators=(",", ":"), default=str).encode("utf-8")
+        with self._lock:
+            self._call("opa_heap_ptr_set", self._base_heap)
+            if self._exports.get("opa_eval") is not None:
+                results = self._eval_fast(entrypoint_id, raw)
+            else:
+                results = self._eval_context(entrypoint_id, raw)
+        if not results:
+            return None
+        return results[0].get("result")
+
+    def _eval_fast(self, entrypoint_id: int, raw: bytes) -> Any:
+        # ABI 1.2: the input is written at the heap pointer and parsed by opa_eval itself.
+        input_addr = self._base_heap
+        self._reserve(input_addr + len(raw))
+        self._memory.write(self._store, raw, input_addr)
+        result_addr = self._call(
+            "opa_eval", 0, entrypoint_id, self._data, input_addr, len(raw), input_addr + len(raw), 0
+        )
+        return json.loads(self._read_string(result_addr))
+
+    def _eval_context(self, entrypoint_id: int, raw: bytes) -> Any:
+        input_value = self._parse_json(raw)
+        ctx = self._call("opa_eval_ctx_new")
+        self._call("opa_eval_ctx_set_input", ctx, input_value)
+        self._call("opa_eval_ctx_set_data", ctx, self._data)
+        self._call("opa_eval_ctx_set_entrypoint", ctx, entrypoint_id)
+        self._call("eval", ctx)
+        return self._dump(self._call("opa_eval_ctx_get_result", ctx))
+
+    def _import_handler(self, name: str) -> Callable[..., Any]:
+        if name == "opa_abort":
+
+            def abort(addr: int) -> None:
+                raise WasmPolicyError(f"Policy aborted: {self._read_string(addr)}")
+
+            return abort
+        if name == "opa_println":
+            return lambda _addr: None
+        if name.startswith("opa_builtin"):
+
+            def builtin(builtin_id: int, _ctx: int, *args: int) -> int:
+                result = self._builtins[builtin_id](*(self._dump(arg) for arg in args))
+                return self._parse_json(json.dumps(result).encode("utf-8"))
+
+            return builtin
+        raise WasmUnsupported(f"Policy module imports unknown function {name}")
+
+    def _call(self, name: str, *args: int) -> Any:
+        function = self._exports.get(name)
+        if function is None:
+            raise WasmPolicyError(f"Policy module does not export {name}")
+        try:
+            return function(self._store, *args)
+        except WasmPolicyError:
+            raise
+        except Exception as exc:
+            raise WasmPolicyError(f"Policy evaluation failed in {name}: {exc}") from exc
+
+    def _parse_json(self, raw: bytes) -> int:
+        addr = self._call("opa_malloc", len(raw))
+        self._memory.write(self._store, raw, addr)
+        value = self._call("opa_json_parse", addr, len(raw))
+        if not value:
+            raise WasmPolicyError("Policy module could not parse a JSON value")
+        return value
+
+    def _dump(self, value: int) -> Any:
+        return json.loads(self._read_string(self._call("opa_json_dump", value)))
+
+    def _read_string(self, addr: int) -> str:
+        end = self._memory.data_len(self._store)
+        chunks: list[bytes] = []
+        while addr < end:
+            chunk = bytes(self._memory.read(self._store, addr, min(addr + 4096, end)))
+            nul = chunk.find(b"\0")
+            if nul >= 0:
+                chunks.append(chunk[:nul])
+                break
+            chunks.append(chunk)
+            addr += len(chunk)
+        return b"".join(chunks).decode("utf-8")
+
+    def _reserve(self, end: int) -> None:
+        missing = end - self._memory.data_len(self._store)
+        if missing > 0:
+            self._memory.grow(self._store, -(-missing // _WASM_PAGE_SIZE))
+
+
+def go_sprintf(format_string: str, args: list[Any]) -> str:
+    """The subset of Go's ``fmt`` verbs Rego's ``sprintf`` is used with."""
+    values = iter(args)
+
+    def replace(match: re.Match[str]) -> str:
+        flags, width, precision, verb = match.groups()
+        if verb == "%":
+            return "%"
+        try:
+            value = next(values)
+        except StopIteration:
+            return f"%!{verb}(MISSING)"
+        if verb in "dxXob" and isinstance(value, (int, float)) and not isinstance(value, bool):
+            text = format(int(value), "" if verb == "d" else verb)
+        elif verb in "feEgG" and isinstance(value, (int, float)):
+            text = format(float(value), f".{precision or 6}{verb}")
+        elif verb == "q":
+            text = json.dumps(value if isinstance(value, str) else _go_value(value))
+        else:
+            text = _go_value(value)
+        if width:
+            if "-" in flags:
+                text = text.ljust(int(width))
+            else:
+                text = text.rjust(int(width), "0" if "0" in flags and verb not in "sqv" else " ")
+        return text
+
+    return _FORMAT_VERB_RE.sub(replace, format_string)
+
+
+def _go_value(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return json.dumps(value)
+
+
+# Builtins OPA leaves to the host; modules needing any others fall back to the CLI.
+HOST_BUILTINS: dict[str, Callable[..., Any]] = {
+    "sprintf": go_sprintf,
+}
+
+
+def _extract_wasm_output(output: Path, destination: Path) -> None:
+    wanted = {WASM_MODULE_NAME, WASM_DATA_NAME}
+    with tarfile.open(output, mode="r:gz") as tar:
+        for member in tar.getmembers():
+            name = member.name.lstrip("./")
+            if name not in wanted or not member.isfile():
+                continue
+            handle = tar.extractfile(member)
+            if handle is not None:
+                (destination / name).write_bytes(handle.read())
+    if not (destination / WASM_MODULE_NAME).is_file():
+        raise WasmPolicyError("opa build did not produce policy.wasm")
+
+
+def _import_wasmtime() -> Any:
+    try:
+        import wasmtime
+    except ImportError as exc:
+        raise WasmPolicyError(
+            "In-process policy evaluation needs wasmtime: "
+            "pip install 'terraform-guardrail[wasm]'"
+        ) from exc
+    return wasmtime
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from terraform_guardrail.scanner.cache import GUARDRAIL_VERSION, ScanCache
+from terraform_guardrail.scanner.models import Finding, RawFinding
+from terraform_guardrail.scanner.policy_input import InputProjection
+
+if TYPE_CHECKING:
+    from terraform_guardrail.scanner.policy_eval import PolicyInputFile
+
+POLICY_CACHE_NAMESPACE = "policy"
+
+
+def bundle_is_per_file(manifest: dict[str, Any]) -> bool:
+    """True when ``.manifest`` declares ``metadata.guardrail.per_file``.
+
+    Such bundles promise that each rule reads a single ``input.files`` entry and
+    reports that file's ``path``, so results can be cached per file.
+    """
+    metadata = manifest.get("metadata")
+    guardrail = metadata.get("guardrail") if isinstance(metadata, dict) else None
+    return isinstance(guardrail, dict) and guardrail.get("per_file") is True
+
+
+def bundle_content_digest(bundle_path: Path) -> str:
+    digest = hashlib.sha256()
+    if not bundle_path.is_dir():
+        digest.update(bundle_path.read_bytes())
+        return digest.hexdigest()
+    for item in sorted(item for item in bundle_path.rglob("*") if item.is_file()):
+        digest.update(item.relative_to(bundle_path).as_posix().encode("utf-8") + b"\0")
+        digest.update(item.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+class PolicyResultCache:
+    """Per-file policy findings keyed by bundle digest, query, projection, and file.
+
+    Files are identified by their parsed HCL rather than raw bytes, so
+    formatting-only edits keep their cached results. ``projection`` is the one
+    the input was narrowed with (None for the full input).
+    """
+
+    def __init__(
+        self,
+        cache: ScanCache,
+        bundle_digest: str,
+        query: str,
+        projection: InputProjection | None = None,
+    ):
+        self._cache = cache
+        shape = projection.cache_key() if projection is not None else "full"
+        self._prefix = hashlib.sha256(
+            f"{bundle_digest}\0{query}\0{shape}\0{GUARDRAIL_VERSION}".encode()
+        ).hexdigest()
+
+    def file_key(self, file: PolicyInputFile) -> str:
+        content = json.dumps(file.hcl, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(f"{file.path}\0{content}".encode()).hexdigest()
+        return f"{self._prefix}:{digest}"
+
+    def evaluate(
+        self,
+        files: Sequence[PolicyInputFile],
+        evaluate: Callable[[list[PolicyInputFile]], list[Finding]],
+    ) -> list[Finding]:
+        """Return findings for ``files``, calling ``evaluate`` only for cache misses."""
+        keys = [self.file_key(file) for file in files]
+        per_file: list[list[Finding] | None] = []
+        misses: dict[str, int] = {}
+        for idx, (file, key) in enumerate(zip(files, keys, strict=True)):
+            records = self._cache.get(POLICY_CACHE_NAMESPACE, key)
+            if records is None:
+                misses[file.path] = idx
+                per_file.append(None)
+            else:
+                per_file.append(
+                    [RawFinding.from_record(record, file.path).to_model() for record in records]
+                )
+
+        unattributed: list[Finding] = []
+        if misses:
+            fresh: dict[int, list[Finding]] = {idx: [] for idx in misses.values()}
+            for finding in evaluate([files[idx] for idx in misses.values()]):
+                idx = misses.get(finding.path) if finding.path is not None else None
+                if idx is None:
+                    # Not tied to a sent file, so it cannot be cached per file.
+                    unattributed.append(finding)
+                else:
+                    fresh[idx].append(finding)
+            for idx, findings in fresh.items():
+                records = [RawFinding.from_model(finding).to_record() for finding in findings]
+                self._cache.put(POLICY_CACHE_NAMESPACE, keys[idx], records)
+                per_file[idx] = findings
+        return [finding for findings in per_file for finding in findings or ()] + unattributed
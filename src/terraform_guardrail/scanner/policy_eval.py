@@ -1,21 +1,71 @@
 from __future__ import annotations
 
 import json
+import os
 import shutil
 import subprocess
 import tempfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from terraform_guardrail.bundle_store import bundle_store_enabled
+from terraform_guardrail.policy_lock import PolicyLock, PolicyLockError
 from terraform_guardrail.policy_registry import (
+    RULE_PACK_KIND,
     PolicyBundle,
-    download_bundle,
+    PolicyRegistryError,
+    fetch_bundle,
     get_policy_bundle,
 )
+from terraform_guardrail.scanner.cache import ScanCache
 from terraform_guardrail.scanner.models import Finding
+from terraform_guardrail.scanner.opa_server import (
+    OpaServer,
+    OpaServerError,
+    bundle_path_fingerprint,
+    lease_opa_server,
+    query_data_path,
+    server_mode_enabled,
+)
+from terraform_guardrail.scanner.opa_wasm import (
+    WasmPolicy,
+    WasmPolicyError,
+    WasmUnsupported,
+    compiled_wasm_bundle,
+    load_wasm_policy,
+    wasm_cache_key,
+    wasm_mode_enabled,
+)
+from terraform_guardrail.scanner.policy_cache import (
+    PolicyResultCache,
+    bundle_content_digest,
+    bundle_is_per_file,
+)
+from terraform_guardrail.scanner.policy_input import (
+    InputProjection,
+    bundle_input_projection,
+    merge_projections,
+    read_bundle_manifest,
+)
+from terraform_guardrail.scanner.policy_layers import (
+    COMBINED_QUERY,
+    CombineUnsupported,
+    PolicyLayer,
+    build_combined_bundle,
+    materialize_local_bundle,
+)
+from terraform_guardrail.scanner.policy_shard import (
+    bundle_is_shardable,
+    merge_shard_findings,
+    resolve_policy_jobs,
+    shard_files,
+)
 
 DEFAULT_POLICY_QUERY = "data.guardrail.baseline.deny"
+OPA_COMBINED_ENV = "GUARDRAIL_OPA_COMBINED"
 
 
 class PolicyEvalError(RuntimeError):
@@ -34,41 +84,50 @@ def evaluate_policy_bundle(
     files: list[PolicyInputFile],
     state: dict[str, Any] | None,
     policy_query: str | None = None,
+    project_input: bool = True,
+    cache: ScanCache | None = None,
+    policy_jobs: int | None = None,
+    lock: PolicyLock | None = None,
 ) -> list[Finding]:
-    bundle = get_policy_bundle(bundle_id, registry_url)
+    bundle = _rego_bundle(bundle_id, registry_url, lock)
     query = policy_query or bundle.entrypoint or DEFAULT_POLICY_QUERY
 
-    opa_path = shutil.which("opa")
-    if not opa_path:
-        raise PolicyEvalError("OPA CLI not found. Install OPA to evaluate policy bundles.")
+    def to_findings(value: Any) -> list[Finding]:
+        return _findings_from_value(value, bundle)
 
-    input_payload = {
-        "files": [{"path": file.path, "hcl": file.hcl} for file in files],
-        "state": state,
-    }
+    evaluation = _BundleEvaluation(
+        files, state, query, project_input, cache, resolve_policy_jobs(policy_jobs), bundle.sha256
+    )
+    if wasm_mode_enabled():
+        findings = _evaluate_wasm(
+            evaluation,
+            query,
+            bundle.sha256,
+            lambda destination: fetch_bundle(bundle, destination),
+            to_findings,
+        )
+        if findings is not None:
+            return findings
+
+    opa_path = _opa_path()
+    data_path = query_data_path(query) if server_mode_enabled() else None
+    if data_path is not None:
+        with lease_opa_server(
+            slot=f"registry:{registry_url or ''}:{bundle.bundle_id}",
+            opa_path=opa_path,
+            prepare=lambda workdir: fetch_bundle(bundle, workdir / "bundles"),
+            fingerprint=(bundle.url, bundle.sha256, bundle.version),
+        ) as server:
+            return evaluation.run(
+                server.prepared_bundle(), _server_runner(server, data_path), to_findings
+            )
 
     with tempfile.TemporaryDirectory() as tmp_dir:
         tmp_dir_path = Path(tmp_dir)
-        input_path = tmp_dir_path / "input.json"
-        input_path.write_text(json.dumps(input_payload), encoding="utf-8")
-
-        bundle_dir = download_bundle(bundle, tmp_dir_path / "bundles")
-
-        cmd = [
-            opa_path,
-            "eval",
-            "--format=json",
-            "--input",
-            str(input_path),
-            "--bundle",
-            str(bundle_dir),
-            query,
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        if result.returncode != 0:
-            raise PolicyEvalError(result.stderr.strip())
-
-    return _parse_opa_output(result.stdout, bundle)
+        bundle_dir = fetch_bundle(bundle, tmp_dir_path / "bundles")
+        return evaluation.run(
+            bundle_dir, _eval_runner(opa_path, bundle_dir, query, tmp_dir_path), to_findings
+        )
 
 
 def evaluate_policy_layers(
@@ -79,41 +138,221 @@ def evaluate_policy_layers(
     policy_query: str | None = None,
     layer_names: list[str] | None = None,
     bundle_paths: list[Path] | None = None,
+    project_input: bool = True,
+    cache: ScanCache | None = None,
+    policy_jobs: int | None = None,
+    lock: PolicyLock | None = None,
 ) -> list[Finding]:
-    findings: list[Finding] = []
+    """Evaluate every layer, tagging findings with ``bundle``/``bundle_path`` and ``layer``.
+
+    With more than one layer the bundles are relocated under separate roots and
+    evaluated by a single OPA invocation when ``GUARDRAIL_OPA_COMBINED=1``,
+    unless a bundle cannot be relocated. ``project_input=False`` sends the full HCL and
+    state even when bundle manifests declare a narrower input. With ``cache``,
+    bundles declaring ``per_file`` rules only evaluate files whose content changed.
+    ``policy_jobs`` > 1 splits the files into size-balanced shards evaluated in
+    parallel, except for bundles declaring ``shardable: false``. With ``lock``,
+    bundle IDs resolve from the lockfile instead of the registry index.
+    """
     names = layer_names or []
     path_bundles = bundle_paths or []
+    if len(path_bundles) + len(bundle_ids) > 1 and combined_layers_enabled():
+        layers = [
+            _path_layer(bundle_path, policy_query, _layer_name(names, idx))
+            for idx, bundle_path in enumerate(path_bundles)
+        ] + [
+            _registry_layer(
+                bundle_id, registry_url, policy_query, _layer_name(names, idx), lock
+            )
+            for idx, bundle_id in enumerate(bundle_ids)
+        ]
+        combined = _evaluate_combined(layers, files, state, project_input, cache, policy_jobs)
+        if combined is not None:
+            return combined
+
+    findings: list[Finding] = []
     for idx, bundle_path in enumerate(path_bundles):
-        layer = names[idx] if idx < len(names) else None
         layer_findings = evaluate_policy_bundle_path(
             bundle_path=bundle_path,
             files=files,
             state=state,
             policy_query=policy_query,
+            project_input=project_input,
+            cache=cache,
+            policy_jobs=policy_jobs,
         )
-        for finding in layer_findings:
-            detail = finding.detail or {}
-            detail.setdefault("bundle_path", str(bundle_path))
-            if layer:
-                detail.setdefault("layer", layer)
-            finding.detail = detail
-        findings.extend(layer_findings)
+        attribution = _attribution("bundle_path", str(bundle_path), _layer_name(names, idx))
+        findings.extend(_attribute(layer_findings, attribution))
     for idx, bundle_id in enumerate(bundle_ids):
-        layer = names[idx] if idx < len(names) else None
         layer_findings = evaluate_policy_bundle(
             bundle_id=bundle_id,
             registry_url=registry_url,
             files=files,
             state=state,
             policy_query=policy_query,
+            project_input=project_input,
+            cache=cache,
+            policy_jobs=policy_jobs,
+            lock=lock,
+        )
+        attribution = _attribution("bundle", bundle_id, _layer_name(names, idx))
+        findings.extend(_attribute(layer_findings, attribution))
+    return findings
+
+
+def state_input_projection(
+    bundle_ids: list[str],
+    registry_url: str | None,
+    bundle_paths: list[Path] | None = None,
+    lock: PolicyLock | None = None,
+) -> InputProjection | None:
+    """Union of the inputs the bundles declare, so state can be trimmed while it is read.
+
+    None keeps the full state: some bundle declares no input, or reading its
+    manifest would mean downloading a bundle the store cannot keep for evaluation.
+    """
+    projections = [bundle_input_projection(path) for path in bundle_paths or []]
+    for bundle_id in bundle_ids:
+        try:
+            bundle = _rego_bundle(bundle_id, registry_url, lock)
+            if not bundle.sha256 or not bundle_store_enabled():
+                return None
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                bundle_dir = fetch_bundle(bundle, Path(tmp_dir))
+                projections.append(InputProjection.from_manifest(read_bundle_manifest(bundle_dir)))
+        except (PolicyEvalError, PolicyRegistryError):
+            # Evaluation reports the failure; until then nothing is dropped.
+            return None
+    return merge_projections(projections)
+
+
+def combined_layers_enabled() -> bool:
+    # Opt-in: relocating bundles rewrites their Rego source.
+    return os.getenv(OPA_COMBINED_ENV, "").strip().lower() in {"1", "true", "yes"}
+
+
+def _evaluate_combined(
+    layers: list[PolicyLayer],
+    files: list[PolicyInputFile],
+    state: dict[str, Any] | None,
+    project_input: bool,
+    cache: ScanCache | None,
+    policy_jobs: int | None,
+) -> list[Finding] | None:
+    if any(query_data_path(layer.query) is None for layer in layers):
+        return None
+
+    def to_findings(value: Any) -> list[Finding]:
+        results = value if isinstance(value, dict) else {}
+        findings: list[Finding] = []
+        for idx, layer in enumerate(layers):
+            layer_findings = _findings_from_value(results.get(str(idx)), layer.bundle)
+            findings.extend(_attribute(layer_findings, layer.attribution))
+        return findings
+
+    # Cached findings carry the attribution, so it is part of the cache key.
+    cache_query = json.dumps([COMBINED_QUERY] + [layer.attribution for layer in layers])
+    evaluation = _BundleEvaluation(
+        files, state, cache_query, project_input, cache, resolve_policy_jobs(policy_jobs)
+    )
+    try:
+        if wasm_mode_enabled():
+            findings = _evaluate_wasm(
+                evaluation,
+                COMBINED_QUERY,
+                None,
+                lambda workdir: build_combined_bundle(layers, workdir),
+                to_findings,
+            )
+            if findings is not None:
+                return findings
+        opa_path = _opa_path()
+        if server_mode_enabled():
+            data_path = query_data_path(COMBINED_QUERY) or ""
+            with lease_opa_server(
+                slot="layers:" + "|".join(layer.slot for layer in layers),
+                opa_path=opa_path,
+                prepare=lambda workdir: build_combined_bundle(layers, workdir),
+                fingerprint=tuple(layer.fingerprint for layer in layers),
+            ) as server:
+                return evaluation.run(
+                    server.prepared_bundle(), _server_runner(server, data_path), to_findings
+                )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir_path = Path(tmp_dir)
+            bundle_dir = build_combined_bundle(layers, tmp_dir_path)
+            runner = _eval_runner(opa_path, bundle_dir, COMBINED_QUERY, tmp_dir_path)
+            return evaluation.run(bundle_dir, runner, to_findings)
+    except CombineUnsupported:
+        return None
+
+
+def _path_layer(bundle_path: Path, policy_query: str | None, layer: str | None) -> PolicyLayer:
+    query = policy_query or DEFAULT_POLICY_QUERY
+    resolved = bundle_path.resolve()
+    return PolicyLayer(
+        bundle=_local_bundle(bundle_path, query),
+        query=query,
+        attribution=_attribution("bundle_path", str(bundle_path), layer),
+        materialize=lambda destination: materialize_local_bundle(resolved, destination),
+        slot=f"path:{resolved}",
+        fingerprint=bundle_path_fingerprint(resolved),
+    )
+
+
+def _registry_layer(
+    bundle_id: str,
+    registry_url: str | None,
+    policy_query: str | None,
+    layer: str | None,
+    lock: PolicyLock | None = None,
+) -> PolicyLayer:
+    bundle = _rego_bundle(bundle_id, registry_url, lock)
+    return PolicyLayer(
+        bundle=bundle,
+        query=policy_query or bundle.entrypoint or DEFAULT_POLICY_QUERY,
+        attribution=_attribution("bundle", bundle_id, layer),
+        materialize=lambda destination: fetch_bundle(bundle, destination),
+        slot=f"registry:{registry_url or ''}:{bundle.bundle_id}",
+        fingerprint=(bundle.url, bundle.sha256, bundle.version),
+    )
+
+
+def _rego_bundle(
+    bundle_id: str, registry_url: str | None, lock: PolicyLock | None = None
+) -> PolicyBundle:
+    if lock is not None:
+        try:
+            bundle = lock.get(bundle_id)
+        except PolicyLockError as exc:
+            raise PolicyEvalError(str(exc)) from exc
+    else:
+        bundle = get_policy_bundle(bundle_id, registry_url)
+    if bundle.kind == RULE_PACK_KIND:
+        raise PolicyEvalError(
+            f"Bundle '{bundle_id}' is a native rule pack; "
+            f"load it with GUARDRAIL_RULE_PACKS=registry:{bundle_id}"
         )
-        for finding in layer_findings:
-            detail = finding.detail or {}
-            detail.setdefault("bundle", bundle_id)
-            if layer:
-                detail.setdefault("layer", layer)
-            finding.detail = detail
-        findings.extend(layer_findings)
+    return bundle
+
+
+def _layer_name(names: list[str], idx: int) -> str | None:
+    return names[idx] if idx < len(names) else None
+
+
+def _attribution(key: str, value: str, layer: str | None) -> dict[str, str]:
+    attribution = {key: value}
+    if layer:
+        attribution["layer"] = layer
+    return attribution
+
+
+def _attribute(findings: list[Finding], attribution: dict[str, str]) -> list[Finding]:
+    for finding in findings:
+        detail = finding.detail or {}
+        for key, value in attribution.items():
+            detail.setdefault(key, value)
+        finding.detail = detail
     return findings
 
 
@@ -122,9 +361,130 @@ def evaluate_policy_bundle_path(
     files: list[PolicyInputFile],
     state: dict[str, Any] | None,
     policy_query: str | None = None,
+    project_input: bool = True,
+    cache: ScanCache | None = None,
+    policy_jobs: int | None = None,
 ) -> list[Finding]:
     query = policy_query or DEFAULT_POLICY_QUERY
-    bundle = PolicyBundle(
+    bundle = _local_bundle(bundle_path, query)
+
+    def to_findings(value: Any) -> list[Finding]:
+        return _findings_from_value(value, bundle)
+
+    evaluation = _BundleEvaluation(
+        files, state, query, project_input, cache, resolve_policy_jobs(policy_jobs)
+    )
+    if wasm_mode_enabled():
+        findings = _evaluate_wasm(
+            evaluation,
+            query,
+            bundle_content_digest(bundle_path),
+            lambda _destination: bundle_path,
+            to_findings,
+        )
+        if findings is not None:
+            return findings
+
+    opa_path = _opa_path()
+    data_path = query_data_path(query) if server_mode_enabled() else None
+    if data_path is not None:
+        resolved = bundle_path.resolve()
+        with lease_opa_server(
+            slot=f"path:{resolved}",
+            opa_path=opa_path,
+            prepare=lambda _workdir: resolved,
+            fingerprint=bundle_path_fingerprint(resolved),
+        ) as server:
+            return evaluation.run(resolved, _server_runner(server, data_path), to_findings)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir_path = Path(tmp_dir)
+        return evaluation.run(
+            bundle_path, _eval_runner(opa_path, bundle_path, query, tmp_dir_path), to_findings
+        )
+
+
+def _evaluate_wasm(
+    evaluation: _BundleEvaluation,
+    query: str,
+    bundle_digest: str | None,
+    materialize: Callable[[Path], Path],
+    to_findings: Callable[[Any], list[Finding]],
+) -> list[Finding] | None:
+    """Evaluate with the bundle compiled to Wasm, or None to fall back to the OPA CLI.
+
+    The compiled module is cached by bundle digest, so only the first scan of a
+    bundle needs OPA. Without a known digest the bundle is materialised to hash it.
+    """
+    entrypoint = query_data_path(query)
+    if entrypoint is None:
+        return None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source: Path | None = None
+            if bundle_digest is None:
+                source = materialize(Path(tmp_dir) / "bundle")
+                bundle_digest = bundle_content_digest(source)
+            compiled = compiled_wasm_bundle(
+                shutil.which("opa"),
+                (lambda _destination: source) if source is not None else materialize,
+                entrypoint,
+                wasm_cache_key(bundle_digest, entrypoint),
+            )
+        policy = load_wasm_policy(compiled)
+    except WasmUnsupported:
+        return None
+    except WasmPolicyError as exc:
+        raise PolicyEvalError(str(exc)) from exc
+    return evaluation.run(compiled, _wasm_runner(policy, entrypoint), to_findings)
+
+
+@dataclass(frozen=True)
+class _BundleEvaluation:
+    """Projects the input for one bundle, shards it, and serves per-file results from cache."""
+
+    files: list[PolicyInputFile]
+    state: dict[str, Any] | None
+    query: str
+    project_input: bool
+    cache: ScanCache | None
+    policy_jobs: int = 1
+    bundle_digest: str | None = None
+
+    def run(
+        self,
+        bundle_dir: Path,
+        runner: Callable[[dict[str, Any]], Any],
+        to_findings: Callable[[Any], list[Finding]],
+    ) -> list[Finding]:
+        manifest = read_bundle_manifest(bundle_dir)
+        projection = InputProjection.from_manifest(manifest) if self.project_input else None
+
+        def evaluate_shard(files: list[PolicyInputFile], state: dict | None) -> list[Finding]:
+            return to_findings(runner(_input_payload(files, state, projection)))
+
+        def evaluate(files: list[PolicyInputFile]) -> list[Finding]:
+            jobs = self.policy_jobs if bundle_is_shardable(manifest) else 1
+            shards = shard_files(files, jobs)
+            if len(shards) == 1:
+                return evaluate_shard(shards[0], self.state)
+            # Every shard gets the state so rules joining files with it see the same
+            # input wherever a file lands; the merge drops the repeated state findings.
+            states = [self.state] * len(shards)
+            with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                return merge_shard_findings(pool.map(evaluate_shard, shards, states))
+
+        # Per-file results are only reusable when nothing outside the file is sent.
+        sends_state = self.state is not None and (projection is None or projection.state)
+        if self.cache is None or sends_state or not bundle_is_per_file(manifest):
+            return evaluate(self.files)
+        digest = self.bundle_digest or bundle_content_digest(bundle_dir)
+        results = PolicyResultCache(self.cache, digest, self.query, projection)
+        return results.evaluate(self.files, evaluate)
+
+
+def _local_bundle(bundle_path: Path, query: str) -> PolicyBundle:
+    return PolicyBundle(
         bundle_id="local",
         title="Local bundle",
         description="Local policy bundle path",
@@ -134,38 +494,90 @@ def evaluate_policy_bundle_path(
         entrypoint=query,
     )
 
+
+def _opa_path() -> str:
     opa_path = shutil.which("opa")
     if not opa_path:
         raise PolicyEvalError("OPA CLI not found. Install OPA to evaluate policy bundles.")
+    return opa_path
+
 
-    input_payload = {
-        "files": [{"path": file.path, "hcl": file.hcl} for file in files],
-        "state": state,
+def _input_payload(
+    files: list[PolicyInputFile],
+    state: dict[str, Any] | None,
+    projection: InputProjection | None = None,
+) -> dict[str, Any]:
+    if projection is None:
+        return {
+            "files": [{"path": file.path, "hcl": file.hcl} for file in files],
+            "state": state,
+        }
+    return {
+        "files": [{"path": file.path, "hcl": projection.project_hcl(file.hcl)} for file in files],
+        "state": projection.project_state(state),
     }
 
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_dir_path = Path(tmp_dir)
-        input_path = tmp_dir_path / "input.json"
-        input_path.write_text(json.dumps(input_payload), encoding="utf-8")
-
-        cmd = [
-            opa_path,
-            "eval",
-            "--format=json",
-            "--input",
-            str(input_path),
-            "--bundle",
-            str(bundle_path),
-            query,
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        if result.returncode != 0:
-            raise PolicyEvalError(result.stderr.strip())
 
-    return _parse_opa_output(result.stdout, bundle)
+def _run_opa_eval(
+    opa_path: str,
+    input_payload: dict[str, Any],
+    bundle_dir: Path,
+    query: str,
+    tmp_dir_path: Path,
+) -> str:
+    # Unique per call: shards of one bundle are evaluated concurrently.
+    fd, input_name = tempfile.mkstemp(dir=tmp_dir_path, prefix="input-", suffix=".json")
+    input_path = Path(input_name)
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(input_payload, handle)
+    cmd = [
+        opa_path,
+        "eval",
+        "--format=json",
+        "--input",
+        str(input_path),
+        "--bundle",
+        str(bundle_dir),
+        query,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise PolicyEvalError(result.stderr.strip())
+    return result.stdout
+
+
+def _eval_runner(
+    opa_path: str, bundle_dir: Path, query: str, tmp_dir_path: Path
+) -> Callable[[dict[str, Any]], Any]:
+    def run(input_payload: dict[str, Any]) -> Any:
+        return _opa_output_value(
+            _run_opa_eval(opa_path, input_payload, bundle_dir, query, tmp_dir_path)
+        )
+
+    return run
 
 
-def _parse_opa_output(output: str, bundle: PolicyBundle) -> list[Finding]:
+def _server_runner(server: OpaServer, data_path: str) -> Callable[[dict[str, Any]], Any]:
+    def run(input_payload: dict[str, Any]) -> Any:
+        try:
+            return server.evaluate(data_path, input_payload)
+        except OpaServerError as exc:
+            raise PolicyEvalError(str(exc)) from exc
+
+    return run
+
+
+def _wasm_runner(policy: WasmPolicy, entrypoint: str) -> Callable[[dict[str, Any]], Any]:
+    def run(input_payload: dict[str, Any]) -> Any:
+        try:
+            return policy.evaluate(input_payload, entrypoint)
+        except WasmPolicyError as exc:
+            raise PolicyEvalError(str(exc)) from exc
+
+    return run
+
+
+def _opa_output_value(output: str) -> Any:
     try:
         payload = json.loads(output)
     except json.JSONDecodeError as exc:  # noqa: PERF203
@@ -173,13 +585,16 @@ def _parse_opa_output(output: str, bundle: PolicyBundle) -> list[Finding]:
 
     results = payload.get("result") or []
     if not results:
-        return []
+        return None
 
     expressions = results[0].get("expressions") or []
     if not expressions:
-        return []
+        return None
+
+    return expressions[0].get("value")
+
 
-    value = expressions[0].get("value")
+def _findings_from_value(value: Any, bundle: PolicyBundle) -> list[Finding]:
     if not value:
         return []
 
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+import tarfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.scanner.config import ValueMatcher
+
+MANIFEST_NAME = ".manifest"
+_MANIFEST_MEMBERS = (MANIFEST_NAME, f"./{MANIFEST_NAME}", f"/{MANIFEST_NAME}")
+
+
+@dataclass(frozen=True)
+class InputProjection:
+    """The part of the policy input a bundle reads, from ``.manifest`` ``metadata``.
+
+    ``{"metadata": {"guardrail": {"input": {"hcl": ["resource", "variable"],
+    "resource_types": ["aws_s3_*"], "state": false}}}}`` keeps only those
+    top-level HCL blocks and resource types, and drops the state. Omitted keys
+    keep everything.
+    """
+
+    hcl_blocks: frozenset[str] | None = None
+    resource_types: ValueMatcher | None = None
+    state: bool = True
+
+    @classmethod
+    def from_manifest(cls, manifest: dict[str, Any]) -> InputProjection | None:
+        metadata = manifest.get("metadata")
+        guardrail = metadata.get("guardrail") if isinstance(metadata, dict) else None
+        spec = guardrail.get("input") if isinstance(guardrail, dict) else None
+        if not isinstance(spec, dict):
+            return None
+        hcl_blocks = spec.get("hcl")
+        resource_types = spec.get("resource_types")
+        return cls(
+            hcl_blocks=frozenset(map(str, hcl_blocks)) if isinstance(hcl_blocks, list) else None,
+            resource_types=(
+                ValueMatcher.of(map(str, resource_types))
+                if isinstance(resource_types, list)
+                else None
+            ),
+            state=bool(spec.get("state", True)),
+        )
+
+    def union(self, other: InputProjection) -> InputProjection:
+        hcl_blocks = None
+        if self.hcl_blocks is not None and other.hcl_blocks is not None:
+            hcl_blocks = self.hcl_blocks | other.hcl_blocks
+        resource_types = None
+        if self.resource_types is not None and other.resource_types is not None:
+            resource_types = ValueMatcher.of(
+                self.resource_types.values + other.resource_types.values
+            )
+        return InputProjection(hcl_blocks, resource_types, self.state or other.state)
+
+    def to_manifest_metadata(self) -> dict[str, Any]:
+        spec: dict[str, Any] = {"state": self.state}
+        if self.hcl_blocks is not None:
+            spec["hcl"] = sorted(self.hcl_blocks)
+        if self.resource_types is not None:
+            spec["resource_types"] = list(self.resource_types.values)
+        return {"guardrail": {"input": spec}}
+
+    def cache_key(self) -> str:
+        """Canonical form of the projection, for keys of results computed from its input."""
+        spec = self.to_manifest_metadata()["guardrail"]["input"]
+        if "resource_types" in spec:
+            spec["resource_types"] = sorted(spec["resource_types"])
+        return json.dumps(spec, sort_keys=True, separators=(",", ":"))
+
+    def project_hcl(self, hcl: dict[str, Any]) -> dict[str, Any]:
+        projected: dict[str, Any] = {}
+        for key, value in hcl.items():
+            if self.hcl_blocks is not None and key not in self.hcl_blocks:
+                continue
+            if key == "resource" and self.resource_types is not None:
+                value = self._project_resource_blocks(value)
+            projected[key] = value
+        return projected
+
+    def project_state(self, state: dict[str, Any] | None) -> dict[str, Any] | None:
+        if state is None or not self.state:
+            return None
+        if self.resource_types is None or not isinstance(state.get("resources"), list):
+            return state
+        resources = [
+            resource
+            for resource in state["resources"]
+            if isinstance(resource, dict) and self.keeps_type(resource.get("type"))
+        ]
+        return {**state, "resources": resources}
+
+    def _project_resource_blocks(self, blocks: Any) -> Any:
+        if not isinstance(blocks, list):
+            return blocks
+        projected = []
+        for block in blocks:
+            if not isinstance(block, dict):
+                continue
+            kept = {name: body for name, body in block.items() if self.keeps_type(name)}
+            if kept:
+                projected.append(kept)
+        return projected
+
+    def keeps_type(self, resource_type: Any) -> bool:
+        if self.resource_types is None:
+            return True
+        # python-hcl2 8.x keeps the quotes around block labels.
+        return isinstance(resource_type, str) and resource_type.strip('"') in self.resource_types
+
+
+def merge_projections(projections: Iterable[InputProjection | None]) -> InputProjection | None:
+    """Union of several bundles' projections; None (full input) if any bundle has none."""
+    merged: InputProjection | None = None
+    for projection in projections:
+        if projection is None:
+            return None
+        merged = projection if merged is None else merged.union(projection)
+    return merged
+
+
+def read_bundle_manifest(bundle_path: Path) -> dict[str, Any]:
+    """Return the bundle's ``.manifest`` from a directory or ``.tar.gz``, or ``{}``."""
+    try:
+        if bundle_path.is_dir():
+            raw: bytes | None = (bundle_path / MANIFEST_NAME).read_bytes()
+        else:
+            raw = _read_tar_manifest(bundle_path)
+        manifest = json.loads(raw or b"{}")
+    except (OSError, ValueError, tarfile.TarError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def bundle_input_projection(bundle_path: Path) -> InputProjection | None:
+    return InputProjection.from_manifest(read_bundle_manifest(bundle_path))
+
+
+def _read_tar_manifest(bundle_path: Path) -> bytes | None:
+    with tarfile.open(bundle_path, mode="r:gz") as tar:
+        for name in _MANIFEST_MEMBERS:
+            try:
+                member = tar.getmember(name)
+            except KeyError:
+                continue
+            handle = tar.extractfile(member)
+            return handle.read() if handle is not None else None
+    return None
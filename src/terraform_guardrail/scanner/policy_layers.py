@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import tarfile
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from terraform_guardrail.policy_registry import PolicyBundle, _safe_extract
+from terraform_guardrail.scanner.policy_cache import bundle_is_per_file
+from terraform_guardrail.scanner.policy_input import (
+    MANIFEST_NAME,
+    InputProjection,
+    merge_projections,
+)
+
+COMBINED_PACKAGE = "guardrail_layers"
+COMBINED_QUERY = f"data.{COMBINED_PACKAGE}.results"
+BUNDLE_METADATA_FILES = {MANIFEST_NAME, ".signatures.json"}
+
+# Strings and comments are matched first so ``data.`` inside them is left alone.
+_REGO_TOKEN_RE = re.compile(
+    r'"(?:\\.|[^"\\\n])*"|`[^`]*`|#[^\n]*|(?<![\w.])data\b(?P<dot>\.)?'
+)
+_REGO_PACKAGE_RE = re.compile(r"^(\s*package\s+)", re.MULTILINE)
+
+
+class CombineUnsupported(RuntimeError):
+    """A bundle cannot be relocated under a layer root; evaluate it on its own."""
+
+
+@dataclass(frozen=True)
+class PolicyLayer:
+    bundle: PolicyBundle
+    query: str
+    attribution: dict[str, str]
+    materialize: Callable[[Path], Path]
+    slot: str
+    fingerprint: tuple[Any, ...] = ()
+
+
+def layer_root(index: int) -> str:
+    return f"layer_{index}"
+
+
+def prefix_rego(source: str, root: str) -> str:
+    """Move a module under ``data.<root>`` by rewriting its package and data refs."""
+
+    def replace(match: re.Match[str]) -> str:
+        token = match.group(0)
+        if not token.startswith("data"):
+            return token
+        if match.group("dot") is None:
+            raise CombineUnsupported("Policy references the data document dynamically")
+        return f"data.{root}."
+
+    return _REGO_PACKAGE_RE.sub(rf"\g<1>{root}.", _REGO_TOKEN_RE.sub(replace, source))
+
+
+def build_combined_bundle(layers: Sequence[PolicyLayer], workdir: Path) -> Path:
+    """Materialise every layer under its own root plus a module collecting their results.
+
+    ``data.guardrail_layers.results`` maps each layer index to the value of that
+    layer's query, with undefined queries left out. The combined manifest carries
+    the union of the layers' input projections.
+    """
+    combined = workdir / "combined"
+    rego_versions: set[int] = set()
+    projections: list[InputProjection | None] = []
+    per_file: list[bool] = []
+    rules = [f"package {COMBINED_PACKAGE}", ""]
+    for index, layer in enumerate(layers):
+        root = layer_root(index)
+        source = layer.materialize(workdir / "layers" / str(index))
+        layer_manifest = _relocate_bundle(source, combined / root, root)
+        if "rego_version" in layer_manifest:
+            rego_versions.add(int(layer_manifest["rego_version"]))
+        projections.append(InputProjection.from_manifest(layer_manifest))
+        per_file.append(bundle_is_per_file(layer_manifest))
+        data_ref = prefix_rego(layer.query, root)
+        rules.append(f'results["{index}"] := {data_ref}')
+    if len(rego_versions) > 1:
+        raise CombineUnsupported("Policy layers use different Rego versions")
+    (combined / f"{COMBINED_PACKAGE}.rego").write_text("\n".join(rules) + "\n", encoding="utf-8")
+    manifest: dict[str, Any] = {
+        "roots": [layer_root(index) for index in range(len(layers))] + [COMBINED_PACKAGE]
+    }
+    if rego_versions:
+        manifest["rego_version"] = rego_versions.pop()
+    metadata: dict[str, Any] = {"guardrail": {}}
+    projection = merge_projections(projections)
+    if projection is not None:
+        metadata = projection.to_manifest_metadata()
+    metadata["guardrail"]["per_file"] = all(per_file)
+    manifest["metadata"] = metadata
+    (combined / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+    return combined
+
+
+def materialize_local_bundle(bundle_path: Path, destination: Path) -> Path:
+    if bundle_path.is_dir():
+        return bundle_path
+    destination.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(bundle_path, mode="r:gz") as tar:
+        _safe_extract(tar, destination)
+    return destination
+
+
+def _relocate_bundle(source: Path, destination: Path, root: str) -> dict[str, Any]:
+    """Copy ``source`` under ``root`` and return its parsed manifest."""
+    manifest: dict[str, Any] = {}
+    for item in sorted(source.rglob("*")):
+        if not item.is_file() or item.name.startswith("._"):
+            continue
+        relative = item.relative_to(source)
+        if relative == Path(MANIFEST_NAME):
+            manifest = json.loads(item.read_text(encoding="utf-8") or "{}")
+            if manifest.get("wasm") or manifest.get("file_rego_versions"):
+                raise CombineUnsupported("Bundle manifest cannot be merged")
+            continue
+        if relative.name in BUNDLE_METADATA_FILES:
+            continue
+        if relative.suffix == ".wasm":
+            raise CombineUnsupported("Wasm bundles cannot be relocated")
+        target = destination / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if relative.suffix == ".rego":
+            source_text = item.read_text(encoding="utf-8")
+            target.write_text(prefix_rego(source_text, root), encoding="utf-8")
+        else:
+            shutil.copyfile(item, target)
+    return manifest
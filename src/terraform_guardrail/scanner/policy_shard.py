@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, Any
+
+from terraform_guardrail.scanner.models import Finding
+
+if TYPE_CHECKING:
+    from terraform_guardrail.scanner.policy_eval import PolicyInputFile
+
+OPA_SHARDS_ENV = "GUARDRAIL_OPA_SHARDS"
+
+
+def resolve_policy_jobs(policy_jobs: int | None = None) -> int:
+    """Parallel OPA evaluations per bundle: the argument, else ``GUARDRAIL_OPA_SHARDS``.
+
+    ``0`` means one per CPU; the default is 1 (no sharding).
+    """
+    if policy_jobs is None:
+        try:
+            policy_jobs = int(os.getenv(OPA_SHARDS_ENV, "1"))
+        except ValueError:
+            policy_jobs = 1
+    if policy_jobs <= 0:
+        return os.cpu_count() or 1
+    return policy_jobs
+
+
+def bundle_is_shardable(manifest: dict[str, Any]) -> bool:
+    """Bundles opt out with ``metadata.guardrail.shardable: false`` in ``.manifest``."""
+    metadata = manifest.get("metadata")
+    guardrail = metadata.get("guardrail") if isinstance(metadata, dict) else None
+    return not (isinstance(guardrail, dict) and guardrail.get("shardable") is False)
+
+
+def shard_files(files: Sequence[PolicyInputFile], shards: int) -> list[list[PolicyInputFile]]:
+    """Split ``files`` into at most ``shards`` lists of similar total size.
+
+    Sizes come from the source files on disk (a cheap proxy for their parsed HCL),
+    assigned largest first to the lightest shard. Each shard keeps input order.
+    """
+    shards = max(1, min(shards, len(files)))
+    if shards == 1:
+        return [list(files)]
+    sizes = [_file_size(file.path) for file in files]
+    heap = [(0, shard) for shard in range(shards)]
+    assignment = [0] * len(files)
+    for idx in sorted(range(len(files)), key=sizes.__getitem__, reverse=True):
+        load, shard = heapq.heappop(heap)
+        assignment[idx] = shard
+        heapq.heappush(heap, (load + sizes[idx], shard))
+    result: list[list[PolicyInputFile]] = [[] for _ in range(shards)]
+    for idx, file in enumerate(files):
+        result[assignment[idx]].append(file)
+    return [shard for shard in result if shard]
+
+
+def merge_shard_findings(shard_findings: Iterable[list[Finding]]) -> list[Finding]:
+    """Concatenate shard results, dropping findings another shard already reported.
+
+    Repeats within one shard are kept: a finding reported n times by some shard
+    appears n times in the result.
+    """
+    emitted: Counter[tuple[Any, ...]] = Counter()
+    merged: list[Finding] = []
+    for findings in shard_findings:
+        local: Counter[tuple[Any, ...]] = Counter()
+        for finding in findings:
+            key = (
+                finding.rule_id,
+                finding.severity,
+                finding.message,
+                finding.path,
+                json.dumps(finding.detail, sort_keys=True, default=str),
+            )
+            local[key] += 1
+            if local[key] > emitted[key]:
+                emitted[key] += 1
+                merged.append(finding)
+    return merged
+
+
+def _file_size(path: str) -> int:
+    try:
+        return max(os.stat(path).st_size, 1)
+    except OSError:
+        return 1
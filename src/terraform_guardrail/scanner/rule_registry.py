@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import fnmatch
+import functools
+import importlib
+import importlib.metadata
+import os
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from terraform_guardrail.scanner.config import ScanConfig
+from terraform_guardrail.scanner.models import Finding, RawFinding
+from terraform_guardrail.scanner.native_rules import NativeRule, compile_native_rule
+from terraform_guardrail.scanner.rules import RULES
+
+RULE_ENTRY_POINT_GROUP = "terraform_guardrail.rules"
+BUILTIN_RULE_MODULE = "terraform_guardrail.scanner.builtin_rules"
+
+
+class RuleRegistryError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ResourceContext:
+    resource_type: str
+    name: str
+    attrs: dict[str, Any]
+    path: str
+    config: ScanConfig
+
+    @property
+    def resource_id(self) -> str:
+        return f"{self.resource_type}.{self.name}"
+
+
+# Handlers may yield public Finding models (plugin packs) or internal RawFindings.
+RuleHandler = Callable[[ResourceContext], Iterable[Finding | RawFinding]]
+
+
+@dataclass(frozen=True)
+class RuleSpec:
+    rule_id: str
+    handler: RuleHandler
+    # None means the handler applies to every resource type. Entries may be
+    # fnmatch patterns such as "aws_*"; they are expanded once per resource type.
+    resource_types: frozenset[str] | None = None
+    message: str | None = None
+
+
+class RuleRegistry:
+    """Resource-type indexed rule dispatch.
+
+    Each resource runs only the handlers registered for its type (plus
+    type-agnostic ones), so evaluation cost tracks the applicable rules rather
+    than the size of the catalog. The per-type handler tuple is computed once.
+    """
+
+    def __init__(self, specs: Iterable[RuleSpec] = ()):
+        self._specs: list[RuleSpec] = []
+        self._dispatch: dict[str, tuple[RuleHandler, ...]] = {}
+        for spec in specs:
+            self.add(spec)
+
+    def add(self, spec: RuleSpec) -> None:
+        self._specs.append(spec)
+        self._dispatch.clear()
+
+    def register(
+        self,
+        rule_id: str,
+        resource_types: Iterable[str] | None = None,
+        message: str | None = None,
+    ) -> Callable[[RuleHandler], RuleHandler]:
+        types = frozenset(resource_types) if resource_types is not None else None
+
+        def decorator(handler: RuleHandler) -> RuleHandler:
+            self.add(RuleSpec(rule_id, handler, types, message))
+            return handler
+
+        return decorator
+
+    def extend(self, specs: Iterable[RuleSpec]) -> RuleRegistry:
+        """Return a copy with extra rules; the original registry is left untouched."""
+        return RuleRegistry([*self._specs, *specs])
+
+    @property
+    def specs(self) -> tuple[RuleSpec, ...]:
+        return tuple(self._specs)
+
+    def catalog(self) -> dict[str, str]:
+        catalog = dict(RULES)
+        for spec in self._specs:
+            if spec.message and spec.rule_id not in catalog:
+                catalog[spec.rule_id] = spec.message
+        return catalog
+
+    def handlers_for(self, resource_type: str) -> tuple[RuleHandler, ...]:
+        handlers = self._dispatch.get(resource_type)
+        if handlers is None:
+            typed = [
+                spec.handler
+                for spec in self._specs
+                if spec.resource_types is not None
+                and _matches_type(spec.resource_types, resource_type)
+            ]
+            generic = [spec.handler for spec in self._specs if spec.resource_types is None]
+            handlers = tuple(typed + generic)
+            self._dispatch[resource_type] = handlers
+        return handlers
+
+    def evaluate(self, context: ResourceContext) -> Iterator[RawFinding]:
+        for handler in self.handlers_for(context.resource_type):
+            for finding in handler(context):
+                if isinstance(finding, Finding):
+                    finding = RawFinding.from_model(finding)
+                yield finding
+
+
+def _matches_type(patterns: frozenset[str], resource_type: str) -> bool:
+    if resource_type in patterns:
+        return True
+    return any(
+        fnmatch.fnmatchcase(resource_type, pattern) for pattern in patterns if "*" in pattern
+    )
+
+
+_DEFAULT_REGISTRY: RuleRegistry | None = None
+# "name==version" of each entry point loaded into the default registry.
+_DEFAULT_PLUGINS: tuple[str, ...] = ()
+
+
+def get_rule_registry(native_rules: tuple[NativeRule, ...] = ()) -> RuleRegistry:
+    """Return the process-wide registry, importing built-in and plugin rules on first use.
+
+    ``native_rules`` from rule packs are appended after them; each distinct set is
+    compiled once per process.
+    """
+    global _DEFAULT_REGISTRY, _DEFAULT_PLUGINS
+    if _DEFAULT_REGISTRY is None:
+        registry = RuleRegistry()
+        importlib.import_module(BUILTIN_RULE_MODULE).register_rules(registry)
+        plugins: tuple[str, ...] = ()
+        if os.getenv("GUARDRAIL_DISABLE_RULE_PLUGINS", "").lower() not in {"1", "true", "yes"}:
+            plugins = tuple(
+                f"{entry_point.name}=={_distribution_version(entry_point)}"
+                for entry_point in _load_entry_points(registry)
+            )
+        _DEFAULT_REGISTRY = registry
+        _DEFAULT_PLUGINS = plugins
+    if native_rules:
+        return _with_native_rules(_DEFAULT_REGISTRY, native_rules)
+    return _DEFAULT_REGISTRY
+
+
+@functools.lru_cache(maxsize=16)
+def _with_native_rules(
+    registry: RuleRegistry, native_rules: tuple[NativeRule, ...]
+) -> RuleRegistry:
+    return registry.extend(
+        RuleSpec(rule.rule_id, compile_native_rule(rule), rule.resource_types, rule.description)
+        for rule in native_rules
+    )
+
+
+def rule_plugins_fingerprint() -> str:
+    """Names and distribution versions of the plugins loaded into the default registry.
+
+    Findings cache keys include this, so installing, upgrading, or removing a
+    plugin invalidates findings cached under the old rule set.
+    """
+    get_rule_registry()
+    return ",".join(sorted(_DEFAULT_PLUGINS))
+
+
+def load_entry_point_rules(registry: RuleRegistry) -> list[str]:
+    """Load third-party rule packs from the ``terraform_guardrail.rules`` entry point group.
+
+    Each entry point resolves to a callable taking the registry, e.g.
+    ``acme_rules = "acme_guardrail.rules:register_rules"``.
+    """
+    return [entry_point.name for entry_point in _load_entry_points(registry)]
+
+
+def _load_entry_points(registry: RuleRegistry) -> list[importlib.metadata.EntryPoint]:
+    loaded: list[importlib.metadata.EntryPoint] = []
+    for entry_point in importlib.metadata.entry_points(group=RULE_ENTRY_POINT_GROUP):
+        try:
+            register = entry_point.load()
+            register(registry)
+        except Exception as exc:  # noqa: BLE001
+            raise RuleRegistryError(
+                f"Failed to load rule pack '{entry_point.name}': {exc}"
+            ) from exc
+        loaded.append(entry_point)
+    return loaded
+
+
+def _distribution_version(entry_point: importlib.metadata.EntryPoint) -> str:
+    dist = getattr(entry_point, "dist", None)
+    return dist.version if dist is not None else "unknown"
@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import functools
 import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
 
-SENSITIVE_NAME_RE = re.compile(
-    r"(?i)\b(password|secret|token|api_key|apikey|access_key|private_key|client_secret|credential)\b"
-)
+# Bump whenever built-in rule logic changes so cached per-file findings are invalidated.
+RULESET_VERSION = "3"
 
-SENSITIVE_ASSIGN_RE = re.compile(
-    r"(?i)(password|secret|token|api_key|apikey|access_key|private_key|client_secret|credential)\s*=\s*\"([^\"]+)\""
+SENSITIVE_NAMES = (
+    "password",
+    "secret",
+    "token",
+    "api_key",
+    "apikey",
+    "access_key",
+    "private_key",
+    "client_secret",
+    "credential",
 )
 
+SENSITIVE_NAME_RE = re.compile(rf"(?i)\b({'|'.join(SENSITIVE_NAMES)})\b")
+
+SENSITIVE_ASSIGN_RE = re.compile(rf"(?i)({'|'.join(SENSITIVE_NAMES)})\s*=\s*\"([^\"]+)\"")
+
 RULES = {
     "TG001": "Sensitive variable without ephemeral=true",
     "TG002": "Hardcoded secret in Terraform config",
@@ -32,3 +46,199 @@ RULES = {
     "TG019": "Azure storage account public network access enabled",
     "TG020": "EBS volume not encrypted",
 }
+
+
+@dataclass(frozen=True)
+class SecretPattern:
+    """A secret detector; ``regex`` only runs on lines containing one of ``keywords``."""
+
+    pattern_id: str
+    regex: re.Pattern[str]
+    keywords: tuple[str, ...]
+    description: str = ""
+    severity: str = "high"
+
+
+@dataclass(frozen=True)
+class SecretMatch:
+    pattern: SecretPattern
+    match: re.Match[str]
+    line: int
+
+
+# The generic "<name> = \"...\"" check; its matches keep the historical TG002 shape.
+ASSIGNMENT_PATTERN_ID = "sensitive-assignment"
+
+
+def _secret(pattern_id: str, regex: str, keywords: Iterable[str], description: str):
+    return SecretPattern(pattern_id, re.compile(regex), tuple(keywords), description)
+
+
+BUILTIN_SECRET_PATTERNS: tuple[SecretPattern, ...] = (
+    SecretPattern(
+        ASSIGNMENT_PATTERN_ID,
+        SENSITIVE_ASSIGN_RE,
+        tuple(SENSITIVE_NAMES),
+        "Sensitive attribute assigned a literal value",
+    ),
+    _secret(
+        "aws-access-key-id",
+        r"\b(?:AKIA|ASIA|ABIA|ACCA)[0-9A-Z]{16}\b",
+        ("AKIA", "ASIA", "ABIA", "ACCA"),
+        "AWS access key ID",
+    ),
+    _secret(
+        "aws-secret-access-key",
+        r"(?i)aws_?secret_?access_?key[\"'\s]*[:=]\s*[\"']?[A-Za-z0-9/+=]{40}\b",
+        ("secret_access_key", "secretaccesskey", "secret_accesskey", "secretaccess_key"),
+        "AWS secret access key",
+    ),
+    _secret(
+        "github-token",
+        r"\bgh[pousr]_[A-Za-z0-9]{36,255}\b",
+        ("ghp_", "gho_", "ghu_", "ghs_", "ghr_"),
+        "GitHub token",
+    ),
+    _secret(
+        "github-fine-grained-token",
+        r"\bgithub_pat_[A-Za-z0-9_]{82}\b",
+        ("github_pat_",),
+        "GitHub fine-grained personal access token",
+    ),
+    _secret("gitlab-token", r"\bglpat-[A-Za-z0-9_-]{20}\b", ("glpat-",), "GitLab token"),
+    _secret(
+        "slack-token",
+        r"\bxox[abprs]-[A-Za-z0-9-]{10,}",
+        ("xoxa-", "xoxb-", "xoxp-", "xoxr-", "xoxs-"),
+        "Slack token",
+    ),
+    _secret(
+        "slack-webhook",
+        r"https://hooks\.slack\.com/services/[A-Za-z0-9_/-]+",
+        ("hooks.slack.com",),
+        "Slack webhook URL",
+    ),
+    _secret(
+        "private-key",
+        r"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY(?: BLOCK)?-----",
+        ("PRIVATE KEY",),
+        "Private key material",
+    ),
+    _secret("google-api-key", r"\bAIza[0-9A-Za-z_-]{35}\b", ("AIza",), "Google API key"),
+    _secret(
+        "stripe-secret-key",
+        r"\b[rs]k_live_[0-9A-Za-z]{24,}\b",
+        ("sk_live_", "rk_live_"),
+        "Stripe live secret key",
+    ),
+    _secret(
+        "azure-storage-account-key",
+        r"AccountKey=[A-Za-z0-9+/]{86}==",
+        ("AccountKey=",),
+        "Azure storage account key",
+    ),
+    _secret(
+        "sendgrid-api-key",
+        r"\bSG\.[A-Za-z0-9_-]{22}\.[A-Za-z0-9_-]{43}\b",
+        ("SG.",),
+        "SendGrid API key",
+    ),
+    _secret("npm-token", r"\bnpm_[A-Za-z0-9]{36}\b", ("npm_",), "npm access token"),
+)
+
+
+class SecretEngine:
+    """Multi-pattern secret scanner with a single-pass keyword prefilter.
+
+    All pattern keywords are folded into one trie-shaped alternation, so the
+    text is scanned once regardless of how many patterns are loaded; each
+    pattern's own regex then runs only on the lines where its keywords occur.
+    Patterns therefore never span lines; HCL keeps an attribute's name, ``=``
+    and the start of its value on one line, so only heredoc values are missed.
+    """
+
+    def __init__(self, patterns: Iterable[SecretPattern]):
+        self.patterns = tuple(patterns)
+        owners: dict[str, set[int]] = {}
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern.keywords:
+                raise ValueError(f"Secret pattern '{pattern.pattern_id}' needs a keyword.")
+            for keyword in pattern.keywords:
+                owners.setdefault(keyword.lower(), set()).add(idx)
+        # A hit on "secret_access_key" also counts for "secret" and "access_key";
+        # together with the overlapping lookahead below this mirrors Aho-Corasick
+        # output links, so no keyword occurrence is shadowed by a longer one.
+        self._by_keyword: dict[str, frozenset[int]] = {
+            keyword: frozenset().union(
+                *(indexes for other, indexes in owners.items() if other in keyword)
+            )
+            for keyword in owners
+        }
+        union = _literal_union(owners)
+        # Keywords are matched against lower-cased text: a case-sensitive scan is
+        # several times faster than re.IGNORECASE. Non-ASCII text, where lower()
+        # may shift offsets, falls back to the case-insensitive form.
+        self._prefilter = re.compile(f"(?=({union}))")
+        self._prefilter_ci = re.compile(f"(?=({union}))", re.IGNORECASE)
+
+    def scan_text(self, content: str) -> Iterator[SecretMatch]:
+        """Yield matches in text order (ties broken by pattern order)."""
+        candidates: dict[int, set[int]] = {}
+        if content.isascii():
+            hits = self._prefilter.finditer(content.lower())
+        else:
+            hits = self._prefilter_ci.finditer(content)
+        for hit in hits:
+            line_start = content.rfind("\n", 0, hit.start()) + 1
+            candidates.setdefault(line_start, set()).update(self._by_keyword[hit.group(1).lower()])
+        line_no = 1
+        last_start = 0
+        for line_start, indexes in candidates.items():
+            line_no += content.count("\n", last_start, line_start)
+            last_start = line_start
+            line_end = content.find("\n", line_start)
+            line = content[line_start : line_end if line_end != -1 else len(content)]
+            matches = [
+                (match.start(), idx, match)
+                for idx in sorted(indexes)
+                for match in self.patterns[idx].regex.finditer(line)
+            ]
+            for _, idx, match in sorted(matches, key=lambda item: item[:2]):
+                yield SecretMatch(self.patterns[idx], match, line_no)
+
+
+def _literal_union(words: Iterable[str]) -> str:
+    # Factor shared prefixes ("xoxa-|xoxb-" -> "xox(?:a-|b-)") so the regex engine
+    # can reject most positions on the first character, like an Aho-Corasick goto table.
+    trie: dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _trie_regex(trie)
+
+
+def _trie_regex(node: dict[str, dict]) -> str:
+    branches = [
+        re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char
+    ]
+    if not branches:
+        return ""
+    optional = "" in node
+    if len(branches) == 1 and not optional:
+        return branches[0]
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if optional else body
+
+
+@functools.lru_cache(maxsize=8192)
+def is_sensitive_name(name: str) -> bool:
+    """SENSITIVE_NAME_RE check memoised on the key; state reuses a few hundred names."""
+    return SENSITIVE_NAME_RE.search(name) is not None
+
+
+@functools.cache
+def recommendation_detail(text: str) -> dict[str, str]:
+    """Shared ``{"recommendation": text}`` detail for RawFindings (never mutated)."""
+    return {"recommendation": text}
@@ -1,30 +1,57 @@
 from __future__ import annotations
 
-import json
 import os
-from collections.abc import Iterable
+import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any
 
 import hcl2
 
-from terraform_guardrail.scanner.models import Finding, ScanReport, ScanSummary
+from terraform_guardrail.scanner.cache import (
+    ScanCache,
+    content_digest,
+    findings_cache_key,
+    hcl_cache_key,
+)
+from terraform_guardrail.scanner.config import ScanConfig, load_scan_config, resolve_policy_layers
+from terraform_guardrail.scanner.manifest import DEFAULT_MANIFEST_PATH, WorkspaceManifest
+from terraform_guardrail.scanner.models import Finding, RawFinding, ScanReport, ScanSummary
 from terraform_guardrail.scanner.policy_eval import (
     PolicyEvalError,
     PolicyInputFile,
     evaluate_policy_layers,
+    state_input_projection,
+)
+from terraform_guardrail.scanner.policy_input import InputProjection
+from terraform_guardrail.scanner.rule_registry import (
+    ResourceContext,
+    RuleRegistry,
+    get_rule_registry,
+    rule_plugins_fingerprint,
+)
+from terraform_guardrail.scanner.rules import (
+    ASSIGNMENT_PATTERN_ID,
+    RULES,
+    SecretMatch,
+    is_sensitive_name,
+    recommendation_detail,
+)
+from terraform_guardrail.scanner.state_stream import (
+    StateProjection,
+    StateStreamError,
+    TerraformStateReader,
 )
-from terraform_guardrail.scanner.rules import RULES, SENSITIVE_ASSIGN_RE, SENSITIVE_NAME_RE
+from terraform_guardrail.scanner.walk import TERRAFORM_EXTS, iter_scan_files
 from terraform_guardrail.schema import (
+    RESOURCE_META_ARGUMENTS,
     SchemaError,
-    allowed_keys,
     iter_resource_blocks,
-    load_provider_schema,
+    load_schema_index,
+    lock_file_digest,
 )
-
-TERRAFORM_EXTS = {".tf", ".tfvars", ".hcl"}
-PUBLIC_ACLS = {"public-read", "public-read-write"}
-PUBLIC_CIDRS = {"0.0.0.0/0", "::/0"}
-DEFAULT_REQUIRED_TAGS = ["owner", "environment", "cost_center"]
+from terraform_guardrail.schema_index import SchemaBlock, SchemaIndex
 
 
 def scan_path(
@@ -39,110 +66,415 @@ def scan_path(
     policy_app: str | None = None,
     policy_registry: str | None = None,
     policy_query: str | None = None,
+    full_policy_input: bool = False,
+    policy_jobs: int | None = None,
+    jobs: int = 1,
+    cache: bool = False,
+    cache_dir: Path | str | None = None,
+    incremental: bool = False,
+    manifest_path: Path | str | None = None,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    config: ScanConfig | None = None,
+    config_file: Path | str | None = None,
 ) -> ScanReport:
+    summary = ScanSummary()
+    raw_findings = list(
+        iter_raw_scan(
+            path,
+            state_path=state_path,
+            use_schema=use_schema,
+            policy_bundle=policy_bundle,
+            policy_bundle_path=policy_bundle_path,
+            policy_layers=policy_layers,
+            policy_base=policy_base,
+            policy_env=policy_env,
+            policy_app=policy_app,
+            policy_registry=policy_registry,
+            policy_query=policy_query,
+            full_policy_input=full_policy_input,
+            policy_jobs=policy_jobs,
+            jobs=jobs,
+            cache=cache,
+            cache_dir=cache_dir,
+            incremental=incremental,
+            manifest_path=manifest_path,
+            include=include,
+            exclude=exclude,
+            config=config,
+            config_file=config_file,
+            summary=summary,
+        )
+    )
+    report = ScanReport.empty(Path(path))
+    report.findings = [finding.to_model() for finding in raw_findings]
+    report.summary = summary
+    return report
+
+
+def iter_scan(path: Path | str, **options: Any) -> Iterator[Finding]:
+    """Yield public ``Finding`` models; takes the same options as ``iter_raw_scan``."""
+    for finding in iter_raw_scan(path, **options):
+        yield finding.to_model()
+
+
+def iter_raw_scan(
+    path: Path | str,
+    state_path: Path | str | None = None,
+    use_schema: bool = False,
+    policy_bundle: str | None = None,
+    policy_bundle_path: Path | str | None = None,
+    policy_layers: list[str] | None = None,
+    policy_base: str | None = None,
+    policy_env: str | None = None,
+    policy_app: str | None = None,
+    policy_registry: str | None = None,
+    policy_query: str | None = None,
+    full_policy_input: bool = False,
+    policy_jobs: int | None = None,
+    jobs: int = 1,
+    cache: bool = False,
+    cache_dir: Path | str | None = None,
+    incremental: bool = False,
+    manifest_path: Path | str | None = None,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    config: ScanConfig | None = None,
+    config_file: Path | str | None = None,
+    summary: ScanSummary | None = None,
+) -> Iterator[RawFinding]:
+    """Yield findings as each file completes, in the same order as ``scan_path``.
+
+    Only parsed HCL needed for policy evaluation is retained between files. When
+    ``summary`` is given it is updated in place and is complete once the
+    generator is exhausted. Findings are compact ``RawFinding`` tuples; use
+    ``iter_scan`` for pydantic models.
+    """
     path = Path(path)
     state_path = Path(state_path) if state_path else None
     if not path.exists():
         raise FileNotFoundError(f"Path not found: {path}")
+    if state_path and not state_path.exists():
+        raise FileNotFoundError(f"State file not found: {state_path}")
+    if policy_bundle_path:
+        if not Path(policy_bundle_path).exists():
+            raise FileNotFoundError(f"Policy bundle not found: {policy_bundle_path}")
+        if policy_bundle or policy_layers or policy_base or policy_env or policy_app:
+            raise ValueError("Use --policy-bundle-path without other policy bundle flags.")
+    workdir = path if path.is_dir() else path.parent
     schema = None
     if use_schema:
-        workdir = path if path.is_dir() else path.parent
         try:
-            schema = load_provider_schema(workdir)
+            schema = load_schema_index(workdir, cache_dir=cache_dir)
         except SchemaError as exc:
             raise RuntimeError(f"Schema load failed: {exc}") from exc
-    report = ScanReport.empty(path)
-    findings: list[Finding] = []
-    scanned_files = 0
+    summary = summary if summary is not None else ScanSummary()
     policy_inputs: list[PolicyInputFile] = []
     policy_state: dict | None = None
 
-    paths = _expand_paths(path)
-    for file_path in paths:
-        if file_path.suffix not in TERRAFORM_EXTS:
-            continue
-        scanned_files += 1
-        file_findings, hcl_data = _scan_hcl_file(file_path, schema)
-        findings.extend(file_findings)
-        if hcl_data is not None:
-            policy_inputs.append(PolicyInputFile(path=str(file_path), hcl=hcl_data))
-
-    if state_path:
-        if not state_path.exists():
-            raise FileNotFoundError(f"State file not found: {state_path}")
-        state_findings, state_data = _scan_state_file(state_path)
-        findings.extend(state_findings)
-        policy_state = state_data
-
-    if policy_bundle_path:
-        bundle_path = Path(policy_bundle_path)
-        if not bundle_path.exists():
-            raise FileNotFoundError(f"Policy bundle not found: {bundle_path}")
-        if policy_bundle or policy_layers or policy_base or policy_env or policy_app:
-            raise ValueError("Use --policy-bundle-path without other policy bundle flags.")
-        try:
-            findings.extend(
-                evaluate_policy_layers(
-                    bundle_ids=[],
-                    registry_url=policy_registry,
-                    files=policy_inputs,
-                    state=policy_state,
-                    policy_query=policy_query,
-                    layer_names=[],
-                    bundle_paths=[bundle_path],
+    if config is None:
+        config = load_scan_config(
+            workdir=workdir,
+            config_file=config_file,
+            policy_bundle=policy_bundle,
+            policy_layers=policy_layers,
+            policy_base=policy_base,
+            policy_env=policy_env,
+            policy_app=policy_app,
+            policy_registry=policy_registry,
+            policy_query=policy_query,
+        )
+    bundle_ids = [] if policy_bundle_path else list(config.bundle_ids)
+    needs_hcl = bool(policy_bundle_path or bundle_ids)
+
+    manifest = None
+    if incremental or manifest_path:
+        manifest = WorkspaceManifest.load(
+            Path(manifest_path) if manifest_path else workdir / DEFAULT_MANIFEST_PATH,
+            root=workdir,
+            fingerprint=_manifest_fingerprint(workdir, use_schema, config),
+        )
+    paths = [
+        item
+        for item in iter_scan_files(path, include=include, exclude=exclude)
+        if item.suffix in TERRAFORM_EXTS
+    ]
+    scan_cache = ScanCache(cache_dir) if cache or cache_dir else None
+    try:
+        for file_path, file_findings, hcl_data in _collect_file_results(
+            paths, schema, config, jobs, scan_cache, manifest, needs_hcl
+        ):
+            summary.scanned_files += 1
+            _tally(summary, file_findings)
+            yield from file_findings
+            if hcl_data is not None:
+                policy_inputs.append(PolicyInputFile(path=str(file_path), hcl=hcl_data))
+        if manifest is not None:
+            manifest.save()
+
+        if state_path:
+            projection = None
+            if needs_hcl and not full_policy_input:
+                projection = state_input_projection(
+                    bundle_ids,
+                    config.policy_registry,
+                    [Path(policy_bundle_path)] if policy_bundle_path else None,
+                    config.policy_lock,
                 )
+            state_findings, policy_state = _scan_state_file(
+                state_path,
+                keep_state=needs_hcl and (projection is None or projection.state),
+                projection=projection,
             )
-        except PolicyEvalError as exc:
-            findings.append(
-                Finding(
-                    rule_id="OPA_EVAL",
-                    severity="low",
-                    message=f"Policy evaluation failed: {exc}",
-                    path=str(path),
-                )
+            _tally(summary, state_findings)
+            yield from state_findings
+
+        if not needs_hcl:
+            return
+        policy_findings = _policy_findings(
+            path,
+            config,
+            bundle_ids,
+            Path(policy_bundle_path) if policy_bundle_path else None,
+            policy_inputs,
+            policy_state,
+            full_policy_input,
+            policy_jobs,
+            scan_cache,
+        )
+        _tally(summary, policy_findings)
+        yield from policy_findings
+    finally:
+        if scan_cache is not None:
+            scan_cache.close()
+
+
+def _policy_findings(
+    path: Path,
+    config: ScanConfig,
+    bundle_ids: list[str],
+    policy_bundle_path: Path | None,
+    policy_inputs: list[PolicyInputFile],
+    policy_state: dict | None,
+    full_policy_input: bool,
+    policy_jobs: int | None,
+    cache: ScanCache | None,
+) -> list[RawFinding]:
+    try:
+        policy_findings = evaluate_policy_layers(
+            bundle_ids=bundle_ids,
+            layer_names=[] if policy_bundle_path else list(config.layer_names),
+            registry_url=config.policy_registry,
+            files=policy_inputs,
+            state=policy_state,
+            policy_query=config.policy_query,
+            bundle_paths=[policy_bundle_path] if policy_bundle_path else None,
+            project_input=not full_policy_input,
+            cache=cache,
+            policy_jobs=policy_jobs,
+            lock=config.policy_lock,
+        )
+    except PolicyEvalError as exc:
+        policy_findings = [
+            Finding(
+                rule_id="OPA_EVAL",
+                severity="low",
+                message=f"Policy evaluation failed: {exc}",
+                path=str(path),
             )
-        report.findings = findings
-        report.summary = _build_summary(scanned_files, findings)
-        return report
+        ]
+    return [RawFinding.from_model(finding) for finding in policy_findings]
 
-    bundle_ids, layer_names = _resolve_policy_layers(
-        policy_bundle=policy_bundle,
-        policy_layers=policy_layers,
-        policy_base=policy_base,
-        policy_env=policy_env,
-        policy_app=policy_app,
-    )
-    if bundle_ids:
-        try:
-            findings.extend(
-                evaluate_policy_layers(
-                    bundle_ids=bundle_ids,
-                    layer_names=layer_names,
-                    registry_url=policy_registry,
-                    files=policy_inputs,
-                    state=policy_state,
-                    policy_query=policy_query,
-                )
-            )
-        except PolicyEvalError as exc:
-            findings.append(
-                Finding(
-                    rule_id="OPA_EVAL",
-                    severity="low",
-                    message=f"Policy evaluation failed: {exc}",
-                    path=str(path),
-                )
-            )
 
-    report.findings = findings
-    report.summary = _build_summary(scanned_files, findings)
-    return report
+def _tally(summary: ScanSummary, findings: list[RawFinding]) -> None:
+    # Count locally and update the pydantic summary once per batch.
+    counts = {"high": 0, "medium": 0}
+    for finding in findings:
+        if finding.severity in counts:
+            counts[finding.severity] += 1
+    summary.findings += len(findings)
+    summary.high += counts["high"]
+    summary.medium += counts["medium"]
+    summary.low += len(findings) - counts["high"] - counts["medium"]
+
+
+def _resolve_jobs(jobs: int) -> int:
+    if jobs < 0:
+        raise ValueError("jobs must be 0 (all cores) or a positive integer.")
+    if jobs == 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _collect_file_results(
+    paths: list[Path],
+    schema: SchemaIndex | None,
+    config: ScanConfig,
+    jobs: int,
+    cache: ScanCache | None,
+    manifest: WorkspaceManifest | None,
+    needs_hcl: bool,
+) -> Iterator[tuple[Path, list[RawFinding], dict | None]]:
+    reused: dict[Path, list[RawFinding]] = {}
+    if manifest is not None:
+        for file_path in paths:
+            stored = manifest.unchanged_findings(file_path)
+            if stored is not None:
+                reused[file_path] = stored
+    # Unchanged files are skipped outright unless policy evaluation needs their HCL,
+    # in which case they are still loaded (cheaply, when the parse cache is enabled).
+    pending = paths if needs_hcl else [item for item in paths if item not in reused]
+    results = _scan_hcl_files(pending, schema, config, jobs, cache, needs_hcl)
+    for file_path in paths:
+        if file_path in reused and not needs_hcl:
+            yield file_path, reused[file_path], None
+            continue
+        file_findings, hcl_data = next(results)
+        if manifest is not None and file_path not in reused:
+            manifest.record(file_path, file_findings)
+        yield file_path, file_findings, hcl_data
 
 
-def _expand_paths(path: Path) -> Iterable[Path]:
-    if path.is_dir():
-        return path.rglob("*")
-    return [path]
+def _manifest_fingerprint(workdir: Path, use_schema: bool, config: ScanConfig) -> str:
+    schema_marker = "no-schema"
+    if use_schema:
+        schema_marker = f"schema-{lock_file_digest(workdir) or 'none'}"
+    return findings_cache_key(schema_marker, _findings_fingerprint(config))
+
+
+def _findings_fingerprint(config: ScanConfig) -> str:
+    # Plugin rules are loaded per process, not configured, so they sit outside ScanConfig.
+    return f"{config.fingerprint}+{rule_plugins_fingerprint()}"
+
+
+def _scan_hcl_files(
+    paths: list[Path],
+    schema: SchemaIndex | None,
+    config: ScanConfig,
+    jobs: int,
+    cache: ScanCache | None = None,
+    needs_hcl: bool = True,
+) -> Iterator[tuple[list[RawFinding], dict | None]]:
+    """Scan files in input order, serving unchanged content from the parse cache."""
+    if cache is None:
+        for file_findings, hcl_data, _ in _run_file_scans(paths, schema, config, jobs):
+            yield file_findings, hcl_data
+        return
+
+    # First pass only checks which files are cached, so hits are loaded lazily in
+    # order below and no results are buffered while the misses are being scanned.
+    # The bytes read here are the ones parsed, so findings match the digest they
+    # are stored under even if a file changes mid-scan.
+    digests: list[str] = []
+    sources: list[bytes] = []
+    misses: list[int] = []
+    for index, file_path in enumerate(paths):
+        raw = file_path.read_bytes()
+        digest = content_digest(raw)
+        digests.append(digest)
+        sources.append(raw)
+        if not cache.contains("hcl", hcl_cache_key(digest)):
+            misses.append(index)
+
+    missed = set(misses)
+    scanned = _run_file_scans(
+        [paths[index] for index in misses],
+        schema,
+        config,
+        jobs,
+        [sources[index] for index in misses],
+    )
+    for index, (file_path, digest) in enumerate(zip(paths, digests, strict=True)):
+        raw = sources[index]
+        if index not in missed:
+            cached = _load_cached_scan(cache, file_path, raw, digest, schema, config, needs_hcl)
+            if cached is not None:
+                yield cached
+                continue
+            # Evicted by a concurrent prune since the first pass; scan it here.
+            file_findings, hcl_data, parse_error = _scan_hcl_file(file_path, schema, config, raw)
+        else:
+            file_findings, hcl_data, parse_error = next(scanned)
+        cache.put("hcl", hcl_cache_key(digest), {"hcl": hcl_data, "error": parse_error})
+        if schema is None:
+            cache.put(
+                "findings",
+                findings_cache_key(digest, _findings_fingerprint(config), file_path.suffix),
+                [finding.to_record() for finding in file_findings],
+            )
+        yield file_findings, hcl_data
+
+
+def _load_cached_scan(
+    cache: ScanCache,
+    path: Path,
+    raw: bytes,
+    digest: str,
+    schema: SchemaIndex | None,
+    config: ScanConfig,
+    needs_hcl: bool = True,
+) -> tuple[list[RawFinding], dict | None] | None:
+    # Schema findings depend on the provider schema, so only schema-free scans
+    # reuse stored findings; the parsed tree is still reused either way.
+    key = findings_cache_key(digest, _findings_fingerprint(config), path.suffix)
+    stored = cache.get("findings", key) if schema is None else None
+    if stored is not None and not needs_hcl:
+        # Without policy bundles the (much larger) parsed tree is never decoded.
+        path_str = sys.intern(str(path))
+        return [RawFinding.from_record(item, path_str) for item in stored], None
+    entry = cache.get("hcl", hcl_cache_key(digest))
+    if entry is None:
+        return None
+    hcl_data = entry.get("hcl")
+    if stored is not None:
+        path_str = sys.intern(str(path))
+        return [RawFinding.from_record(item, path_str) for item in stored], hcl_data
+    content = _decode_source(raw)
+    file_findings = _hcl_findings(path, content, hcl_data, entry.get("error"), schema, config)
+    if schema is None:
+        cache.put("findings", key, [item.to_record() for item in file_findings])
+    return file_findings, hcl_data
+
+
+def _run_file_scans(
+    paths: list[Path],
+    schema: SchemaIndex | None,
+    config: ScanConfig,
+    jobs: int,
+    sources: list[bytes] | None = None,
+) -> Iterator[tuple[list[RawFinding], dict | None, str | None]]:
+    """Scan ``paths`` in order, parsing ``sources`` (their already-read bytes) if given."""
+    raws: Iterable[bytes | None] = sources if sources is not None else [None] * len(paths)
+    workers = min(_resolve_jobs(jobs), len(paths))
+    if workers <= 1:
+        for file_path, raw in zip(paths, raws, strict=True):
+            yield _scan_hcl_file(file_path, schema, config, raw)
+        return
+    # Small chunks keep workers balanced when file sizes vary; map() preserves order.
+    chunksize = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_scan_worker,
+        initargs=(schema, config),
+    ) as executor:
+        yield from executor.map(_scan_hcl_file_in_worker, paths, raws, chunksize=chunksize)
+
+
+_WORKER_STATE: tuple[SchemaIndex | None, ScanConfig] | None = None
+
+
+def _init_scan_worker(schema: SchemaIndex | None, config: ScanConfig) -> None:
+    # Schema and config are shipped once per worker instead of once per file.
+    global _WORKER_STATE
+    _WORKER_STATE = (schema, config)
+
+
+def _scan_hcl_file_in_worker(
+    path: Path, raw: bytes | None
+) -> tuple[list[RawFinding], dict | None, str | None]:
+    assert _WORKER_STATE is not None
+    schema, config = _WORKER_STATE
+    return _scan_hcl_file(path, schema, config, raw)
 
 
 def _resolve_policy_layers(
@@ -152,95 +484,59 @@ def _resolve_policy_layers(
     policy_env: str | None,
     policy_app: str | None,
 ) -> tuple[list[str], list[str]]:
-    layers: list[str] = []
-    layer_names: list[str] = []
-
-    if policy_base or policy_env or policy_app:
-        if policy_base:
-            layers.append(policy_base)
-            layer_names.append("base")
-        if policy_env:
-            layers.append(policy_env)
-            layer_names.append("env")
-        if policy_app:
-            layers.append(policy_app)
-            layer_names.append("app")
-        return layers, layer_names
-
-    if policy_layers:
-        for idx, bundle in enumerate(policy_layers):
-            if bundle:
-                layers.append(bundle)
-                layer_names.append(f"layer{idx + 1}")
-        if layers:
-            return layers, layer_names
-
-    env_base = os.getenv("GUARDRAIL_POLICY_BASE")
-    env_env = os.getenv("GUARDRAIL_POLICY_ENV")
-    env_app = os.getenv("GUARDRAIL_POLICY_APP")
-    if env_base or env_env or env_app:
-        if env_base:
-            layers.append(env_base)
-            layer_names.append("base")
-        if env_env:
-            layers.append(env_env)
-            layer_names.append("env")
-        if env_app:
-            layers.append(env_app)
-            layer_names.append("app")
-        return layers, layer_names
-
-    env_layers = os.getenv("GUARDRAIL_POLICY_LAYERS")
-    if env_layers:
-        for idx, bundle in enumerate(_split_policy_bundles(env_layers)):
-            layers.append(bundle)
-            layer_names.append(f"layer{idx + 1}")
-        return layers, layer_names
-
-    bundle_id = policy_bundle or os.getenv("GUARDRAIL_POLICY_BUNDLE_ID")
-    if bundle_id:
-        layers = _split_policy_bundles(bundle_id)
-        layer_names = [f"layer{idx + 1}" for idx in range(len(layers))]
-        return layers, layer_names
-
-    return [], []
-
-
-def _split_policy_bundles(value: str) -> list[str]:
-    return [item.strip() for item in value.split(",") if item.strip()]
-
-
-def _scan_hcl_file(path: Path, schema: dict | None) -> tuple[list[Finding], dict | None]:
-    findings: list[Finding] = []
-    content = path.read_text(encoding="utf-8")
-
-    for match in SENSITIVE_ASSIGN_RE.finditer(content):
-        findings.append(
-            Finding(
-                rule_id="TG002",
-                severity="high",
-                message=RULES["TG002"],
-                path=str(path),
-                detail={
-                    "key": match.group(1),
-                    "recommendation": "Move secrets to variables or secret managers.",
-                },
-            )
-        )
+    return resolve_policy_layers(
+        policy_bundle=policy_bundle,
+        policy_layers=policy_layers,
+        policy_base=policy_base,
+        policy_env=policy_env,
+        policy_app=policy_app,
+    )
+
+
+def _decode_source(raw: bytes) -> str:
+    # Match read_text() universal-newline handling so parsing is unchanged.
+    return raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
 
+
+def _parse_hcl(content: str) -> tuple[dict | None, str | None]:
     try:
-        with path.open("r", encoding="utf-8") as handle:
-            data = hcl2.load(handle)
+        return hcl2.loads(content), None
     except Exception as exc:  # noqa: BLE001
+        return None, str(exc)
+
+
+def _scan_hcl_file(
+    path: Path, schema: SchemaIndex | None, config: ScanConfig, raw: bytes | None = None
+) -> tuple[list[RawFinding], dict | None, str | None]:
+    content = _decode_source(path.read_bytes() if raw is None else raw)
+    data, error = _parse_hcl(content)
+    return _hcl_findings(path, content, data, error, schema, config), data, error
+
+
+def _hcl_findings(
+    path: Path,
+    content: str,
+    data: dict | None,
+    parse_error: str | None,
+    schema: SchemaIndex | None,
+    config: ScanConfig,
+) -> list[RawFinding]:
+    findings: list[RawFinding] = []
+    path_str = sys.intern(str(path))
+
+    for secret in config.secret_engine.scan_text(content):
+        findings.append(_secret_finding(secret, path_str))
+
+    if data is None:
         findings.append(
-            Finding(
+            RawFinding(
                 rule_id="TG004",
                 severity="low",
-                message=f"{RULES['TG004']}: {exc}",
-                path=str(path),
+                message=f"{RULES['TG004']}: {parse_error}",
+                path=path_str,
             )
         )
-        return findings, None
+        return findings
 
     variables = data.get("variable", [])
     for block in variables:
@@ -249,64 +545,86 @@ def _scan_hcl_file(path: Path, schema: dict | None) -> tuple[list[Finding], dict
                 continue
             if attrs.get("sensitive") is True and attrs.get("ephemeral") is not True:
                 findings.append(
-                    Finding(
+                    RawFinding(
                         rule_id="TG001",
                         severity="medium",
                         message=f"{RULES['TG001']}: {name}",
-                        path=str(path),
-                        detail={"recommendation": "Add ephemeral = true to this variable."},
+                        path=path_str,
+                        detail=recommendation_detail("Add ephemeral = true to this variable."),
                     )
                 )
 
     if path.suffix == ".tfvars":
         for key in data.keys():
-            if SENSITIVE_NAME_RE.search(key):
+            if is_sensitive_name(key):
                 findings.append(
-                    Finding(
+                    RawFinding(
                         rule_id="TG002",
                         severity="high",
                         message=f"{RULES['TG002']}: {key}",
-                        path=str(path),
-                        detail={"recommendation": "Avoid hardcoding secrets in tfvars."},
+                        path=path_str,
+                        detail=recommendation_detail("Avoid hardcoding secrets in tfvars."),
                     )
                 )
 
-    findings.extend(_resource_findings(data, path))
+    findings.extend(_resource_findings(data, path, config))
 
     if schema:
         findings.extend(_schema_findings(data, schema, path))
 
-    return findings, data
+    return findings
 
 
-def _scan_state_file(path: Path) -> tuple[list[Finding], dict | None]:
-    findings: list[Finding] = []
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError as exc:
-        findings.append(
-            Finding(
-                rule_id="TG003",
-                severity="low",
-                message=f"Invalid state JSON: {exc}",
-                path=str(path),
-            )
+def _secret_finding(secret: SecretMatch, path_str: str) -> RawFinding:
+    if secret.pattern.pattern_id == ASSIGNMENT_PATTERN_ID:
+        return RawFinding(
+            rule_id="TG002",
+            severity="high",
+            message=RULES["TG002"],
+            path=path_str,
+            detail={
+                "key": secret.match.group(1),
+                "recommendation": "Move secrets to variables or secret managers.",
+            },
         )
-        return findings, None
+    return RawFinding(
+        rule_id="TG002",
+        severity=secret.pattern.severity,
+        message=f"{RULES['TG002']}: {secret.pattern.description or secret.pattern.pattern_id}",
+        path=path_str,
+        detail={
+            "pattern": secret.pattern.pattern_id,
+            "line": secret.line,
+            "recommendation": "Revoke the credential and load it from a secret manager.",
+        },
+    )
+
+
+def _scan_state_file(
+    path: Path, keep_state: bool = True, projection: InputProjection | None = None
+) -> tuple[list[RawFinding], dict | None]:
+    """Scan state one instance at a time.
 
-    for resource in data.get("resources", []):
-        for instance in resource.get("instances", []) or []:
+    ``keep_state`` retains the state for policies, narrowed to ``projection`` if given.
+    """
+    findings: list[RawFinding] = []
+    path_str = sys.intern(str(path))
+    reader = TerraformStateReader(path, keep_top_level=keep_state)
+    retained = StateProjection(projection) if keep_state else None
+    on_resource = retained.start if retained is not None else None
+    try:
+        for resource, instance in reader.iter_instances(on_resource):
             attrs = instance.get("attributes", {}) or {}
             for key, value in attrs.items():
                 if value is None:
                     continue
-                if SENSITIVE_NAME_RE.search(key):
+                if is_sensitive_name(key):
                     findings.append(
-                        Finding(
+                        RawFinding(
                             rule_id="TG003",
                             severity="high",
                             message=f"{RULES['TG003']}: {key}",
-                            path=str(path),
+                            path=path_str,
                             detail={
                                 "resource": resource.get("name"),
                                 "recommendation": (
@@ -316,258 +634,80 @@ def _scan_state_file(path: Path) -> tuple[list[Finding], dict | None]:
                             },
                         )
                     )
+            if retained is not None:
+                retained.add(instance)
+    except (StateStreamError, UnicodeDecodeError) as exc:
+        return [
+            RawFinding(
+                rule_id="TG003",
+                severity="low",
+                message=f"Invalid state JSON: {exc}",
+                path=path_str,
+            )
+        ], None
 
-    return findings, data
+    if retained is None:
+        return findings, None
+    return findings, retained.build(reader.top_level)
 
 
-def _schema_findings(hcl_data: dict, schema: dict, path: Path) -> list[Finding]:
-    findings: list[Finding] = []
+def _schema_findings(
+    hcl_data: dict, schema: SchemaIndex | dict, path: Path
+) -> list[RawFinding]:
+    if not isinstance(schema, SchemaIndex):
+        schema = SchemaIndex.from_schema(schema)
+    findings: list[RawFinding] = []
+    path_str = sys.intern(str(path))
     for resource_type, attributes in iter_resource_blocks(hcl_data):
-        allowed = allowed_keys(schema, resource_type)
-        if not allowed:
+        block = schema.block(resource_type)
+        if block is None or not block.keys:
             continue
-        for key in attributes.keys():
-            if key in allowed:
-                continue
+        for key in _unknown_schema_keys(block, attributes, resource_type, RESOURCE_META_ARGUMENTS):
             findings.append(
-                Finding(
+                RawFinding(
                     rule_id="TG005",
                     severity="medium",
-                    message=f"{RULES['TG005']}: {resource_type}.{key}",
-                    path=str(path),
-                    detail={
-                        "recommendation": "Verify the attribute name against provider schema.",
-                    },
+                    message=f"{RULES['TG005']}: {key}",
+                    path=path_str,
+                    detail=recommendation_detail(
+                        "Verify the attribute name against provider schema."
+                    ),
                 )
             )
     return findings
 
 
-def _resource_findings(hcl_data: dict, path: Path) -> list[Finding]:
-    findings: list[Finding] = []
-    required_tags = _load_csv_env("GUARDRAIL_REQUIRED_TAGS") or DEFAULT_REQUIRED_TAGS
-    allowed_regions = _load_csv_env("GUARDRAIL_ALLOWED_REGIONS")
-    blocked_regions = _load_csv_env("GUARDRAIL_BLOCKED_REGIONS")
-    allowed_instance_types = _load_csv_env("GUARDRAIL_ALLOWED_INSTANCE_TYPES")
-    allowed_skus = _load_csv_env("GUARDRAIL_ALLOWED_SKUS")
-
+def _unknown_schema_keys(
+    block: SchemaBlock, attributes: dict, prefix: str, meta: frozenset[str] = frozenset()
+) -> Iterator[str]:
+    for key, value in attributes.items():
+        # ``__is_block__`` is python-hcl2 8.x's marker on block dicts, not an attribute.
+        if key in meta or key in ("dynamic", "__is_block__"):
+            continue
+        if key not in block.keys:
+            yield f"{prefix}.{key}"
+            continue
+        nested = block.blocks.get(key)
+        if nested is None:
+            continue
+        # python-hcl2 renders each nested block as a dict inside a list.
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict):
+                yield from _unknown_schema_keys(nested, item, f"{prefix}.{key}")
+
+
+def _resource_findings(
+    hcl_data: dict,
+    path: Path,
+    config: ScanConfig,
+    registry: RuleRegistry | None = None,
+) -> list[RawFinding]:
+    registry = registry or get_rule_registry(config.native_rules)
+    findings: list[RawFinding] = []
+    path_str = sys.intern(str(path))
     for resource_type, name, attrs in _iter_resources(hcl_data):
-        resource_id = f"{resource_type}.{name}"
-
-        if resource_type == "aws_s3_bucket":
-            acl = _string_value(attrs.get("acl"))
-            if acl and acl.lower() in PUBLIC_ACLS:
-                findings.append(
-                    Finding(
-                        rule_id="TG006",
-                        severity="high",
-                        message=f"{RULES['TG006']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Remove public ACLs and use bucket policies."},
-                    )
-                )
-            if "server_side_encryption_configuration" not in attrs:
-                findings.append(
-                    Finding(
-                        rule_id="TG011",
-                        severity="medium",
-                        message=f"{RULES['TG011']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Enable default SSE with KMS or AES256."},
-                    )
-                )
-
-        if resource_type == "aws_s3_bucket_public_access_block":
-            if _s3_public_block_disabled(attrs):
-                findings.append(
-                    Finding(
-                        rule_id="TG007",
-                        severity="high",
-                        message=f"{RULES['TG007']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Enable all public access block flags."},
-                    )
-                )
-
-        if resource_type in {"aws_security_group", "aws_security_group_rule"}:
-            if _security_group_is_public(resource_type, attrs):
-                findings.append(
-                    Finding(
-                        rule_id="TG008",
-                        severity="high",
-                        message=f"{RULES['TG008']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Restrict ingress CIDRs to approved ranges."},
-                    )
-                )
-
-        if resource_type in {"aws_iam_policy", "aws_iam_role_policy"}:
-            if _iam_policy_is_wildcard(attrs):
-                findings.append(
-                    Finding(
-                        rule_id="TG009",
-                        severity="high",
-                        message=f"{RULES['TG009']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Scope IAM actions/resources explicitly."},
-                    )
-                )
-
-        if resource_type == "aws_instance":
-            if _truthy(attrs.get("associate_public_ip_address")):
-                findings.append(
-                    Finding(
-                        rule_id="TG010",
-                        severity="medium",
-                        message=f"{RULES['TG010']}: {resource_id}",
-                        path=str(path),
-                        detail={
-                            "recommendation": "Remove public IP association for private hosts."
-                        },
-                    )
-                )
-            if "subnet_id" not in attrs:
-                findings.append(
-                    Finding(
-                        rule_id="TG014",
-                        severity="low",
-                        message=f"{RULES['TG014']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Attach to an explicit subnet/VPC boundary."},
-                    )
-                )
-
-        if resource_type in {"aws_db_instance", "aws_rds_cluster"}:
-            if not _truthy(attrs.get("storage_encrypted")):
-                findings.append(
-                    Finding(
-                        rule_id="TG012",
-                        severity="medium",
-                        message=f"{RULES['TG012']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Enable storage_encrypted and KMS keys."},
-                    )
-                )
-            if _truthy(attrs.get("publicly_accessible")):
-                findings.append(
-                    Finding(
-                        rule_id="TG015",
-                        severity="high",
-                        message=f"{RULES['TG015']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Disable publicly_accessible for databases."},
-                    )
-                )
-
-        if resource_type in {"aws_lb_listener", "aws_alb_listener"}:
-            protocol = _string_value(attrs.get("protocol"))
-            if protocol and protocol.upper() == "HTTP":
-                findings.append(
-                    Finding(
-                        rule_id="TG013",
-                        severity="medium",
-                        message=f"{RULES['TG013']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Use HTTPS listeners with TLS certificates."},
-                    )
-                )
-
-        if resource_type == "aws_ebs_volume":
-            if not _truthy(attrs.get("encrypted")):
-                findings.append(
-                    Finding(
-                        rule_id="TG020",
-                        severity="medium",
-                        message=f"{RULES['TG020']}: {resource_id}",
-                        path=str(path),
-                        detail={"recommendation": "Enable encrypted volumes with KMS."},
-                    )
-                )
-
-        if resource_type == "azurerm_storage_account":
-            if _truthy(attrs.get("public_network_access_enabled")):
-                findings.append(
-                    Finding(
-                        rule_id="TG019",
-                        severity="medium",
-                        message=f"{RULES['TG019']}: {resource_id}",
-                        path=str(path),
-                        detail={
-                            "recommendation": (
-                                "Disable public network access or use private endpoints."
-                            )
-                        },
-                    )
-                )
-
-        missing_tags = _missing_required_tags(attrs, required_tags)
-        if missing_tags:
-            findings.append(
-                Finding(
-                    rule_id="TG016",
-                    severity="low",
-                    message=f"{RULES['TG016']}: {resource_id}",
-                    path=str(path),
-                    detail={"missing_tags": missing_tags},
-                )
-            )
-
-        if allowed_regions or blocked_regions:
-            for key in ("region", "location"):
-                value = _string_value(attrs.get(key))
-                if not value:
-                    continue
-                if allowed_regions and value not in allowed_regions:
-                    findings.append(
-                        Finding(
-                            rule_id="TG017",
-                            severity="medium",
-                            message=f"{RULES['TG017']}: {resource_id}",
-                            path=str(path),
-                            detail={"value": value, "allowed": allowed_regions},
-                        )
-                    )
-                    break
-                if blocked_regions and value in blocked_regions:
-                    findings.append(
-                        Finding(
-                            rule_id="TG017",
-                            severity="medium",
-                            message=f"{RULES['TG017']}: {resource_id}",
-                            path=str(path),
-                            detail={"value": value, "blocked": blocked_regions},
-                        )
-                    )
-                    break
-
-        if allowed_instance_types or allowed_skus:
-            instance_type = _string_value(attrs.get("instance_type"))
-            if (
-                instance_type
-                and allowed_instance_types
-                and instance_type not in allowed_instance_types
-            ):
-                findings.append(
-                    Finding(
-                        rule_id="TG018",
-                        severity="medium",
-                        message=f"{RULES['TG018']}: {resource_id}",
-                        path=str(path),
-                        detail={"value": instance_type, "allowed": allowed_instance_types},
-                    )
-                )
-            sku = _string_value(attrs.get("vm_size") or attrs.get("sku"))
-            if sku and allowed_skus and sku not in allowed_skus:
-                findings.append(
-                    Finding(
-                        rule_id="TG018",
-                        severity="medium",
-                        message=f"{RULES['TG018']}: {resource_id}",
-                        path=str(path),
-                        detail={"value": sku, "allowed": allowed_skus},
-                    )
-                )
-
+        context = ResourceContext(resource_type, name, attrs, path_str, config)
+        findings.extend(registry.evaluate(context))
     return findings
 
 
@@ -580,102 +720,5 @@ def _iter_resources(hcl_data: dict) -> Iterable[tuple[str, str, dict]]:
                 continue
             for name, attrs in instances.items():
                 if isinstance(attrs, dict):
-                    yield resource_type, name, attrs
-
-
-def _as_list(value: object) -> list:
-    if value is None:
-        return []
-    if isinstance(value, list):
-        return value
-    return [value]
-
-
-def _string_value(value: object) -> str | None:
-    if isinstance(value, str):
-        return value
-    return None
-
-
-def _truthy(value: object) -> bool:
-    if value is True:
-        return True
-    if isinstance(value, str):
-        return value.strip().lower() in {"true", "yes", "1", "enabled"}
-    return False
-
-
-def _load_csv_env(name: str) -> list[str]:
-    value = os.getenv(name, "")
-    if not value:
-        return []
-    return [item.strip() for item in value.split(",") if item.strip()]
-
-
-def _s3_public_block_disabled(attrs: dict) -> bool:
-    keys = [
-        "block_public_acls",
-        "block_public_policy",
-        "ignore_public_acls",
-        "restrict_public_buckets",
-    ]
-    for key in keys:
-        value = attrs.get(key)
-        if value is False or (isinstance(value, str) and value.lower() == "false"):
-            return True
-    return False
-
-
-def _security_group_is_public(resource_type: str, attrs: dict) -> bool:
-    if resource_type == "aws_security_group_rule":
-        if attrs.get("type") != "ingress":
-            return False
-        cidrs = _as_list(attrs.get("cidr_blocks")) + _as_list(attrs.get("ipv6_cidr_blocks"))
-        return any(str(cidr) in PUBLIC_CIDRS for cidr in cidrs)
-
-    for ingress in _as_list(attrs.get("ingress")):
-        if not isinstance(ingress, dict):
-            continue
-        cidrs = _as_list(ingress.get("cidr_blocks")) + _as_list(ingress.get("ipv6_cidr_blocks"))
-        if any(str(cidr) in PUBLIC_CIDRS for cidr in cidrs):
-            return True
-    return False
-
-
-def _iam_policy_is_wildcard(attrs: dict) -> bool:
-    policy = attrs.get("policy")
-    if isinstance(policy, str):
-        text = policy.replace(" ", "")
-        return "\"Action\":\"*\"" in text or "\"Resource\":\"*\"" in text
-    if isinstance(policy, dict):
-        statements = policy.get("Statement") or []
-        for statement in _as_list(statements):
-            if not isinstance(statement, dict):
-                continue
-            actions = _as_list(statement.get("Action"))
-            resources = _as_list(statement.get("Resource"))
-            if "*" in actions or "*" in resources:
-                return True
-    return False
-
-
-def _missing_required_tags(attrs: dict, required: list[str]) -> list[str]:
-    if not required:
-        return []
-    tags = attrs.get("tags")
-    if not isinstance(tags, dict):
-        tags = attrs.get("tags_all") if isinstance(attrs.get("tags_all"), dict) else {}
-    missing = [tag for tag in required if tag not in tags]
-    return missing
-
-
-def _build_summary(scanned_files: int, findings: list[Finding]) -> ScanSummary:
-    summary = ScanSummary(scanned_files=scanned_files, findings=len(findings))
-    for finding in findings:
-        if finding.severity == "high":
-            summary.high += 1
-        elif finding.severity == "medium":
-            summary.medium += 1
-        else:
-            summary.low += 1
-    return summary
+                    # python-hcl2 8.x keeps the quotes around block labels.
+                    yield resource_type.strip('"'), name.strip('"'), attrs
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+from terraform_guardrail.scanner.policy_input import InputProjection
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Per-instance members dropped when bundles declare their input (opaque provider blobs).
+SKIPPED_INSTANCE_KEYS = frozenset({"private"})
+# Decode errors this close to the end of the buffer may just be a value cut off by the chunk.
+_TRUNCATION_WINDOW = 8
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class StateStreamError(RuntimeError):
+    pass
+
+
+class _JsonReader:
+    """Pull reader over a text stream that decodes one JSON value at a time.
+
+    Only the value being decoded is buffered; consumed input is discarded on
+    each refill, so memory tracks the largest single value rather than the file.
+    """
+
+    def __init__(self, handle: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int | None = None) -> bool:
+        chunk = self._handle.read(size or self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise StateStreamError(f"Expected '{char}' but found {found!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as exc:
+                if self._eof or not _maybe_truncated(exc, len(self._buf)):
+                    raise StateStreamError(str(exc)) from exc
+                # Grow geometrically so a single huge value is re-decoded O(log n) times.
+                self._fill(max(self._chunk_size, len(self._buf) - self._pos))
+                continue
+            if end == len(self._buf) and not self._eof:
+                # A number ending exactly at the buffer edge may continue in the next chunk.
+                if self._fill():
+                    continue
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Yield object keys; the caller must consume exactly one value per key."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise StateStreamError("Object keys must be strings")
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def items(self) -> Iterator[None]:
+        """Yield once per array element; the caller must consume the element."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def finish(self) -> None:
+        if self.peek():
+            raise StateStreamError("Extra data after state document")
+
+
+def _maybe_truncated(exc: json.JSONDecodeError, buffered: int) -> bool:
+    # Anything else is invalid whatever follows, so the rest of the file is not read.
+    return exc.pos >= buffered - _TRUNCATION_WINDOW or exc.msg.startswith("Unterminated string")
+
+
+class TerraformStateReader:
+    """Stream ``resources[].instances[]`` from a tfstate file one instance at a time.
+
+    Non-resource top-level members (version, serial, outputs, ...) are collected
+    into ``top_level`` as they are passed, unless ``keep_top_level`` is false; it
+    is complete once iteration ends.
+    """
+
+    def __init__(
+        self, path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE, keep_top_level: bool = True
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.keep_top_level = keep_top_level
+        self.top_level: dict[str, Any] = {}
+
+    def iter_instances(
+        self, on_resource: Callable[[dict[str, Any]], None] | None = None
+    ) -> Iterator[tuple[dict[str, Any], dict[str, Any]]]:
+        """Yield ``(resource, instance)`` pairs.
+
+        ``resource`` holds the members seen before ``instances`` (Terraform writes
+        mode/type/name/provider first) and is shared by all of its instances.
+        ``on_resource`` is called with every resource, those without instances
+        included, as its ``instances`` array starts (or as it ends if it has none);
+        at that point ``resource["instances"]`` is an empty list the reader never fills.
+        """
+        with self.path.open(encoding="utf-8") as handle:
+            reader = _JsonReader(handle, self.chunk_size)
+            if reader.peek() != "{":
+                raise StateStreamError("State document must be a JSON object")
+            for key in reader.members():
+                if key == "resources" and reader.peek() == "[":
+                    yield from self._resources(reader, on_resource)
+                elif self.keep_top_level:
+                    self.top_level[key] = reader.value()
+                else:
+                    reader.value()
+            reader.finish()
+
+    def _resources(
+        self, reader: _JsonReader, on_resource: Callable[[dict[str, Any]], None] | None
+    ) -> Iterator[tuple[dict, dict]]:
+        for _ in reader.items():
+            if reader.peek() != "{":
+                reader.value()
+                continue
+            resource: dict[str, Any] = {}
+            started = False
+            for key in reader.members():
+                if key != "instances" or reader.peek() != "[" or started:
+                    resource[key] = reader.value()
+                    continue
+                started = True
+                resource["instances"] = []
+                if on_resource is not None:
+                    on_resource(resource)
+                for _ in reader.items():
+                    instance = reader.value()
+                    if isinstance(instance, dict):
+                        yield resource, instance
+            if not started and on_resource is not None:
+                on_resource(resource)
+
+
+class StateProjection:
+    """Builds the state handed to policy bundles while resources stream past.
+
+    Pass ``start`` as the reader's ``on_resource`` callback and ``add`` each
+    instance. Without ``projection`` the state is kept as is. With the bundles'
+    merged ``InputProjection`` only the resource types they read are retained,
+    minus per-instance ``private`` blobs.
+    """
+
+    def __init__(self, projection: InputProjection | None = None) -> None:
+        self._projection = projection
+        self._resources: list[dict[str, Any]] = []
+        self._current: dict[str, Any] | None = None
+
+    def start(self, resource: dict[str, Any]) -> None:
+        # The reader's dict is kept by reference, so members after ``instances`` land too.
+        self._current = None
+        if self._projection is None or self._projection.keeps_type(resource.get("type")):
+            self._resources.append(resource)
+            if isinstance(resource.get("instances"), list):
+                self._current = resource
+
+    def add(self, instance: dict[str, Any]) -> None:
+        if self._current is None:
+            return
+        if self._projection is not None:
+            instance = {
+                key: value for key, value in instance.items() if key not in SKIPPED_INSTANCE_KEYS
+            }
+        self._current["instances"].append(instance)
+
+    def build(self, top_level: dict[str, Any]) -> dict[str, Any]:
+        return {**top_level, "resources": self._resources}
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from terraform_guardrail.scanner.models import Finding, RawFinding, ScanSummary
+
+SARIF_VERSION = "2.1.0"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_DRIVER = {
+    "name": "Terraform Guardrail MCP",
+    "informationUri": "https://github.com/Huzefaaa2/terraform-guardrail",
+}
+SARIF_LEVELS = {"high": "error", "medium": "warning"}
+
+
+def iter_ndjson(
+    findings: Iterable[Finding | RawFinding], summary: ScanSummary, scanned_path: str
+) -> Iterator[str]:
+    """Yield one JSON line per finding, then a final ``{"summary": ...}`` line.
+
+    ``summary`` must be the object filled in by ``iter_scan`` so it is complete
+    by the time the findings are exhausted.
+    """
+    for finding in findings:
+        yield _dumps(_finding_dict(finding)) + "\n"
+    yield _dumps({"scanned_path": scanned_path, "summary": summary.model_dump()}) + "\n"
+
+
+def ndjson_error(message: str) -> str:
+    """Terminal line for a stream that failed after its first line was sent."""
+    return _dumps({"type": "error", "error": message}) + "\n"
+
+
+def iter_sarif(findings: Iterable[Finding | RawFinding]) -> Iterator[str]:
+    """Yield a SARIF 2.1.0 log in chunks, writing each result as it arrives.
+
+    The run's ``results`` are emitted before ``tool`` so the rule list can be
+    built from the findings seen; JSON object member order is not significant.
+    """
+    yield f'{{"version":"{SARIF_VERSION}","$schema":"{SARIF_SCHEMA}","runs":[{{"results":['
+    rules: dict[str, dict[str, str]] = {}
+    separator = ""
+    for finding in findings:
+        rules.setdefault(finding.rule_id, {"id": finding.rule_id, "name": finding.rule_id})
+        yield separator + _dumps(sarif_result(finding))
+        separator = ","
+    tool = {"driver": {**SARIF_DRIVER, "rules": list(rules.values())}}
+    yield f'],"tool":{_dumps(tool)}}}]}}\n'
+
+
+def sarif_result(finding: Finding | RawFinding) -> dict[str, Any]:
+    result: dict[str, Any] = {
+        "ruleId": finding.rule_id,
+        "level": SARIF_LEVELS.get(finding.severity, "note"),
+        "message": {"text": finding.message},
+    }
+    if finding.path:
+        result["locations"] = [
+            {"physicalLocation": {"artifactLocation": {"uri": finding.path}}}
+        ]
+    return result
+
+
+def _finding_dict(finding: Finding | RawFinding) -> dict[str, Any]:
+    if isinstance(finding, RawFinding):
+        return finding.to_dict()
+    return finding.model_dump()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+TERRAFORM_EXTS = frozenset({".tf", ".tfvars", ".hcl"})
+IGNORE_FILE_NAME = ".guardrailignore"
+DEFAULT_EXCLUDES = (
+    ".git/",
+    ".hg/",
+    ".svn/",
+    ".terraform/",
+    ".terragrunt-cache/",
+    ".guardrail/",
+    "node_modules/",
+    "vendor/",
+    ".venv/",
+    "venv/",
+    "__pycache__/",
+    ".tox/",
+)
+
+
+@dataclass(frozen=True)
+class IgnorePattern:
+    regex: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+
+@dataclass(frozen=True)
+class IgnoreRules:
+    """Gitignore-style patterns anchored at ``base`` (a POSIX path relative to the scan root)."""
+
+    base: str
+    patterns: tuple[IgnorePattern, ...]
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], base: str = "") -> IgnoreRules:
+        patterns = [pattern for pattern in map(compile_ignore_pattern, lines) if pattern]
+        return cls(base=base, patterns=tuple(patterns))
+
+    def match(self, rel_path: str, is_dir: bool) -> bool | None:
+        """Return True/False for the last matching pattern, None when nothing matches."""
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1 :]
+        result = None
+        for pattern in self.patterns:
+            if pattern.dir_only and not is_dir:
+                continue
+            if pattern.regex.fullmatch(rel_path):
+                result = not pattern.negate
+        return result
+
+
+def compile_ignore_pattern(line: str) -> IgnorePattern | None:
+    line = line.rstrip("\n").rstrip()
+    if not line or line.startswith("#"):
+        return None
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    body = _glob_to_regex(line)
+    if not anchored:
+        body = "(?:.*/)?" + body
+    return IgnorePattern(regex=re.compile(body), negate=negate, dir_only=dir_only)
+
+
+def _glob_to_regex(pattern: str) -> str:
+    out: list[str] = []
+    idx = 0
+    while idx < len(pattern):
+        char = pattern[idx]
+        if pattern.startswith("**/", idx):
+            out.append("(?:.*/)?")
+            idx += 3
+            continue
+        if pattern.startswith("**", idx):
+            out.append(".*")
+            idx += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", idx + 1)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[idx + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                idx = end
+        else:
+            out.append(re.escape(char))
+        idx += 1
+    return "".join(out)
+
+
+def iter_scan_files(
+    root: Path,
+    include: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+    use_ignore_files: bool = True,
+    suffixes: frozenset[str] = TERRAFORM_EXTS,
+) -> list[Path]:
+    """Walk ``root`` with os.scandir, pruning excluded directories before descending.
+
+    Results are sorted the same way as ``sorted(root.rglob("*"))`` so scans stay
+    deterministic. Symlinked directories are not followed.
+    """
+    if not root.is_dir():
+        return [root]
+    base_rules = [
+        IgnoreRules.from_lines(DEFAULT_EXCLUDES),
+        IgnoreRules.from_lines(exclude or ()),
+    ]
+    include_rules = IgnoreRules.from_lines(include or ())
+    results: list[Path] = []
+    _walk(root, "", base_rules, include_rules, use_ignore_files, suffixes, results)
+    return results
+
+
+def _walk(
+    directory: Path,
+    rel_dir: str,
+    rules: list[IgnoreRules],
+    include_rules: IgnoreRules,
+    use_ignore_files: bool,
+    suffixes: frozenset[str],
+    results: list[Path],
+) -> None:
+    if use_ignore_files:
+        ignore_file = directory / IGNORE_FILE_NAME
+        if ignore_file.is_file():
+            lines = ignore_file.read_text(encoding="utf-8").splitlines()
+            # Deeper ignore files override shallower ones; CLI excludes always win.
+            rules = [*rules[:-1], IgnoreRules.from_lines(lines, base=rel_dir), rules[-1]]
+    try:
+        with os.scandir(directory) as scanner:
+            entries = sorted(scanner, key=lambda entry: entry.name)
+    except (PermissionError, FileNotFoundError):
+        return
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if not is_dir and os.path.splitext(entry.name)[1] not in suffixes:
+            continue
+        if _is_ignored(rules, rel_path, is_dir):
+            continue
+        if is_dir:
+            _walk(
+                Path(entry.path),
+                rel_path,
+                rules,
+                include_rules,
+                use_ignore_files,
+                suffixes,
+                results,
+            )
+        elif entry.is_file() and _is_included(include_rules, rel_path):
+            results.append(Path(entry.path))
+
+
+def _is_included(include_rules: IgnoreRules, rel_path: str) -> bool:
+    if not include_rules.patterns:
+        return True
+    if include_rules.match(rel_path, False):
+        return True
+    # A directory pattern such as "modules/" includes everything beneath it.
+    parts = rel_path.split("/")[:-1]
+    return any(
+        include_rules.match("/".join(parts[: idx + 1]), True) for idx in range(len(parts))
+    )
+
+
+def _is_ignored(rules: list[IgnoreRules], rel_path: str, is_dir: bool) -> bool:
+    ignored = False
+    for rule_set in rules:
+        result = rule_set.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
@@ -1,18 +1,190 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import json
+import os
+import shutil
 import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
 from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
+from terraform_guardrail.scanner.cache import get_cache_dir
+from terraform_guardrail.schema_index import SchemaIndex, SchemaIndexError, build_schema_index
+
+LOCK_FILE_NAME = ".terraform.lock.hcl"
+SCHEMA_CACHE_SUBDIR = "provider-schemas"
+# Parsed schemas are tens of MB each, so only the most recent few stay in memory.
+SCHEMA_MEMO_SIZE = 2
+# Indexes are a small directory over a memory-mapped file, so more of them can stay open.
+INDEX_MEMO_SIZE = 8
+SCHEMA_CACHE_PATTERNS = ("*.json", "*.idx")
+# Terraform meta-arguments are valid on every resource but absent from provider schemas.
+RESOURCE_META_ARGUMENTS = frozenset(
+    {"count", "for_each", "depends_on", "provider", "lifecycle", "provisioner", "connection"}
+)
+
 
 class SchemaError(RuntimeError):
     pass
 
 
-def load_provider_schema(workdir: Path) -> dict[str, Any] | None:
-    """Return Terraform provider schema JSON if terraform is available."""
+_SCHEMA_MEMO: OrderedDict[str, dict[str, Any]] = OrderedDict()
+_INDEX_MEMO: OrderedDict[str, SchemaIndex] = OrderedDict()
+_SCHEMA_MEMO_LOCK = threading.Lock()
+
+
+def load_provider_schema(
+    workdir: Path,
+    cache_dir: Path | str | None = None,
+    use_cache: bool = True,
+) -> dict[str, Any] | None:
+    """Return Terraform provider schema JSON if terraform is available.
+
+    Schemas are cached on disk (and in memory) under the digest of
+    ``.terraform.lock.hcl`` plus the Terraform version, so workspaces pinning the
+    same providers share one entry and repeat scans skip the subprocess.
+    """
+    key = schema_cache_key(workdir) if use_cache else None
+    if key is None:
+        output = _run_schema_command(workdir)
+        return _parse_schema(output) if output is not None else None
+
+    with _SCHEMA_MEMO_LOCK:
+        if key in _SCHEMA_MEMO:
+            _SCHEMA_MEMO.move_to_end(key)
+            return _SCHEMA_MEMO[key]
+
+    cache_path = schema_cache_dir(cache_dir) / f"{key}.json"
+    try:
+        schema = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        output = _run_schema_command(workdir)
+        if output is None:
+            return None
+        schema = _parse_schema(output)
+        _write_atomic(cache_path, output)
+
+    with _SCHEMA_MEMO_LOCK:
+        _SCHEMA_MEMO[key] = schema
+        while len(_SCHEMA_MEMO) > SCHEMA_MEMO_SIZE:
+            _SCHEMA_MEMO.popitem(last=False)
+    return schema
+
+
+def load_schema_index(
+    workdir: Path,
+    cache_dir: Path | str | None = None,
+    use_cache: bool = True,
+) -> SchemaIndex | None:
+    """Return a lazily loaded resource-type index of the provider schema.
+
+    The index is built once per cache key and stored as ``<key>.idx`` next to the
+    schema cache; scans map that file instead of holding the parsed schema JSON.
+    """
+    key = schema_cache_key(workdir) if use_cache else None
+    if key is None:
+        output = _run_schema_command(workdir)
+        return SchemaIndex.from_schema(_parse_schema(output)) if output is not None else None
+
+    with _SCHEMA_MEMO_LOCK:
+        if key in _INDEX_MEMO:
+            _INDEX_MEMO.move_to_end(key)
+            return _INDEX_MEMO[key]
+
+    cache_root = schema_cache_dir(cache_dir)
+    index_path = cache_root / f"{key}.idx"
+    try:
+        index = SchemaIndex.open(index_path)
+    except (OSError, ValueError, SchemaIndexError):
+        try:
+            output = (cache_root / f"{key}.json").read_text(encoding="utf-8")
+        except OSError:
+            output = _run_schema_command(workdir)
+        if output is None:
+            return None
+        _write_atomic(index_path, build_schema_index(_parse_schema(output)))
+        index = SchemaIndex.open(index_path)
+
+    with _SCHEMA_MEMO_LOCK:
+        _INDEX_MEMO[key] = index
+        while len(_INDEX_MEMO) > INDEX_MEMO_SIZE:
+            _INDEX_MEMO.popitem(last=False)
+    return index
+
+
+def schema_cache_key(workdir: Path) -> str | None:
+    """Cache key for ``workdir``'s providers, or None when it cannot be cached."""
+    lock_digest = lock_file_digest(workdir)
+    version = terraform_version()
+    if lock_digest is None or version is None:
+        return None
+    return hashlib.sha256(f"{lock_digest}\0{version}".encode()).hexdigest()
+
+
+def lock_file_digest(workdir: Path) -> str | None:
+    lock_file = workdir / LOCK_FILE_NAME
+    try:
+        return hashlib.sha256(lock_file.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def terraform_version() -> str | None:
+    binary = shutil.which("terraform")
+    if not binary:
+        return None
+    try:
+        mtime = os.stat(binary).st_mtime_ns
+    except OSError:
+        return None
+    return _terraform_version(binary, mtime)
+
+
+@functools.lru_cache(maxsize=4)
+def _terraform_version(binary: str, mtime_ns: int) -> str | None:
+    # Keyed on the binary's mtime so an in-place upgrade is picked up.
+    try:
+        result = subprocess.run(
+            [binary, "version", "-json"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return str(json.loads(result.stdout)["terraform_version"])
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+        return None
+
+
+def schema_cache_dir(cache_dir: Path | str | None = None) -> Path:
+    return get_cache_dir(cache_dir) / SCHEMA_CACHE_SUBDIR
+
+
+def schema_cache_usage(cache_dir: Path | str | None = None) -> tuple[int, int]:
+    """Return (entries, bytes) of cached provider schemas."""
+    root = schema_cache_dir(cache_dir)
+    files = [item for pattern in SCHEMA_CACHE_PATTERNS for item in root.glob(pattern)]
+    return len(files), sum(item.stat().st_size for item in files)
+
+
+def clear_schema_cache(cache_dir: Path | str | None = None) -> int:
+    removed = 0
+    root = schema_cache_dir(cache_dir)
+    for pattern in SCHEMA_CACHE_PATTERNS:
+        for item in root.glob(pattern):
+            item.unlink(missing_ok=True)
+            removed += 1
+    with _SCHEMA_MEMO_LOCK:
+        _SCHEMA_MEMO.clear()
+        _INDEX_MEMO.clear()
+    return removed
+
+
+def _run_schema_command(workdir: Path) -> str | None:
     try:
         result = subprocess.run(
             ["terraform", "providers", "schema", "-json"],
@@ -25,30 +197,44 @@ def load_provider_schema(workdir: Path) -> dict[str, Any] | None:
         return None
     except subprocess.CalledProcessError as exc:
         raise SchemaError(exc.stderr.strip() or "terraform schema command failed") from exc
+    return result.stdout
 
+
+def _parse_schema(output: str) -> dict[str, Any]:
     try:
-        return json.loads(result.stdout)
+        return json.loads(output)
     except json.JSONDecodeError as exc:
         raise SchemaError("Invalid schema JSON output") from exc
 
 
+def _write_atomic(path: Path, content: str | bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".schema-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(content.encode("utf-8") if isinstance(content, str) else content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
 def iter_resource_blocks(hcl_data: dict[str, Any]) -> Iterable[tuple[str, dict[str, Any]]]:
     for block in hcl_data.get("resource", []) or []:
+        if not isinstance(block, dict):
+            continue
         for resource_type, instances in block.items():
+            if not isinstance(instances, dict):
+                continue
             for _, attributes in instances.items():
                 if isinstance(attributes, dict):
-                    yield resource_type, attributes
+                    # python-hcl2 8.x keeps the quotes around block labels.
+                    yield resource_type.strip('"'), attributes
 
 
-def allowed_keys(schema: dict[str, Any], resource_type: str) -> set[str] | None:
-    provider_schemas = schema.get("provider_schemas", {})
-    for provider_schema in provider_schemas.values():
-        resource_schemas = provider_schema.get("resource_schemas", {})
-        resource_schema = resource_schemas.get(resource_type)
-        if not resource_schema:
-            continue
-        block = resource_schema.get("block", {})
-        attributes = set(block.get("attributes", {}).keys())
-        block_types = set(block.get("block_types", {}).keys())
-        return attributes | block_types
-    return None
+def allowed_keys(
+    schema: SchemaIndex | dict[str, Any], resource_type: str
+) -> frozenset[str] | None:
+    if not isinstance(schema, SchemaIndex):
+        schema = SchemaIndex.from_schema(schema)
+    return schema.allowed_keys(resource_type)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+INDEX_MAGIC = b"TGSCHEMAIDX1"
+_LENGTH = struct.Struct("<Q")
+_DATA_START = len(INDEX_MAGIC) + _LENGTH.size
+
+
+class SchemaIndexError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class SchemaBlock:
+    attributes: frozenset[str]
+    blocks: Mapping[str, SchemaBlock] = field(default_factory=dict)
+    keys: frozenset[str] = field(default=frozenset(), compare=False)
+
+    @classmethod
+    def decode(cls, entry: list[Any]) -> SchemaBlock:
+        attributes, blocks = entry
+        nested = {name: cls.decode(child) for name, child in blocks.items()}
+        return cls(frozenset(attributes), nested, frozenset(attributes) | frozenset(nested))
+
+
+class SchemaIndex:
+    """Resource type -> attribute/block names, built once from provider schema JSON.
+
+    The on-disk form is ``magic | u64 directory length | directory JSON | entries``
+    where the directory maps each resource type to the (offset, length) of its
+    entry. Files are memory-mapped and entries are decoded on first lookup, so a
+    scan only materialises the resource types it actually meets.
+    """
+
+    def __init__(self, buffer: bytes | mmap.mmap, path: Path | None = None):
+        if buffer[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise SchemaIndexError("Not a provider schema index")
+        (dir_length,) = _LENGTH.unpack_from(buffer, len(INDEX_MAGIC))
+        self._buffer = buffer
+        self._path = path
+        self._entries_start = _DATA_START + dir_length
+        self._directory: dict[str, list[int]] = json.loads(
+            bytes(buffer[_DATA_START : self._entries_start])
+        )
+        self._blocks: dict[str, SchemaBlock] = {}
+
+    @classmethod
+    def open(cls, path: Path) -> SchemaIndex:
+        with path.open("rb") as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    @classmethod
+    def from_schema(cls, schema: dict[str, Any]) -> SchemaIndex:
+        return cls(build_schema_index(schema))
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Worker processes re-map the file instead of receiving a copy of it.
+        if self._path is not None:
+            return (SchemaIndex.open, (self._path,))
+        return (SchemaIndex, (bytes(self._buffer),))
+
+    def __len__(self) -> int:
+        return len(self._directory)
+
+    def __contains__(self, resource_type: object) -> bool:
+        return resource_type in self._directory
+
+    def block(self, resource_type: str) -> SchemaBlock | None:
+        block = self._blocks.get(resource_type)
+        if block is None:
+            location = self._directory.get(resource_type)
+            if location is None:
+                return None
+            start = self._entries_start + location[0]
+            entry = json.loads(bytes(self._buffer[start : start + location[1]]))
+            block = self._blocks[resource_type] = SchemaBlock.decode(entry)
+        return block
+
+    def allowed_keys(self, resource_type: str) -> frozenset[str] | None:
+        block = self.block(resource_type)
+        return block.keys if block is not None else None
+
+
+def build_schema_index(schema: dict[str, Any]) -> bytes:
+    """Serialise ``terraform providers schema -json`` output into the index format."""
+    directory: dict[str, list[int]] = {}
+    chunks: list[bytes] = []
+    offset = 0
+    for provider_schema in (schema.get("provider_schemas") or {}).values():
+        resource_schemas = provider_schema.get("resource_schemas") or {}
+        for resource_type, resource_schema in resource_schemas.items():
+            # The first provider defining a type wins.
+            if resource_type in directory or not resource_schema:
+                continue
+            entry = json.dumps(
+                _encode_block(resource_schema.get("block") or {}), separators=(",", ":")
+            ).encode("utf-8")
+            directory[resource_type] = [offset, len(entry)]
+            chunks.append(entry)
+            offset += len(entry)
+    header = json.dumps(directory, separators=(",", ":")).encode("utf-8")
+    return b"".join([INDEX_MAGIC, _LENGTH.pack(len(header)), header, *chunks])
+
+
+def _encode_block(block: dict[str, Any]) -> list[Any]:
+    nested = {
+        name: _encode_block(block_type.get("block") or {})
+        for name, block_type in (block.get("block_types") or {}).items()
+    }
+    return [sorted(block.get("attributes") or {}), nested]
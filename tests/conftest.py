@@ -3,7 +3,18 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registry_index():
+    from terraform_guardrail.policy_registry import clear_registry_index_cache
+
+    clear_registry_index_cache()
+    yield
+    clear_registry_index_cache()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 
 from fastapi.testclient import TestClient
@@ -112,3 +113,52 @@ variable \"db_password\" {
     assert response.status_code == 200
     payload = response.json()
     assert payload["summary"]["findings"] >= 1
+
+
+def test_scan_endpoint_bounds_jobs(tmp_path: Path) -> None:
+    client = TestClient(create_app())
+    for field in ("jobs", "policy_jobs"):
+        response = client.post("/scan", json={"path": str(tmp_path), field: 10_000})
+        assert response.status_code == 422
+    response = client.post("/scan", json={"path": str(tmp_path), "jobs": 0})
+    assert response.status_code == 200
+
+
+def test_scan_endpoint_streams_ndjson(tmp_path: Path) -> None:
+    (tmp_path / "secrets.tfvars").write_text('db_password = "hunter2"\n', encoding="utf-8")
+
+    client = TestClient(create_app())
+    response = client.post("/scan", json={"path": str(tmp_path), "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["rule_id"] == "TG002"
+    assert lines[-1]["summary"]["findings"] == len(lines) - 1
+
+    missing = client.post("/scan", json={"path": str(tmp_path / "nope"), "stream": True})
+    assert missing.status_code == 400
+    no_state = client.post(
+        "/scan",
+        json={"path": str(tmp_path), "state_path": str(tmp_path / "nope.tfstate"), "stream": True},
+    )
+    assert no_state.status_code == 400
+    assert "State file not found" in no_state.json()["detail"]
+
+
+def test_scan_stream_ends_with_error_record(monkeypatch, tmp_path: Path) -> None:
+    (tmp_path / "secrets.tfvars").write_text('db_password = "hunter2"\n', encoding="utf-8")
+    state = tmp_path / "terraform.tfstate"
+    state.write_text("{}", encoding="utf-8")
+
+    def broken_state(*_args, **_kwargs):
+        raise RuntimeError("state exploded")
+
+    monkeypatch.setattr("terraform_guardrail.scanner.scan._scan_state_file", broken_state)
+    client = TestClient(create_app())
+    response = client.post(
+        "/scan", json={"path": str(tmp_path), "state_path": str(state), "stream": True}
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["rule_id"] == "TG002"
+    assert lines[-1] == {"type": "error", "error": "state exploded"}
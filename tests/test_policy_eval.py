@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import io
+import json
+import os
+import signal
+import sys
+import tarfile
+from pathlib import Path
 from types import SimpleNamespace
 
+import pytest
+
 from terraform_guardrail.policy_registry import PolicyBundle
+from terraform_guardrail.scanner import opa_server
+from terraform_guardrail.scanner.cache import ScanCache
+from terraform_guardrail.scanner.opa_wasm import go_sprintf
+from terraform_guardrail.scanner.policy_cache import PolicyResultCache
 from terraform_guardrail.scanner.policy_eval import (
     PolicyEvalError,
     PolicyInputFile,
     evaluate_policy_bundle,
+    evaluate_policy_bundle_path,
 )
+from terraform_guardrail.scanner.policy_input import InputProjection
+from terraform_guardrail.scanner.policy_shard import shard_files
 
 
 def test_policy_eval_parses_findings(monkeypatch, tmp_path) -> None:
@@ -26,7 +42,7 @@ def test_policy_eval_parses_findings(monkeypatch, tmp_path) -> None:
         lambda *_: bundle,
     )
     monkeypatch.setattr(
-        "terraform_guardrail.scanner.policy_eval.download_bundle",
+        "terraform_guardrail.scanner.policy_eval.fetch_bundle",
         lambda *_: tmp_path,
     )
     monkeypatch.setattr(
@@ -70,7 +86,7 @@ def test_policy_eval_failure(monkeypatch, tmp_path) -> None:
         lambda *_: bundle,
     )
     monkeypatch.setattr(
-        "terraform_guardrail.scanner.policy_eval.download_bundle",
+        "terraform_guardrail.scanner.policy_eval.fetch_bundle",
         lambda *_: tmp_path,
     )
     monkeypatch.setattr(
@@ -93,3 +109,388 @@ def test_policy_eval_failure(monkeypatch, tmp_path) -> None:
         )
     except PolicyEvalError as exc:
         assert "bad policy" in str(exc)
+
+
+FAKE_OPA_SERVER = '''
+import json, sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+host, port = sys.argv[sys.argv.index("--addr") + 1].split(":")
+with open(sys.argv[0] + ".starts", "a") as log:
+    log.write("start\\n")
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send({})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        files = payload["input"]["files"]
+        self._send({"result": [{"message": self.path, "rule_id": f"OPA{len(files)}"}]})
+
+
+HTTPServer((host, int(port)), Handler).serve_forever()
+'''
+
+
+def test_policy_eval_server_mode_reuses_and_restarts(monkeypatch, tmp_path) -> None:
+    fake_opa = tmp_path / "opa"
+    fake_opa.write_text(f"#!{sys.executable}\n{FAKE_OPA_SERVER}", encoding="utf-8")
+    fake_opa.chmod(0o755)
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+    monkeypatch.setenv("GUARDRAIL_OPA_MODE", "server")
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: str(fake_opa)
+    )
+
+    def evaluate() -> list:
+        return evaluate_policy_bundle_path(
+            bundle_path=bundle_dir,
+            files=[PolicyInputFile(path="main.tf", hcl={})],
+            state=None,
+        )
+
+    try:
+        findings = evaluate()
+        assert findings[0].rule_id == "OPA1"
+        assert findings[0].message == "/v1/data/guardrail/baseline/deny"
+        evaluate()
+        starts = tmp_path / "opa.starts"
+        assert starts.read_text().count("start") == 1
+
+        server = opa_server._SERVERS[f"path:{bundle_dir.resolve()}"]
+        os.kill(server.pid, signal.SIGKILL)
+        server._process.wait()
+        assert evaluate()[0].rule_id == "OPA1"
+        assert starts.read_text().count("start") == 2
+    finally:
+        opa_server.shutdown_opa_servers()
+
+
+def test_opa_servers_are_capped_and_stopped_when_idle(monkeypatch, tmp_path) -> None:
+    fake_opa = tmp_path / "opa"
+    fake_opa.write_text(f"#!{sys.executable}\n{FAKE_OPA_SERVER}", encoding="utf-8")
+    fake_opa.chmod(0o755)
+    monkeypatch.setenv("GUARDRAIL_OPA_MAX_SERVERS", "2")
+    monkeypatch.setenv("GUARDRAIL_OPA_IDLE_TIMEOUT", "0")
+
+    def server(slot: str, fingerprint: tuple = ()) -> opa_server.OpaServer:
+        with opa_server.lease_opa_server(
+            slot, str(fake_opa), lambda workdir: workdir, fingerprint
+        ) as leased:
+            return leased
+
+    try:
+        first = server("a")
+        first.evaluate("guardrail/baseline/deny", {"files": []})
+        server("b")
+        assert server("a") is first
+        server("c")
+        assert list(opa_server._SERVERS) == ["a", "c"]
+
+        pid = first.pid
+        assert opa_server.stop_idle_opa_servers(max_idle=0) == 1
+        assert first.pid is None
+        assert first.evaluate("guardrail/baseline/deny", {"files": []})[0]["rule_id"] == "OPA0"
+        assert first.pid not in (None, pid)
+
+        # A leased server is neither evicted nor closed by a rebuild until it is released.
+        with opa_server.lease_opa_server("a", str(fake_opa), lambda workdir: workdir) as leased:
+            server("b")
+            server("d")
+            assert "a" in opa_server._SERVERS
+            replaced = server("a", fingerprint=("v2",))
+            assert replaced is not leased
+            assert leased.evaluate("guardrail/baseline/deny", {"files": []})
+        assert leased.pid is None
+        with pytest.raises(opa_server.OpaServerError, match="closed"):
+            leased.evaluate("guardrail/baseline/deny", {"files": []})
+    finally:
+        opa_server.shutdown_opa_servers()
+
+
+def test_policy_input_projected_from_bundle_manifest(monkeypatch, tmp_path) -> None:
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+    spec = {"hcl": ["resource"], "resource_types": ["aws_s3_*"], "state": False}
+    (bundle_dir / ".manifest").write_text(
+        json.dumps({"metadata": {"guardrail": {"input": spec}}}), encoding="utf-8"
+    )
+    hcl = {
+        "variable": [{"token": {"sensitive": True}}],
+        "resource": [
+            {'"aws_s3_bucket"': {'"logs"': {"acl": "private"}}},
+            {'"aws_instance"': {'"web"': {"ami": "ami-1"}}},
+        ],
+    }
+    payloads: list[dict] = []
+
+    def fake_run(cmd, **_kwargs):
+        payloads.append(json.loads(Path(cmd[cmd.index("--input") + 1]).read_text()))
+        return SimpleNamespace(returncode=0, stdout='{"result":[]}', stderr="")
+
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: "/usr/bin/opa"
+    )
+    monkeypatch.setattr("terraform_guardrail.scanner.policy_eval.subprocess.run", fake_run)
+
+    for project_input in (True, False):
+        evaluate_policy_bundle_path(
+            bundle_path=bundle_dir,
+            files=[PolicyInputFile(path="main.tf", hcl=hcl)],
+            state={"resources": [{"type": "aws_instance"}]},
+            project_input=project_input,
+        )
+    projected, full = payloads
+    assert projected == {
+        "files": [{"path": "main.tf", "hcl": {"resource": [hcl["resource"][0]]}}],
+        "state": None,
+    }
+    assert full["files"][0]["hcl"] == hcl
+    assert full["state"] == {"resources": [{"type": "aws_instance"}]}
+
+
+def test_per_file_policy_results_cached(monkeypatch, tmp_path) -> None:
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+    guardrail = {"per_file": True, "input": {"hcl": ["resource"]}}
+    (bundle_dir / ".manifest").write_text(
+        json.dumps({"metadata": {"guardrail": guardrail}}), encoding="utf-8"
+    )
+    sent: list[list[str]] = []
+
+    def fake_run(cmd, **_kwargs):
+        payload = json.loads(Path(cmd[cmd.index("--input") + 1]).read_text())
+        paths = [file["path"] for file in payload["files"]]
+        sent.append(paths)
+        value = [{"message": f"hit {p}", "rule_id": "PF001", "path": p} for p in paths]
+        output = json.dumps({"result": [{"expressions": [{"value": value}]}]})
+        return SimpleNamespace(returncode=0, stdout=output, stderr="")
+
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: "/usr/bin/opa"
+    )
+    monkeypatch.setattr("terraform_guardrail.scanner.policy_eval.subprocess.run", fake_run)
+
+    def evaluate(files: list[PolicyInputFile], project_input: bool = True) -> list:
+        with ScanCache(tmp_path / "cache") as cache:
+            return evaluate_policy_bundle_path(
+                bundle_path=bundle_dir,
+                files=files,
+                state=None,
+                cache=cache,
+                project_input=project_input,
+            )
+
+    files = [
+        PolicyInputFile(path="a.tf", hcl={"resource": [{"x": {"a": {}}}]}),
+        PolicyInputFile(path="b.tf", hcl={"resource": [{"x": {"b": {}}}]}),
+    ]
+    first = evaluate(files)
+    files[1] = PolicyInputFile(path="b.tf", hcl={"resource": [{"x": {"b2": {}}}]})
+    second = evaluate(files)
+
+    assert sent == [["a.tf", "b.tf"], ["b.tf"]]
+    assert [f.message for f in first] == [f.message for f in second] == ["hit a.tf", "hit b.tf"]
+
+    # Results computed from a differently shaped input are not reused.
+    evaluate(files, project_input=False)
+    assert sent[-1] == ["a.tf", "b.tf"]
+    evaluate(files, project_input=False)
+    assert len(sent) == 3
+
+
+def test_policy_result_cache_keys_by_input_projection(tmp_path) -> None:
+    def projection(types: list[str]) -> InputProjection | None:
+        spec = {"resource_types": types}
+        return InputProjection.from_manifest({"metadata": {"guardrail": {"input": spec}}})
+
+    file = PolicyInputFile(path="a.tf", hcl={})
+    with ScanCache(tmp_path / "cache") as cache:
+        keys = {
+            PolicyResultCache(cache, "digest", "data.q", item).file_key(file)
+            for item in (None, projection(["aws_*"]), projection(["aws_s3_*"]))
+        }
+        same = PolicyResultCache(cache, "digest", "data.q", projection(["b", "a"]))
+        assert same.file_key(file) == PolicyResultCache(
+            cache, "digest", "data.q", projection(["a", "b"])
+        ).file_key(file)
+    assert len(keys) == 3
+
+
+def test_sharded_policy_eval_balances_and_dedupes(monkeypatch, tmp_path) -> None:
+    files = []
+    for idx, size in enumerate([900, 500, 400, 300, 100, 100]):
+        tf = tmp_path / f"f{idx}.tf"
+        tf.write_text("#" * size, encoding="utf-8")
+        files.append(PolicyInputFile(path=str(tf), hcl={}))
+    shards = shard_files(files, 3)
+    loads = [sum(Path(file.path).stat().st_size for file in shard) for shard in shards]
+    assert sorted(loads) == [700, 700, 900]
+
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+    sent: list[int] = []
+
+    states: list[dict | None] = []
+
+    def fake_run(cmd, **_kwargs):
+        payload = json.loads(Path(cmd[cmd.index("--input") + 1]).read_text())
+        sent.append(len(payload["files"]))
+        states.append(payload["state"])
+        value = [{"message": "repo-wide", "rule_id": "G1"}] * 2 + [
+            {"message": "hit", "rule_id": "F1", "path": file["path"]} for file in payload["files"]
+        ]
+        # A per-file rule that joins each file with the state.
+        if payload["state"] is not None:
+            value += [
+                {"message": "joined", "rule_id": "J1", "path": f["path"]} for f in payload["files"]
+            ]
+        output = json.dumps({"result": [{"expressions": [{"value": value}]}]})
+        return SimpleNamespace(returncode=0, stdout=output, stderr="")
+
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: "/usr/bin/opa"
+    )
+    monkeypatch.setattr("terraform_guardrail.scanner.policy_eval.subprocess.run", fake_run)
+
+    state = {"resources": []}
+    findings = evaluate_policy_bundle_path(
+        bundle_path=bundle_dir, files=files, state=state, policy_jobs=3
+    )
+    assert sorted(sent) == [1, 2, 3]
+    assert states == [state] * 3
+    # Repeats within a shard are kept; the same repeats from other shards are not.
+    assert [f.rule_id for f in findings].count("G1") == 2
+    assert sorted(f.path for f in findings if f.rule_id == "F1") == sorted(f.path for f in files)
+    assert sorted(f.path for f in findings if f.rule_id == "J1") == sorted(f.path for f in files)
+
+    (bundle_dir / ".manifest").write_text(
+        json.dumps({"metadata": {"guardrail": {"shardable": False}}}), encoding="utf-8"
+    )
+    sent.clear()
+    evaluate_policy_bundle_path(bundle_path=bundle_dir, files=files, state=None, policy_jobs=3)
+    assert sent == [6]
+
+
+# A hand-written module following the OPA Wasm ABI: data.guardrail.deny returns one
+# finding whose message comes from the host's sprintf and whose detail is the input.
+WASM_POLICY = r"""
+(module
+  (import "env" "memory" (memory 2))
+  (import "env" "opa_abort" (func $abort (param i32)))
+  (import "env" "opa_builtin2" (func $builtin2 (param i32 i32 i32 i32) (result i32)))
+  (global $heap (mut i32) (i32.const 4096))
+  (data (i32.const 16) "{\"sprintf\":0}\00")
+  (data (i32.const 64) "{\"guardrail/deny\":0}\00")
+  (data (i32.const 128) "\"%s has %d files\"\00")
+  (data (i32.const 192) "[\"input\",1]\00")
+  (data (i32.const 256) "[{\"result\":[{\"rule_id\":\"W1\",\"message\":\00")
+  (data (i32.const 320) ",\"detail\":\00")
+  (data (i32.const 384) "}]}]\00")
+  (func $strlen (param $p i32) (result i32) (local $n i32)
+    (block $done
+      (loop $next
+        (br_if $done (i32.eqz (i32.load8_u (i32.add (local.get $p) (local.get $n)))))
+        (local.set $n (i32.add (local.get $n) (i32.const 1)))
+        (br $next)))
+    (local.get $n))
+  (func $malloc (export "opa_malloc") (param $size i32) (result i32) (local $p i32)
+    (local.set $p (global.get $heap))
+    (global.set $heap (i32.add (local.get $p) (local.get $size)))
+    (if (i32.gt_u (global.get $heap) (i32.mul (memory.size) (i32.const 65536)))
+      (then (drop (memory.grow (i32.add (i32.shr_u
+        (i32.sub (global.get $heap) (i32.mul (memory.size) (i32.const 65536)))
+        (i32.const 16)) (i32.const 1))))))
+    (local.get $p))
+  (func $append (param $dst i32) (param $src i32) (result i32) (local $len i32)
+    (local.set $len (call $strlen (local.get $src)))
+    (memory.copy (local.get $dst) (local.get $src) (local.get $len))
+    (i32.add (local.get $dst) (local.get $len)))
+  (func $parse (export "opa_json_parse") (param $addr i32) (param $len i32) (result i32)
+    (local $p i32)
+    (local.set $p (call $malloc (i32.add (local.get $len) (i32.const 1))))
+    (memory.copy (local.get $p) (local.get $addr) (local.get $len))
+    (i32.store8 (i32.add (local.get $p) (local.get $len)) (i32.const 0))
+    (local.get $p))
+  (func (export "opa_json_dump") (param $value i32) (result i32) (local.get $value))
+  (func (export "builtins") (result i32) (i32.const 16))
+  (func (export "entrypoints") (result i32) (i32.const 64))
+  (func (export "opa_heap_ptr_get") (result i32) (global.get $heap))
+  (func (export "opa_heap_ptr_set") (param $ptr i32) (global.set $heap (local.get $ptr)))
+  (func (export "opa_eval")
+    (param $reserved i32) (param $entrypoint i32) (param $data i32)
+    (param $input i32) (param $input_len i32) (param $heap_ptr i32) (param $format i32)
+    (result i32)
+    (local $message i32) (local $out i32) (local $end i32)
+    (global.set $heap (local.get $heap_ptr))
+    (local.set $input (call $parse (local.get $input) (local.get $input_len)))
+    (local.set $message
+      (call $builtin2 (i32.const 0) (i32.const 0) (i32.const 128) (i32.const 192)))
+    (local.set $out (call $malloc (i32.add (i32.add (local.get $input_len)
+      (call $strlen (local.get $message))) (i32.const 64))))
+    (local.set $end (call $append (local.get $out) (i32.const 256)))
+    (local.set $end (call $append (local.get $end) (local.get $message)))
+    (local.set $end (call $append (local.get $end) (i32.const 320)))
+    (local.set $end (call $append (local.get $end) (local.get $input)))
+    (local.set $end (call $append (local.get $end) (i32.const 384)))
+    (i32.store8 (local.get $end) (i32.const 0))
+    (local.get $out)))
+"""
+
+
+def test_policy_eval_wasm_mode_compiles_once(monkeypatch, tmp_path) -> None:
+    wasmtime = pytest.importorskip("wasmtime")
+    module = wasmtime.wat2wasm(WASM_POLICY)
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+    (bundle_dir / ".manifest").write_text(json.dumps({"roots": ["guardrail"]}), encoding="utf-8")
+    builds: list[list[str]] = []
+
+    def fake_build(cmd, **_kwargs):
+        builds.append(cmd)
+        with tarfile.open(cmd[cmd.index("--output") + 1], mode="w:gz") as tar:
+            for name, content in (("/policy.wasm", module), ("/data.json", b"{}")):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    monkeypatch.setenv("GUARDRAIL_OPA_MODE", "wasm")
+    monkeypatch.setenv("GUARDRAIL_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: "/usr/bin/opa"
+    )
+    monkeypatch.setattr("terraform_guardrail.scanner.opa_wasm.subprocess.run", fake_build)
+
+    files = [PolicyInputFile(path="main.tf", hcl={"resource": []})]
+    for _ in range(2):
+        findings = evaluate_policy_bundle_path(
+            bundle_path=bundle_dir, files=files, state=None, policy_query="data.guardrail.deny"
+        )
+        assert [(f.rule_id, f.message) for f in findings] == [("W1", "input has 1 files")]
+        assert findings[0].detail == {
+            "files": [{"path": "main.tf", "hcl": {"resource": []}}],
+            "state": None,
+        }
+    assert len(builds) == 1
+    assert builds[0][1:6] == ["build", "--target", "wasm", "--entrypoint", "guardrail/deny"]
+
+
+def test_go_sprintf_formats_rego_values() -> None:
+    assert go_sprintf("%s: %v (%d%%)", ["bucket", [1, "a"], 42.0]) == 'bucket: [1, "a"] (42%)'
+    formatted = go_sprintf("%q %t %.2f %5d|%-3s|", ["x", True, 1.5, 7, "a"])
+    assert formatted == '"x" true 1.50     7|a  |'
+    assert go_sprintf("%s %s", ["only"]) == "only %!s(MISSING)"
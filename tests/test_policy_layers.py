@@ -1,3 +1,12 @@
+import json
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from terraform_guardrail.scanner.policy_eval import PolicyInputFile, evaluate_policy_layers
+from terraform_guardrail.scanner.policy_layers import CombineUnsupported, prefix_rego
 from terraform_guardrail.scanner.scan import _resolve_policy_layers
 
 
@@ -23,3 +32,122 @@ def test_resolve_policy_layers_from_bundle_list() -> None:
     )
     assert bundle_ids == ["baseline", "prod", "app"]
     assert layer_names == ["layer1", "layer2", "layer3"]
+
+
+def test_prefix_rego_relocates_package_and_data_refs() -> None:
+    source = (
+        "package guardrail.baseline\n"
+        "import rego.v1\n"
+        "import data.guardrail.common\n"
+        "# data.guardrail in a comment\n"
+        'deny contains msg if { input.data.x; data.guardrail.allowed; msg := "data.x" }\n'
+    )
+    rewritten = prefix_rego(source, "layer_1")
+    assert rewritten.startswith("package layer_1.guardrail.baseline\n")
+    assert "import data.layer_1.guardrail.common" in rewritten
+    assert "# data.guardrail in a comment" in rewritten
+    assert 'input.data.x; data.layer_1.guardrail.allowed; msg := "data.x"' in rewritten
+    with pytest.raises(CombineUnsupported):
+        prefix_rego("package p\nx := data[k]\n", "layer_0")
+
+
+def test_policy_layers_evaluated_in_one_opa_call(monkeypatch, tmp_path: Path) -> None:
+    bundle_dirs = []
+    for name in ("base", "app"):
+        bundle_dir = tmp_path / name
+        (bundle_dir / "policies").mkdir(parents=True)
+        (bundle_dir / "policies" / "p.rego").write_text(
+            "package guardrail.baseline\ndeny contains 1 if { data.guardrail.x }\n",
+            encoding="utf-8",
+        )
+        (bundle_dir / "data.json").write_text('{"guardrail": {"x": true}}', encoding="utf-8")
+        (bundle_dir / ".manifest").write_text('{"rego_version": 1}', encoding="utf-8")
+        bundle_dirs.append(bundle_dir)
+
+    calls: list[list[str]] = []
+
+    def fake_run(cmd, **_kwargs):
+        calls.append(cmd)
+        combined = Path(cmd[cmd.index("--bundle") + 1])
+        assert (combined / "layer_1" / "data.json").exists()
+        rego = (combined / "layer_0" / "policies" / "p.rego").read_text(encoding="utf-8")
+        assert rego.startswith("package layer_0.guardrail.baseline")
+        manifest = json.loads((combined / ".manifest").read_text(encoding="utf-8"))
+        assert manifest["rego_version"] == 1
+        value = {"0": [{"message": "base hit", "rule_id": "B1"}], "1": ["app hit"]}
+        output = json.dumps({"result": [{"expressions": [{"value": value}]}]})
+        return SimpleNamespace(returncode=0, stdout=output, stderr="")
+
+    monkeypatch.setenv("GUARDRAIL_OPA_COMBINED", "1")
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: "/usr/bin/opa"
+    )
+    monkeypatch.setattr("terraform_guardrail.scanner.policy_eval.subprocess.run", fake_run)
+
+    findings = evaluate_policy_layers(
+        bundle_ids=[],
+        registry_url=None,
+        files=[PolicyInputFile(path="main.tf", hcl={})],
+        state=None,
+        layer_names=["base", "app"],
+        bundle_paths=bundle_dirs,
+    )
+    assert len(calls) == 1
+    assert calls[0][-1] == "data.guardrail_layers.results"
+    assert [(f.message, f.detail["layer"]) for f in findings] == [
+        ("base hit", "base"),
+        ("app hit", "app"),
+    ]
+    assert findings[1].detail["bundle_path"] == str(bundle_dirs[1])
+
+
+@pytest.mark.skipif(shutil.which("opa") is None, reason="OPA CLI not installed")
+def test_combined_layers_match_separate_evaluation(monkeypatch, tmp_path: Path) -> None:
+    common = 'package guardrail.common\nimport rego.v1\nallowed_paths contains "main.tf"\n'
+    baseline = (
+        "package guardrail.baseline\n"
+        "import rego.v1\n"
+        "import data.guardrail.common\n"
+        "deny contains msg if {\n"
+        "  some file in input.files\n"
+        "  not common.allowed_paths[file.path]\n"
+        '  msg := sprintf("%s: %s", [data.guardrail.label, file.path])\n'
+        "}\n"
+        "deny contains msg if {\n"
+        '  data.guardrail.common.allowed_paths["main.tf"] with '
+        'data.guardrail.common.allowed_paths as {"main.tf"}\n'
+        '  msg := sprintf("%s: with", [data.guardrail.label])\n'
+        "}\n"
+    )
+    bundle_dirs = []
+    for name in ("base", "app"):
+        bundle_dir = tmp_path / name
+        (bundle_dir / "policies").mkdir(parents=True)
+        (bundle_dir / "policies" / "common.rego").write_text(common, encoding="utf-8")
+        (bundle_dir / "policies" / "baseline.rego").write_text(baseline, encoding="utf-8")
+        (bundle_dir / "data.json").write_text(
+            json.dumps({"guardrail": {"label": name}}), encoding="utf-8"
+        )
+        bundle_dirs.append(bundle_dir)
+    files = [PolicyInputFile(path=path, hcl={}) for path in ("main.tf", "extra.tf")]
+
+    def evaluate() -> list[tuple[str, str]]:
+        findings = evaluate_policy_layers(
+            bundle_ids=[],
+            registry_url=None,
+            files=files,
+            state=None,
+            layer_names=["base", "app"],
+            bundle_paths=bundle_dirs,
+        )
+        return sorted((f.message, f.detail["layer"]) for f in findings)
+
+    separate = evaluate()
+    monkeypatch.setenv("GUARDRAIL_OPA_COMBINED", "1")
+    assert evaluate() == separate
+    assert separate == [
+        ("app: extra.tf", "app"),
+        ("app: with", "app"),
+        ("base: extra.tf", "base"),
+        ("base: with", "base"),
+    ]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from terraform_guardrail.bundle_store import get_bundle_store
+from terraform_guardrail.policy_lock import (
+    PolicyLockError,
+    load_policy_lock,
+    lock_policy_bundles,
+    sync_policy_lock,
+)
+from terraform_guardrail.policy_registry import clear_registry_index_cache
+from terraform_guardrail.scanner.config import ConfigError, load_scan_config
+from terraform_guardrail.scanner.scan import scan_path
+
+REGISTRY_DIR = Path(__file__).resolve().parents[1] / "ops" / "policy-registry"
+
+
+def _serve_registry(url, timeout=10, headers=None, stream=False):
+    path = REGISTRY_DIR / url.removeprefix("http://registry.local/")
+    return SimpleNamespace(
+        status_code=200,
+        headers={},
+        content=path.read_bytes(),
+        iter_content=lambda chunk_size: iter([path.read_bytes()]),
+        close=lambda: None,
+        json=lambda: json.loads(path.read_text(encoding="utf-8")),
+    )
+
+
+def test_locked_scan_needs_no_registry(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("GUARDRAIL_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", _serve_registry)
+    workdir = tmp_path / "infra"
+    workdir.mkdir()
+    (workdir / "main.tf").write_text('variable "region" {}\n', encoding="utf-8")
+
+    lock = lock_policy_bundles(
+        ["tagging-rules", "baseline"], "http://registry.local", workdir / "guardrail.lock"
+    )
+    assert [bundle.bundle_id for bundle in lock.bundles] == ["baseline", "tagging-rules"]
+    assert load_policy_lock(workdir / "guardrail.lock") == lock
+    synced = sync_policy_lock(lock, jobs=2)
+    assert get_bundle_store().usage()[0] == 2
+    store_paths = {bundle.bundle_id: path for bundle, path in synced}
+
+    def offline(url, **_kwargs):
+        raise AssertionError(f"unexpected registry request: {url}")
+
+    clear_registry_index_cache()
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", offline)
+    monkeypatch.setenv("GUARDRAIL_POLICY_BUNDLE_ID", "baseline")
+    monkeypatch.setenv("GUARDRAIL_RULE_PACKS", "registry:tagging-rules")
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.policy_eval.shutil.which", lambda _: "/usr/bin/opa"
+    )
+    bundle_dirs: list[str] = []
+
+    def fake_run(cmd, **_kwargs):
+        bundle_dirs.append(cmd[cmd.index("--bundle") + 1])
+        output = (
+            '{"result":[{"expressions":[{"value":[{"message":"Policy hit",'
+            '"severity":"high","rule_id":"OPA001","path":"main.tf"}]}]}]}'
+        )
+        return SimpleNamespace(returncode=0, stdout=output, stderr="")
+
+    monkeypatch.setattr("terraform_guardrail.scanner.policy_eval.subprocess.run", fake_run)
+
+    config = load_scan_config(workdir=workdir)
+    assert config.policy_lock == lock
+    assert [rule.rule_id for rule in config.native_rules] == ["TAG001", "TAG002"]
+    report = scan_path(workdir)
+    assert "OPA001" in [finding.rule_id for finding in report.findings]
+    assert bundle_dirs == [str(store_paths["baseline"])]
+
+    monkeypatch.setenv("GUARDRAIL_POLICY_BUNDLE_ID", "baseline-signed")
+    monkeypatch.delenv("GUARDRAIL_RULE_PACKS")
+    report = scan_path(workdir)
+    [failure] = [finding for finding in report.findings if finding.rule_id == "OPA_EVAL"]
+    assert "'baseline-signed' is not pinned" in failure.message
+
+
+def test_lockfile_requires_pinned_digests(tmp_path) -> None:
+    lockfile = tmp_path / "guardrail.lock"
+    lockfile.write_text(
+        json.dumps({"version": 1, "bundles": [{"id": "baseline", "url": "http://x/b.tar.gz"}]}),
+        encoding="utf-8",
+    )
+    with pytest.raises(PolicyLockError, match="sha256"):
+        load_policy_lock(lockfile)
+
+
+def test_lockfile_registry_and_key_paths(monkeypatch, tmp_path) -> None:
+    workdir = tmp_path / "infra"
+    workdir.mkdir()
+    entry = {
+        "id": "baseline",
+        "url": "http://registry.local/bundles/baseline.tar.gz",
+        "sha256": "0" * 64,
+        "verification": {"public_key_path": "keys/guardrail.pub", "key_id": "default"},
+    }
+    (workdir / "guardrail.lock").write_text(
+        json.dumps({"version": 1, "registry": "http://registry.local/", "bundles": [entry]}),
+        encoding="utf-8",
+    )
+    monkeypatch.chdir(tmp_path)
+
+    lock = load_scan_config(workdir=workdir).policy_lock
+    key_path = lock.get("baseline").verification.public_key_path
+    assert Path(key_path) == workdir.resolve() / "keys" / "guardrail.pub"
+    assert load_scan_config(workdir=workdir, policy_registry="http://registry.local").policy_lock
+
+    with pytest.raises(ConfigError, match="pins bundles from http://registry.local/"):
+        load_scan_config(workdir=workdir, policy_registry="http://other.local")
+    monkeypatch.setenv("GUARDRAIL_POLICY_REGISTRY_URL", "http://other.local")
+    with pytest.raises(ConfigError, match="configured policy registry is http://other.local"):
+        load_scan_config(workdir=workdir)
+
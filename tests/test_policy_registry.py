@@ -1,16 +1,31 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
 import io
+import json
 import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
 from typing import Any
 
 import pytest
 
+from terraform_guardrail import policy_registry
+from terraform_guardrail.bundle_signature import BundleSignatureError, verify_bundle
+from terraform_guardrail.bundle_store import BundleStore
 from terraform_guardrail.policy_registry import (
     BundleVerification,
     PolicyBundle,
     PolicyRegistryError,
+    _safe_extract,
+    clear_registry_index_cache,
     download_bundle,
+    fetch_bundle,
+    get_policy_bundle,
     list_policy_bundles,
 )
 
@@ -21,17 +36,26 @@ class FakeResponse:
         status_code: int,
         json_data: dict[str, Any] | None = None,
         content: bytes = b"",
+        headers: dict[str, str] | None = None,
     ):
         self.status_code = status_code
         self._json_data = json_data or {}
         self.content = content
+        self.headers = headers or {}
 
     def json(self) -> dict[str, Any]:
         return self._json_data
 
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def close(self) -> None:
+        pass
+
 
 def test_list_policy_bundles(monkeypatch) -> None:
-    def fake_get(url: str, timeout: int = 10) -> FakeResponse:
+    def fake_get(url: str, timeout: int = 10, headers=None) -> FakeResponse:
         assert url == "http://registry.local/registry.json"
         return FakeResponse(
             200,
@@ -55,7 +79,7 @@ def test_list_policy_bundles(monkeypatch) -> None:
             },
         )
 
-    monkeypatch.setattr("terraform_guardrail.policy_registry.requests.get", fake_get)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
     bundles = list_policy_bundles("http://registry.local")
     assert bundles[0].url == "http://registry.local/bundles/baseline.tar.gz"
     assert bundles[0].entrypoint == "data.guardrail.baseline.deny"
@@ -71,10 +95,10 @@ def test_download_bundle(monkeypatch, tmp_path) -> None:
 
     content = bundle_bytes.getvalue()
 
-    def fake_get(url: str, timeout: int = 30) -> FakeResponse:
+    def fake_get(url: str, timeout: int = 30, headers=None, stream=False) -> FakeResponse:
         return FakeResponse(200, content=content)
 
-    monkeypatch.setattr("terraform_guardrail.policy_registry.requests.get", fake_get)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
     bundle = PolicyBundle(
         bundle_id="baseline",
         title="Baseline",
@@ -87,11 +111,41 @@ def test_download_bundle(monkeypatch, tmp_path) -> None:
     assert (extracted / ".manifest").exists()
 
 
+def test_download_bundle_streams_through_spooled_file(monkeypatch, tmp_path) -> None:
+    bundle_bytes = io.BytesIO()
+    with tarfile.open(fileobj=bundle_bytes, mode="w:gz") as tar:
+        data = b'{"tags": ["' + b"x" * 4096 + b'"]}'
+        info = tarfile.TarInfo("data.json")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    content = bundle_bytes.getvalue()
+    streamed: list[bool] = []
+
+    def fake_get(url: str, timeout: int = 30, headers=None, stream=False) -> FakeResponse:
+        streamed.append(stream)
+        return FakeResponse(200, content=content)
+
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.DOWNLOAD_CHUNK_SIZE", 7)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.SPOOL_MAX_BYTES", 16)
+    bundle = PolicyBundle(
+        bundle_id="baseline",
+        title="Baseline",
+        description="Test bundle",
+        version="0.1.0",
+        url="http://registry.local/bundles/baseline.tar.gz",
+        sha256=hashlib.sha256(content).hexdigest().upper(),
+    )
+    extracted = download_bundle(bundle, tmp_path)
+    assert streamed == [True]
+    assert (extracted / "data.json").read_bytes() == data
+
+
 def test_download_bundle_checksum_mismatch(monkeypatch, tmp_path) -> None:
-    def fake_get(url: str, timeout: int = 30) -> FakeResponse:
+    def fake_get(url: str, timeout: int = 30, headers=None, stream=False) -> FakeResponse:
         return FakeResponse(200, content=b"invalid")
 
-    monkeypatch.setattr("terraform_guardrail.policy_registry.requests.get", fake_get)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
     bundle = PolicyBundle(
         bundle_id="baseline",
         title="Baseline",
@@ -104,17 +158,16 @@ def test_download_bundle_checksum_mismatch(monkeypatch, tmp_path) -> None:
         download_bundle(bundle, tmp_path)
 
 
-def test_download_bundle_signature_requires_opa(monkeypatch, tmp_path) -> None:
+def test_download_bundle_rejects_unsigned_bundle(monkeypatch, tmp_path) -> None:
     bundle_bytes = io.BytesIO()
     with tarfile.open(fileobj=bundle_bytes, mode="w:gz"):
         pass
     content = bundle_bytes.getvalue()
 
-    def fake_get(url: str, timeout: int = 30) -> FakeResponse:
+    def fake_get(url: str, timeout: int = 30, headers=None, stream=False) -> FakeResponse:
         return FakeResponse(200, content=content)
 
-    monkeypatch.setattr("terraform_guardrail.policy_registry.requests.get", fake_get)
-    monkeypatch.setattr("terraform_guardrail.policy_registry.shutil.which", lambda _: None)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
 
     bundle = PolicyBundle(
         bundle_id="baseline",
@@ -126,5 +179,256 @@ def test_download_bundle_signature_requires_opa(monkeypatch, tmp_path) -> None:
         verification=BundleVerification(public_key="---BEGIN---"),
     )
 
-    with pytest.raises(PolicyRegistryError):
+    with pytest.raises(PolicyRegistryError, match="no .signatures.json"):
         download_bundle(bundle, tmp_path)
+
+
+def test_download_bundle_verifies_signature_in_process(monkeypatch, tmp_path) -> None:
+    registry_dir = Path(__file__).resolve().parents[1] / "ops" / "policy-registry"
+    content = (registry_dir / "bundles" / "baseline-signed.tar.gz").read_bytes()
+    verified: list[str | None] = []
+
+    def fake_get(url: str, timeout: int = 30, headers=None, stream=False) -> FakeResponse:
+        return FakeResponse(200, content=content)
+
+    def counting_verify(archive, key, key_id=None, scope=None, algorithm="RS256"):
+        verified.append(key_id)
+        return verify_bundle(archive, key, key_id, scope, algorithm)
+
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
+    monkeypatch.setattr("terraform_guardrail.policy_registry.verify_bundle", counting_verify)
+    monkeypatch.setattr("terraform_guardrail.policy_registry._verified_bundles", set())
+    bundle = PolicyBundle(
+        bundle_id="baseline-signed",
+        title="Baseline",
+        description="Signed bundle",
+        version="0.2.0",
+        url="http://registry.local/bundles/baseline-signed.tar.gz",
+        sha256=hashlib.sha256(content).hexdigest(),
+        verification=BundleVerification(
+            public_key_path=str(registry_dir / "keys" / "guardrail.pub"), key_id="default"
+        ),
+    )
+
+    extracted = download_bundle(bundle, tmp_path / "a")
+    assert (extracted / "data.json").exists()
+    assert (extracted / ".manifest").exists()
+    assert not (extracted / ".signatures.json").exists()
+    download_bundle(bundle, tmp_path / "b")
+    assert verified == ["default"]
+
+    wrong_key = replace(bundle, verification=replace(bundle.verification, key_id="rotated"))
+    with pytest.raises(PolicyRegistryError, match="ID default not found"):
+        download_bundle(wrong_key, tmp_path / "c")
+
+    tampered = io.BytesIO()
+    with (
+        tarfile.open(fileobj=io.BytesIO(content), mode="r:gz") as source,
+        tarfile.open(fileobj=tampered, mode="w:gz") as target,
+    ):
+        for member in source.getmembers():
+            data = source.extractfile(member).read()
+            if member.name == "/data.json":
+                data = b'{"guardrail": {}}'
+                member.size = len(data)
+            target.addfile(member, io.BytesIO(data))
+    content = tampered.getvalue()
+    with pytest.raises(PolicyRegistryError, match="digest mismatch for file data.json"):
+        download_bundle(replace(bundle, sha256=None), tmp_path / "d")
+
+
+def test_verify_bundle_rejects_hmac_forged_with_public_key() -> None:
+    registry_dir = Path(__file__).resolve().parents[1] / "ops" / "policy-registry"
+    public_key = (registry_dir / "keys" / "guardrail.pub").read_text(encoding="utf-8")
+    forged_data = b'{"guardrail": {"allowed_regions": ["anywhere"]}}'
+    files: dict[str, bytes] = {}
+    with tarfile.open(registry_dir / "bundles" / "baseline-signed.tar.gz", mode="r:gz") as tar:
+        for member in tar.getmembers():
+            if member.name != "/.signatures.json":
+                files[member.name.lstrip("/")] = tar.extractfile(member).read()
+    files["data.json"] = forged_data
+
+    def encode(value: dict[str, Any]) -> str:
+        raw = json.dumps(value).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    def digest(name: str, content: bytes) -> str:
+        if name.endswith(".json") or name == ".manifest":
+            content = json.dumps(json.loads(content), sort_keys=True, separators=(",", ":"))
+            content = content.encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    header = encode({"alg": "HS256", "kid": "default", "typ": "JWT"})
+    payload = encode(
+        {
+            "files": [
+                {"name": name, "hash": digest(name, content), "algorithm": "SHA-256"}
+                for name, content in files.items()
+            ],
+            "keyid": "default",
+        }
+    )
+    mac = hmac.new(public_key.encode("utf-8"), f"{header}.{payload}".encode(), "sha256")
+    signature = base64.urlsafe_b64encode(mac.digest()).rstrip(b"=").decode("ascii")
+    files[".signatures.json"] = json.dumps(
+        {"signatures": [f"{header}.{payload}.{signature}"]}
+    ).encode("utf-8")
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    with pytest.raises(BundleSignatureError, match="signed with HS256, expected RS256"):
+        verify_bundle(archive, public_key, key_id="default")
+    with pytest.raises(BundleSignatureError, match="not a PEM key"):
+        verify_bundle(archive, public_key, key_id="default", algorithm="HS256")
+
+
+def test_bundle_links_are_rejected(tmp_path) -> None:
+    registry_dir = Path(__file__).resolve().parents[1] / "ops" / "policy-registry"
+    public_key = (registry_dir / "keys" / "guardrail.pub").read_text(encoding="utf-8")
+    content = (registry_dir / "bundles" / "baseline-signed.tar.gz").read_bytes()
+
+    def with_link(source: bytes, name: str, target: str) -> io.BytesIO:
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+            if source:
+                with tarfile.open(fileobj=io.BytesIO(source), mode="r:gz") as original:
+                    for member in original.getmembers():
+                        tar.addfile(member, original.extractfile(member))
+            link = tarfile.TarInfo(name)
+            link.type = tarfile.SYMTYPE
+            link.linkname = target
+            tar.addfile(link)
+        archive.seek(0)
+        return archive
+
+    signed = with_link(content, "/policies/zz.rego", "/etc/hostname")
+    with pytest.raises(BundleSignatureError, match="policies/zz.rego is not a regular file"):
+        verify_bundle(signed, public_key, key_id="default")
+
+    for target in ("/etc/hostname", "../../outside"):
+        with tarfile.open(fileobj=with_link(b"", "policies/zz.rego", target)) as tar:
+            with pytest.raises(PolicyRegistryError, match="Unsafe link"):
+                _safe_extract(tar, tmp_path / "bundle")
+    with tarfile.open(fileobj=with_link(b"", "policies/zz.rego", "main.rego")) as tar:
+        with pytest.raises(PolicyRegistryError, match="Unsupported entry type"):
+            _safe_extract(tar, tmp_path / "bundle", regular_only=True)
+
+
+def test_fetch_bundle_stores_verified_bundles(monkeypatch, tmp_path) -> None:
+    bundle_bytes = io.BytesIO()
+    with tarfile.open(fileobj=bundle_bytes, mode="w:gz") as tar:
+        info = tarfile.TarInfo(".manifest")
+        manifest_bytes = b'{"revision":"0.1.0","roots":["policies"]}'
+        info.size = len(manifest_bytes)
+        tar.addfile(info, io.BytesIO(manifest_bytes))
+    content = bundle_bytes.getvalue()
+    downloads: list[str] = []
+    verifications: list[str] = []
+
+    def fake_get(url: str, timeout: int = 30, headers=None, stream=False) -> FakeResponse:
+        downloads.append(url)
+        return FakeResponse(200, content=content)
+
+    def fake_verify(bundle: PolicyBundle, archive, digest: str) -> None:
+        verifications.append(bundle.bundle_id)
+
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
+    monkeypatch.setattr(
+        "terraform_guardrail.policy_registry._verify_bundle_signature", fake_verify
+    )
+    bundle = PolicyBundle(
+        bundle_id="baseline",
+        title="Baseline",
+        description="Test bundle",
+        version="0.1.0",
+        url="http://registry.local/bundles/baseline.tar.gz",
+        sha256=hashlib.sha256(content).hexdigest(),
+    )
+    signed = replace(bundle, verification=BundleVerification(public_key="KEY", key_id="default"))
+    store = BundleStore(tmp_path / "store", max_bytes=1024 * 1024)
+
+    first = fetch_bundle(bundle, tmp_path / "a", store)
+    assert fetch_bundle(bundle, tmp_path / "b", store) == first
+    assert (first / ".manifest").exists()
+    assert len(downloads) == 1
+
+    # Same content, but the signature has not been checked yet: verify once, then reuse.
+    assert fetch_bundle(signed, tmp_path / "c", store) == first
+    assert fetch_bundle(signed, tmp_path / "d", store) == first
+    assert len(downloads) == 2
+    assert verifications == ["baseline", "baseline"]
+
+    assert store.usage()[0] == 1
+    assert store.prune(max_bytes=0) == 0  # recently used entries are kept
+    assert store.prune(max_bytes=0, min_idle=0) == 1
+    assert store.lookup(bundle.sha256) is None
+
+
+def test_registry_index_is_cached_and_revalidated(monkeypatch) -> None:
+    index = {
+        "bundles": [
+            {
+                "id": "baseline",
+                "title": "Baseline",
+                "description": "Test bundle",
+                "url": "/bundles/baseline.tar.gz",
+            }
+        ]
+    }
+    calls: list[dict[str, str] | None] = []
+    responses = [
+        FakeResponse(200, json_data=index, headers={"ETag": '"v1"'}),
+        FakeResponse(304),
+        FakeResponse(503),
+    ]
+
+    def fake_get(url: str, timeout: int = 10, headers=None) -> FakeResponse:
+        calls.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
+    first = list_policy_bundles("http://registry.local")
+    assert get_policy_bundle("baseline", "http://registry.local") == first[0]
+    assert calls == [None]
+
+    monkeypatch.setenv("GUARDRAIL_REGISTRY_INDEX_TTL", "0")
+    assert list_policy_bundles("http://registry.local") == first
+    assert calls[1] == {"If-None-Match": '"v1"'}
+    # The registry is down: the last good index is still served, and not retried
+    # again until the TTL has passed.
+    monkeypatch.setenv("GUARDRAIL_REGISTRY_INDEX_TTL", "60")
+    policy_registry._index_cache["http://registry.local/registry.json"].fetched_at -= 120
+    assert list_policy_bundles("http://registry.local") == first
+    assert len(calls) == 3
+    assert list_policy_bundles("http://registry.local") == first
+    assert len(calls) == 3
+
+    clear_registry_index_cache()
+    monkeypatch.setattr(
+        "terraform_guardrail.policy_registry.http_get",
+        lambda url, timeout=10, headers=None: FakeResponse(503),
+    )
+    with pytest.raises(PolicyRegistryError, match="503"):
+        list_policy_bundles("http://registry.local")
+
+
+def test_registry_index_fetch_does_not_block_other_registries(monkeypatch) -> None:
+    release = threading.Event()
+    index = {"bundles": []}
+
+    def fake_get(url: str, timeout: int = 10, headers=None) -> FakeResponse:
+        if url.startswith("http://slow.local"):
+            assert release.wait(5)
+        return FakeResponse(200, json_data=index)
+
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        slow = pool.submit(list_policy_bundles, "http://slow.local")
+        assert list_policy_bundles("http://fast.local") == []
+        release.set()
+        assert slow.result() == []
+
@@ -30,3 +30,36 @@ def test_registry_api_endpoints(monkeypatch, tmp_path) -> None:
     assert client.get("/bundles/baseline/versions").status_code == 200
     assert client.get("/audit").status_code == 200
     assert client.get("/bundles/baseline/audit").status_code == 200
+
+
+def test_registry_api_revalidates_and_reloads(monkeypatch, tmp_path) -> None:
+    registry_path = tmp_path / "registry.json"
+    registry_path.write_text(
+        json.dumps({"bundles": [{"id": "baseline", "versions": [{"version": "0.1.0"}]}]}),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("GUARDRAIL_REGISTRY_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr("terraform_guardrail.registry_api.RELOAD_CHECK_SECONDS", 0)
+    client = TestClient(create_registry_app())
+
+    first = client.get("/bundles/baseline/versions")
+    etag = first.headers["etag"]
+    assert first.json() == {"versions": [{"version": "0.1.0"}]}
+    assert first.headers["cache-control"] == "public, max-age=60"
+    revalidated = client.get("/bundles/baseline/versions", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert client.get("/bundles/missing").status_code == 404
+    assert client.get("/audit").status_code == 500
+
+    updated = {"bundles": [{"id": "baseline", "versions": [{"version": "0.2.0"}]}]}
+    staging = tmp_path / "registry.json.tmp"
+    staging.write_text(json.dumps(updated), encoding="utf-8")
+    staging.replace(registry_path)
+    reloaded = client.get("/bundles/baseline/versions", headers={"If-None-Match": etag})
+    assert reloaded.status_code == 200
+    assert reloaded.json() == {"versions": [{"version": "0.2.0"}]}
+
+    # A half-written file keeps the last good index in service.
+    registry_path.write_text('{"bundles": [', encoding="utf-8")
+    assert client.get("/bundles/baseline/versions").headers["etag"] == reloaded.headers["etag"]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from terraform_guardrail.scanner.config import ConfigError, ScanConfig, load_scan_config
+from terraform_guardrail.scanner.models import Finding, RawFinding
+from terraform_guardrail.scanner.rule_registry import (
+    ResourceContext,
+    RuleRegistry,
+    get_rule_registry,
+    load_entry_point_rules,
+    rule_plugins_fingerprint,
+)
+from terraform_guardrail.scanner.scan import _findings_fingerprint, scan_path
+
+
+def _context(resource_type: str, attrs: dict) -> ResourceContext:
+    return ResourceContext(resource_type, "demo", attrs, "main.tf", ScanConfig())
+
+
+def test_registry_dispatches_by_resource_type() -> None:
+    calls: list[str] = []
+    registry = RuleRegistry()
+
+    @registry.register("X001", ["aws_s3_bucket"])
+    def bucket_rule(ctx: ResourceContext):
+        calls.append("bucket")
+        return []
+
+    @registry.register("X002", ["azurerm_*"])
+    def azure_rule(ctx: ResourceContext):
+        calls.append("azure")
+        return []
+
+    @registry.register("X003")
+    def any_rule(ctx: ResourceContext):
+        calls.append("any")
+        return []
+
+    list(registry.evaluate(_context("aws_s3_bucket", {})))
+    list(registry.evaluate(_context("azurerm_storage_account", {})))
+    list(registry.evaluate(_context("google_compute_instance", {})))
+    assert calls == ["bucket", "any", "azure", "any", "any"]
+
+
+def test_builtin_rules_are_registered() -> None:
+    registry = get_rule_registry()
+    findings = list(
+        registry.evaluate(
+            _context("aws_s3_bucket", {"acl": "public-read", "tags": {"owner": "a"}})
+        )
+    )
+    assert [finding.rule_id for finding in findings] == ["TG006", "TG011", "TG016"]
+    assert findings[2].detail == {"missing_tags": ["environment", "cost_center"]}
+
+
+def test_entry_point_rule_packs_are_loaded(monkeypatch) -> None:
+    def register(registry: RuleRegistry) -> None:
+        registry.register("ACME001", ["aws_instance"], message="ACME check")(
+            lambda ctx: [Finding(rule_id="ACME001", severity="low", message="hit", path=ctx.path)]
+        )
+
+    entry_point = SimpleNamespace(name="acme", load=lambda: register)
+    monkeypatch.setattr(
+        "terraform_guardrail.scanner.rule_registry.importlib.metadata.entry_points",
+        lambda group: [entry_point],
+    )
+    registry = RuleRegistry()
+    assert load_entry_point_rules(registry) == ["acme"]
+    assert registry.catalog()["ACME001"] == "ACME check"
+    findings = list(registry.evaluate(_context("aws_instance", {})))
+    assert [finding.rule_id for finding in findings] == ["ACME001"]
+    # Plugin Finding models are normalised to the internal tuple form.
+    assert isinstance(findings[0], RawFinding)
+    assert findings[0].to_model() == Finding(
+        rule_id="ACME001", severity="low", message="hit", path="main.tf"
+    )
+
+
+def test_rule_plugins_change_the_findings_fingerprint(monkeypatch) -> None:
+    module = "terraform_guardrail.scanner.rule_registry"
+    installed: list[SimpleNamespace] = []
+    monkeypatch.setattr(f"{module}.importlib.metadata.entry_points", lambda group: installed)
+    monkeypatch.delenv("GUARDRAIL_DISABLE_RULE_PLUGINS", raising=False)
+    config = ScanConfig()
+
+    def fingerprint() -> str:
+        # Plugins are loaded once per process; a fresh registry stands in for a new run.
+        monkeypatch.setattr(f"{module}._DEFAULT_REGISTRY", None)
+        return _findings_fingerprint(config)
+
+    without = fingerprint()
+    plugin = SimpleNamespace(
+        name="acme", load=lambda: lambda registry: None, dist=SimpleNamespace(version="1.0")
+    )
+    installed.append(plugin)
+    first = fingerprint()
+    assert rule_plugins_fingerprint() == "acme==1.0"
+    plugin.dist = SimpleNamespace(version="1.1")
+    upgraded = fingerprint()
+    installed.clear()
+    assert len({without, first, upgraded}) == 3
+    assert fingerprint() == without
+
+
+def test_raw_finding_records_round_trip() -> None:
+    finding = get_rule_registry().evaluate(_context("aws_ebs_volume", {"tags": {}}))
+    first = next(finding)
+    restored = RawFinding.from_record(first.to_record(), first.path)
+    assert restored == first
+    assert restored.to_model().model_dump() == first.to_dict()
+    # Constant recommendation details are shared, but never leak out by reference.
+    assert first.to_model().detail is not first.detail
+
+
+def test_native_rule_pack_runs_in_scan(monkeypatch, tmp_path) -> None:
+    pack = {
+        "rules": [
+            {
+                "id": "ACME010",
+                "description": "Team tag must be a lowercase slug",
+                "resource_types": ["aws_*"],
+                "attribute": "tags.team",
+                "matches": "^[a-z-]+$",
+            },
+            {
+                "id": "ACME011",
+                "description": "Buckets must enable versioning",
+                "severity": "high",
+                "resource_types": ["aws_s3_bucket"],
+                "require": [
+                    {"attribute": "versioning.enabled", "equals": True},
+                    {"attribute": "acl", "in": ["private"], "optional": True},
+                ],
+            },
+        ]
+    }
+    (tmp_path / "acme.json").write_text(json.dumps(pack), encoding="utf-8")
+    (tmp_path / "guardrail.toml").write_text('[rules]\npacks = ["acme.json"]\n', encoding="utf-8")
+    (tmp_path / "main.tf").write_text(
+        """
+resource "aws_s3_bucket" "good" {
+  tags = { team = "core" }
+  versioning { enabled = true }
+}
+
+resource "aws_s3_bucket" "bad" {
+  acl  = "public-read"
+  tags = { team = "Core" }
+  versioning { enabled = true }
+}
+
+resource "aws_instance" "dynamic" {
+  tags = { team = var.team }
+}
+""",
+        encoding="utf-8",
+    )
+    monkeypatch.delenv("GUARDRAIL_RULE_PACKS", raising=False)
+
+    findings = [f for f in scan_path(tmp_path).findings if f.rule_id.startswith("ACME")]
+    assert sorted((f.rule_id, f.message) for f in findings) == [
+        ("ACME010", "Team tag must be a lowercase slug: aws_s3_bucket.bad"),
+        ("ACME011", "Buckets must enable versioning: aws_s3_bucket.bad"),
+    ]
+    assert {f.rule_id: f.detail["attribute"] for f in findings} == {
+        "ACME010": "tags.team",
+        "ACME011": "acl",
+    }
+
+
+def test_rule_pack_distributed_through_policy_registry(monkeypatch, tmp_path) -> None:
+    registry_dir = Path(__file__).resolve().parents[1] / "ops" / "policy-registry"
+
+    def fake_get(url, timeout=10, headers=None, stream=False):
+        path = registry_dir / url.removeprefix("http://registry.local/")
+        return SimpleNamespace(
+            status_code=200,
+            headers={},
+            content=path.read_bytes(),
+            iter_content=lambda chunk_size: iter([path.read_bytes()]),
+            close=lambda: None,
+            json=lambda: json.loads(path.read_text(encoding="utf-8")),
+        )
+
+    monkeypatch.setattr("terraform_guardrail.policy_registry.http_get", fake_get)
+    monkeypatch.setenv("GUARDRAIL_POLICY_REGISTRY_URL", "http://registry.local")
+    monkeypatch.setenv("GUARDRAIL_RULE_PACKS", "registry:tagging-rules")
+    monkeypatch.setenv("GUARDRAIL_CACHE_DIR", str(tmp_path / "cache"))
+
+    config = load_scan_config(workdir=tmp_path)
+    assert [rule.rule_id for rule in config.native_rules] == ["TAG001", "TAG002"]
+    registry = get_rule_registry(config.native_rules)
+    attrs = {"tags": {"team": "core"}}
+    context = ResourceContext("aws_s3_bucket", "logs", attrs, "main.tf", config)
+    rule_ids = [f.rule_id for f in registry.evaluate(context)]
+    assert [rule_id for rule_id in rule_ids if rule_id.startswith("TAG")] == ["TAG002"]
+    assert registry is get_rule_registry(config.native_rules)
+
+    monkeypatch.setenv("GUARDRAIL_RULE_PACKS", "registry:baseline")
+    with pytest.raises(ConfigError, match="not a rule pack"):
+        load_scan_config(workdir=tmp_path)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from terraform_guardrail.scanner.cache import ScanCache, get_cache_max_bytes
+from terraform_guardrail.scanner.scan import scan_path
+
+TF_SOURCE = """
+variable \"db_password\" {
+  type = string
+  sensitive = true
+}
+
+resource \"aws_s3_bucket\" \"logs\" {
+  acl = \"public-read\"
+}
+"""
+
+
+def test_scan_cache_skips_parsing_unchanged_files(monkeypatch, tmp_path: Path) -> None:
+    workdir = tmp_path / "infra"
+    workdir.mkdir()
+    (workdir / "main.tf").write_text(TF_SOURCE, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    first = scan_path(workdir, cache_dir=cache_dir)
+
+    def fail_parse(*_args, **_kwargs):
+        raise AssertionError("cached file was parsed again")
+
+    monkeypatch.setattr("terraform_guardrail.scanner.scan.hcl2.loads", fail_parse)
+    second = scan_path(workdir, cache_dir=cache_dir)
+
+    assert [f.model_dump() for f in second.findings] == [f.model_dump() for f in first.findings]
+    assert second.summary == first.summary
+
+
+def test_scan_cache_invalidates_on_rule_settings(monkeypatch, tmp_path: Path) -> None:
+    (tmp_path / "main.tf").write_text(TF_SOURCE, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    first = scan_path(tmp_path / "main.tf", cache_dir=cache_dir)
+    monkeypatch.setenv("GUARDRAIL_REQUIRED_TAGS", "team")
+    second = scan_path(tmp_path / "main.tf", cache_dir=cache_dir)
+
+    tags = [f.detail for f in second.findings if f.rule_id == "TG016"]
+    assert tags == [{"missing_tags": ["team"]}]
+    assert first.findings != second.findings
+
+
+def test_scan_cache_keys_findings_by_suffix(tmp_path: Path) -> None:
+    # Unquoted, so only the tfvars-specific check reports it.
+    source = "password = 12345678\n"
+    (tmp_path / "a.tf").write_text(source, encoding="utf-8")
+    (tmp_path / "b.tfvars").write_text(source, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    scan_path(tmp_path / "a.tf", cache_dir=cache_dir)
+    report = scan_path(tmp_path / "b.tfvars", cache_dir=cache_dir)
+
+    assert "TG002" in [f.rule_id for f in report.findings]
+
+
+def test_scan_cache_parses_the_bytes_it_hashed(monkeypatch, tmp_path: Path) -> None:
+    source = tmp_path / "main.tf"
+    source.write_text(TF_SOURCE, encoding="utf-8")
+    reads: list[Path] = []
+    read_bytes = Path.read_bytes
+
+    def counting_read_bytes(path: Path) -> bytes:
+        reads.append(path)
+        return read_bytes(path)
+
+    monkeypatch.setattr(Path, "read_bytes", counting_read_bytes)
+    report = scan_path(source, cache_dir=tmp_path / "cache")
+    assert reads.count(source) == 1
+    assert {finding.rule_id for finding in report.findings} >= {"TG001", "TG011"}
+
+
+def test_cache_max_bytes_ignores_invalid_env(monkeypatch) -> None:
+    monkeypatch.setenv("GUARDRAIL_CACHE_MAX_MB", "lots")
+    assert get_cache_max_bytes() == get_cache_max_bytes(None) > 0
+    monkeypatch.setenv("GUARDRAIL_CACHE_MAX_MB", "2")
+    assert get_cache_max_bytes() == 2 * 1024 * 1024
+
+
+def test_scan_cache_prune_evicts_least_recently_used(tmp_path: Path) -> None:
+    with ScanCache(tmp_path, max_bytes=10**9) as cache:
+        cache.put("hcl", "old", {"payload": "x" * 4000})
+        cache.put("hcl", "new", {"payload": "y" * 4000})
+        cache.flush()
+        cache.get("hcl", "new")
+        removed = cache.prune(max_bytes=cache.stats().size_bytes - 1)
+        assert removed == 1
+        assert cache.get("hcl", "old") is None
+        assert cache.get("hcl", "new") is not None
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from terraform_guardrail.scanner.config import ValueMatcher, load_scan_config
+
+
+def test_scan_config_merges_toml_env_and_flags(monkeypatch, tmp_path: Path) -> None:
+    (tmp_path / "guardrail.toml").write_text(
+        """
+[rules]
+required_tags = ["owner"]
+allowed_regions = ["eastus", "eu-*"]
+
+[policy]
+base = "baseline"
+env = "prod"
+registry = "http://registry.local"
+""",
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("GUARDRAIL_REQUIRED_TAGS", "team,owner")
+    for name in ("GUARDRAIL_ALLOWED_REGIONS", "GUARDRAIL_POLICY_BASE", "GUARDRAIL_POLICY_ENV"):
+        monkeypatch.delenv(name, raising=False)
+
+    config = load_scan_config(workdir=tmp_path)
+    assert config.required_tags == ("team", "owner")
+    assert "eastus" in config.allowed_regions
+    assert "eu-west-1" in config.allowed_regions
+    assert "us-east-1" not in config.allowed_regions
+    assert config.bundle_ids == ("baseline", "prod")
+    assert config.layer_names == ("base", "env")
+    assert config.policy_registry == "http://registry.local"
+
+    flagged = load_scan_config(workdir=tmp_path, policy_app="payments")
+    assert flagged.bundle_ids == ("payments",)
+
+
+def test_scan_config_is_reused_for_identical_inputs(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("GUARDRAIL_ALLOWED_SKUS", "Standard_D4s_v5")
+    first = load_scan_config(workdir=tmp_path, policy_bundle="baseline")
+    second = load_scan_config(workdir=tmp_path, policy_bundle="baseline")
+    assert first is second
+
+    monkeypatch.setenv("GUARDRAIL_ALLOWED_SKUS", "Standard_D8s_v5")
+    third = load_scan_config(workdir=tmp_path, policy_bundle="baseline")
+    assert third is not first
+    assert third.fingerprint != first.fingerprint
+
+
+def test_value_matcher_keeps_order_for_reporting() -> None:
+    matcher = ValueMatcher.of(["westus2", "eastus", "westus2"])
+    assert matcher.values == ("westus2", "eastus")
+    assert "eastus" in matcher
+    assert not ValueMatcher.of([])
+    globs = ValueMatcher.of(["eu-*", "t3.?large", "m[5]"])
+    assert "eu-west-1" in globs
+    assert "t3.xlarge" in globs
+    assert "EU-west-1" not in globs
+    assert "m5" not in globs
+    assert "m[5]" in globs
+
+
+def test_scan_config_resolves_env_packs_against_cwd(monkeypatch, tmp_path: Path) -> None:
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "secrets.toml").write_text(
+            f'[[patterns]]\nid = "{name}"\nregex = "{name}-[0-9]+"\nkeywords = ["{name}"]\n',
+            encoding="utf-8",
+        )
+    monkeypatch.setenv("GUARDRAIL_SECRET_PACKS", "secrets.toml")
+
+    monkeypatch.chdir(tmp_path / "one")
+    first = load_scan_config(workdir=tmp_path)
+    monkeypatch.chdir(tmp_path / "two")
+    second = load_scan_config(workdir=tmp_path)
+    assert first.secret_packs == (str((tmp_path / "one" / "secrets.toml").resolve()),)
+    assert second.secret_packs == (str((tmp_path / "two" / "secrets.toml").resolve()),)
+
+
+def test_scan_config_fingerprint_is_stable_across_processes(tmp_path: Path) -> None:
+    pack = {
+        "rules": [
+            {
+                "id": "ACME001",
+                "description": "Team tag required",
+                "resource_types": [f"aws_type_{index}" for index in range(8)],
+                "attribute": "tags.team",
+                "exists": True,
+            }
+        ]
+    }
+    (tmp_path / "acme.json").write_text(json.dumps(pack), encoding="utf-8")
+    (tmp_path / "guardrail.toml").write_text('[rules]\npacks = ["acme.json"]\n', encoding="utf-8")
+    script = (
+        "import sys\n"
+        "from terraform_guardrail.scanner.config import load_scan_config\n"
+        "print(load_scan_config(workdir=sys.argv[1]).fingerprint)\n"
+    )
+    fingerprints = set()
+    for seed in ("1", "2", "3", "4"):
+        env = {**os.environ, "PYTHONHASHSEED": seed}
+        result = subprocess.run(
+            [sys.executable, "-c", script, str(tmp_path)],
+            capture_output=True,
+            check=True,
+            env=env,
+            text=True,
+        )
+        fingerprints.add(result.stdout.strip())
+    assert len(fingerprints) == 1
@@ -18,3 +18,62 @@ variable \"db_password\" {
     report = scan_path(tf_file)
     rule_ids = {finding.rule_id for finding in report.findings}
     assert "TG001" in rule_ids
+
+
+def test_scan_parallel_matches_serial(tmp_path: Path) -> None:
+    for idx in range(6):
+        (tmp_path / f"main{idx}.tf").write_text(
+            f"""
+variable \"db_password_{idx}\" {{
+  type = string
+  sensitive = true
+}}
+
+resource \"aws_s3_bucket\" \"logs{idx}\" {{
+  acl = \"public-read\"
+}}
+""",
+            encoding="utf-8",
+        )
+
+    serial = scan_path(tmp_path)
+    parallel = scan_path(tmp_path, jobs=3)
+    assert [f.model_dump() for f in parallel.findings] == [
+        f.model_dump() for f in serial.findings
+    ]
+    assert parallel.summary == serial.summary
+    assert parallel.summary.scanned_files == 6
+
+
+def test_incremental_scan_only_rescans_changed_files(monkeypatch, tmp_path: Path) -> None:
+    import terraform_guardrail.scanner.scan as scan_module
+
+    source = """
+variable \"{name}\" {{
+  type = string
+  sensitive = true
+}}
+"""
+    (tmp_path / "a.tf").write_text(source.format(name="db_password"), encoding="utf-8")
+    (tmp_path / "b.tf").write_text(source.format(name="api_token"), encoding="utf-8")
+    (tmp_path / "c.tf").write_text(source.format(name="old_secret"), encoding="utf-8")
+
+    first = scan_path(tmp_path, incremental=True)
+    assert first.summary.findings == 3
+    assert (tmp_path / ".guardrail" / "manifest.json").exists()
+
+    (tmp_path / "b.tf").write_text('variable "region" {}\n', encoding="utf-8")
+    (tmp_path / "c.tf").unlink()
+    parsed: list[str] = []
+    original_loads = scan_module.hcl2.loads
+
+    def tracking_loads(content: str, *args, **kwargs):
+        parsed.append(content)
+        return original_loads(content, *args, **kwargs)
+
+    monkeypatch.setattr("terraform_guardrail.scanner.scan.hcl2.loads", tracking_loads)
+    second = scan_path(tmp_path, incremental=True)
+
+    assert parsed == ['variable "region" {}\n']
+    assert second.summary.scanned_files == 2
+    assert [(f.rule_id, Path(f.path).name) for f in second.findings] == [("TG001", "a.tf")]
@@ -1,6 +1,13 @@
+import json
+import pickle
+import subprocess
 from pathlib import Path
 
+import hcl2
+
+from terraform_guardrail import schema as schema_module
 from terraform_guardrail.scanner.scan import _schema_findings
+from terraform_guardrail.schema_index import SchemaIndex, build_schema_index
 
 
 def test_schema_validation_flags_unknown_attribute(tmp_path: Path) -> None:
@@ -28,3 +35,138 @@ def test_schema_validation_flags_unknown_attribute(tmp_path: Path) -> None:
 
     findings = _schema_findings(hcl_data, schema, tmp_path / "main.tf")
     assert any(finding.rule_id == "TG005" for finding in findings)
+
+
+def test_provider_schema_cached_by_lock_file(monkeypatch, tmp_path: Path) -> None:
+    calls: list[list[str]] = []
+    payload = {"format_version": "1.0", "provider_schemas": {}}
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(payload), stderr="")
+
+    monkeypatch.setattr(schema_module, "terraform_version", lambda: "1.9.0")
+    monkeypatch.setattr(schema_module.subprocess, "run", fake_run)
+    schema_module.clear_schema_cache(tmp_path / "cache")
+
+    lock = '# pinned\nprovider "registry.terraform.io/hashicorp/aws" {}\n'
+    first, second = tmp_path / "a", tmp_path / "b"
+    for workdir in (first, second):
+        workdir.mkdir()
+        (workdir / ".terraform.lock.hcl").write_text(lock, encoding="utf-8")
+
+    cache_dir = tmp_path / "cache"
+    assert schema_module.load_provider_schema(first, cache_dir=cache_dir) == payload
+    # Same lock file in another workspace: served from memory without a subprocess.
+    assert schema_module.load_provider_schema(second, cache_dir=cache_dir) == payload
+    # A fresh process (empty memo) reads the on-disk entry instead of re-running terraform.
+    schema_module._SCHEMA_MEMO.clear()
+    assert schema_module.load_provider_schema(second, cache_dir=cache_dir) == payload
+    assert len(calls) == 1
+    assert schema_module.schema_cache_usage(cache_dir)[0] == 1
+
+    (second / ".terraform.lock.hcl").write_text(lock + "# upgraded\n", encoding="utf-8")
+    schema_module.load_provider_schema(second, cache_dir=cache_dir)
+    assert len(calls) == 2
+
+
+def test_schema_index_validates_nested_blocks(tmp_path: Path) -> None:
+    schema = {
+        "provider_schemas": {
+            "registry.terraform.io/hashicorp/aws": {
+                "resource_schemas": {
+                    "aws_instance": {
+                        "block": {
+                            "attributes": {"ami": {}, "tags": {}},
+                            "block_types": {
+                                "root_block_device": {
+                                    "block": {"attributes": {"volume_size": {}}}
+                                }
+                            },
+                        }
+                    }
+                }
+            }
+        }
+    }
+    index_path = tmp_path / "schema.idx"
+    index_path.write_bytes(build_schema_index(schema))
+    index = pickle.loads(pickle.dumps(SchemaIndex.open(index_path)))
+    assert index.allowed_keys("aws_instance") == {"ami", "tags", "root_block_device"}
+    assert index.allowed_keys("aws_missing") is None
+
+    hcl_data = {
+        "resource": [
+            {
+                "aws_instance": {
+                    "web": {
+                        "ami": "ami-123",
+                        "count": 2,
+                        "tags": {"anything": "goes"},
+                        "root_block_device": [{"volume_size": 8, "volume_sise": 9}],
+                    }
+                }
+            }
+        ]
+    }
+    findings = _schema_findings(hcl_data, index, tmp_path / "main.tf")
+    assert [finding.message.split(": ")[-1] for finding in findings] == [
+        "aws_instance.root_block_device.volume_sise"
+    ]
+
+
+def test_schema_validation_handles_hcl2_output(tmp_path: Path) -> None:
+    schema = {
+        "provider_schemas": {
+            "registry.terraform.io/hashicorp/aws": {
+                "resource_schemas": {
+                    "aws_s3_bucket": {
+                        "block": {
+                            "attributes": {"bucket": {}},
+                            "block_types": {
+                                "versioning": {"block": {"attributes": {"enabled": {}}}}
+                            },
+                        }
+                    }
+                }
+            }
+        }
+    }
+    hcl_data = hcl2.loads(
+        'resource "aws_s3_bucket" "logs" {\n'
+        '  bucket = "demo"\n'
+        "  bogus  = 1\n"
+        "  versioning {\n"
+        "    enabled = true\n"
+        "  }\n"
+        "  lifecycle {\n"
+        "    prevent_destroy = true\n"
+        "  }\n"
+        "}\n"
+    )
+
+    findings = _schema_findings(hcl_data, schema, tmp_path / "main.tf")
+    assert [finding.message.split(": ")[-1] for finding in findings] == ["aws_s3_bucket.bogus"]
+
+
+def test_schema_index_cached_next_to_schema(monkeypatch, tmp_path: Path) -> None:
+    calls: list[list[str]] = []
+    bucket = {"block": {"attributes": {"bucket": {}}}}
+    payload = {"provider_schemas": {"aws": {"resource_schemas": {"aws_s3_bucket": bucket}}}}
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(payload), stderr="")
+
+    monkeypatch.setattr(schema_module, "terraform_version", lambda: "1.9.0")
+    monkeypatch.setattr(schema_module.subprocess, "run", fake_run)
+    cache_dir = tmp_path / "cache"
+    schema_module.clear_schema_cache(cache_dir)
+    (tmp_path / ".terraform.lock.hcl").write_text("# pinned\n", encoding="utf-8")
+
+    index = schema_module.load_schema_index(tmp_path, cache_dir=cache_dir)
+    assert index is not None and index.allowed_keys("aws_s3_bucket") == {"bucket"}
+    schema_module._INDEX_MEMO.clear()
+    assert schema_module.load_schema_index(tmp_path, cache_dir=cache_dir) is not None
+    assert len(calls) == 1
+    assert schema_module.clear_schema_cache(cache_dir) == 1
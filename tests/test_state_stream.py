@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from terraform_guardrail.scanner.policy_eval import state_input_projection
+from terraform_guardrail.scanner.scan import _scan_state_file
+from terraform_guardrail.scanner.state_stream import (
+    StateProjection,
+    StateStreamError,
+    TerraformStateReader,
+    _JsonReader,
+)
+
+STATE = {
+    "version": 4,
+    "serial": 12345678901234567890,
+    "resources": [
+        {
+            "mode": "managed",
+            "type": "aws_db_instance",
+            "name": "main",
+            "instances": [
+                {"attributes": {"password": "s3cret", "port": 5432}, "private": "YmxvYg=="},
+                {"attributes": {"password": None, "tags": {"a": "é\\\"x"}}},
+            ],
+        },
+        {"mode": "data", "type": "aws_region", "name": "current", "instances": []},
+        {"mode": "managed", "type": "aws_iam_user", "name": "ci", "instances": [{}]},
+    ],
+    "outputs": {"endpoint": {"value": "db.local"}},
+    "check_results": [{"status": "pass"}],
+}
+
+
+def test_state_reader_streams_instances_across_chunk_boundaries(tmp_path: Path) -> None:
+    state_file = tmp_path / "terraform.tfstate"
+    state_file.write_text(json.dumps(STATE, indent=2), encoding="utf-8")
+
+    for chunk_size in (1, 7, 64, 1 << 20):
+        reader = TerraformStateReader(state_file, chunk_size=chunk_size)
+        projection = StateProjection()
+        pairs = []
+        for resource, instance in reader.iter_instances(projection.start):
+            projection.add(instance)
+            pairs.append((resource["name"], instance.get("attributes")))
+        assert pairs == [
+            ("main", {"password": "s3cret", "port": 5432}),
+            ("main", {"password": None, "tags": {"a": "é\\\"x"}}),
+            ("ci", None),
+        ]
+        state = projection.build(reader.top_level)
+        assert state["serial"] == STATE["serial"]
+        assert state["outputs"] == STATE["outputs"]
+        assert state["check_results"] == STATE["check_results"]
+        # Without a projection the state matches a plain json.loads, empty resources included.
+        assert state == STATE
+
+
+def test_state_projection_keeps_only_declared_resource_types(tmp_path: Path) -> None:
+    state_file = tmp_path / "terraform.tfstate"
+    state_file.write_text(json.dumps(STATE), encoding="utf-8")
+    manifest = {"metadata": {"guardrail": {"input": {"resource_types": ["aws_db_*"]}}}}
+    (tmp_path / "bundle").mkdir()
+    (tmp_path / "bundle" / ".manifest").write_text(json.dumps(manifest), encoding="utf-8")
+
+    projection = state_input_projection([], None, [tmp_path / "bundle"])
+    findings, state = _scan_state_file(state_file, projection=projection)
+    assert [item.rule_id for item in findings] == ["TG003"]
+    assert [item["name"] for item in state["resources"]] == ["main"]
+    assert "private" not in state["resources"][0]["instances"][0]
+    assert state["check_results"] == STATE["check_results"]
+
+    manifest["metadata"]["guardrail"]["input"]["state"] = False
+    (tmp_path / "bundle" / ".manifest").write_text(json.dumps(manifest), encoding="utf-8")
+    assert state_input_projection([], None, [tmp_path / "bundle"]).state is False
+
+
+def test_state_keeps_resources_without_instances(tmp_path: Path) -> None:
+    state_file = tmp_path / "terraform.tfstate"
+    resources = [
+        {"type": "aws_region", "name": "current", "instances": []},
+        {"type": "aws_region", "name": "legacy"},
+        {"type": "aws_iam_user", "instances": [{}], "name": "ci"},
+    ]
+    state_file.write_text(json.dumps({"resources": resources}), encoding="utf-8")
+
+    _, state = _scan_state_file(state_file)
+    assert state["resources"] == resources
+
+    manifest = {"metadata": {"guardrail": {"input": {"resource_types": ["aws_region"]}}}}
+    (tmp_path / "bundle").mkdir()
+    (tmp_path / "bundle" / ".manifest").write_text(json.dumps(manifest), encoding="utf-8")
+    projection = state_input_projection([], None, [tmp_path / "bundle"])
+    _, state = _scan_state_file(state_file, projection=projection)
+    assert state["resources"] == resources[:2]
+
+
+def test_scan_state_file_reports_secrets_and_invalid_json(tmp_path: Path) -> None:
+    state_file = tmp_path / "terraform.tfstate"
+    state_file.write_text(json.dumps(STATE), encoding="utf-8")
+    findings, state = _scan_state_file(state_file, keep_state=False)
+    assert [(item.rule_id, item.detail["resource"]) for item in findings] == [("TG003", "main")]
+    assert state is None
+
+    state_file.write_text('{"resources": [{"name": "x", "instances": [', encoding="utf-8")
+    findings, state = _scan_state_file(state_file)
+    assert findings[0].message.startswith("Invalid state JSON")
+    assert state is None
+
+
+def test_state_reader_stops_at_invalid_json() -> None:
+    class CountingIO(io.StringIO):
+        consumed = 0
+
+        def read(self, size: int | None = -1) -> str:
+            chunk = super().read(size)
+            self.consumed += len(chunk)
+            return chunk
+
+    handle = CountingIO('{"a": tru, "b": "' + " " * 4096 + '"}')
+    with pytest.raises(StateStreamError, match="Expecting value"):
+        _JsonReader(handle, chunk_size=16).value()
+    assert handle.consumed < 256
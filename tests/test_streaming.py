@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from terraform_guardrail.scanner.models import ScanSummary
+from terraform_guardrail.scanner.scan import iter_scan, scan_path
+from terraform_guardrail.scanner.streaming import iter_ndjson, iter_sarif
+
+
+def _write_tree(root: Path) -> None:
+    (root / "main.tf").write_text(
+        'variable "db_password" {\n  type      = string\n  sensitive = true\n}\n',
+        encoding="utf-8",
+    )
+    (root / "secrets.tfvars").write_text('api_key = "abc"\n', encoding="utf-8")
+
+
+def test_iter_scan_matches_scan_path(tmp_path: Path) -> None:
+    _write_tree(tmp_path)
+    summary = ScanSummary()
+    streamed = list(iter_scan(tmp_path, summary=summary))
+    report = scan_path(tmp_path)
+
+    assert streamed == report.findings
+    assert summary == report.summary
+    assert summary.scanned_files == 2
+
+
+def test_iter_scan_yields_before_later_files_are_read(tmp_path: Path) -> None:
+    _write_tree(tmp_path)
+    findings = iter_scan(tmp_path)
+    first = next(findings)
+    assert first.path == str(tmp_path / "main.tf")
+    # The second file is only parsed once the consumer asks for more.
+    (tmp_path / "secrets.tfvars").write_text('token = "abc"\n', encoding="utf-8")
+    rest = list(findings)
+    assert any("token" in finding.message for finding in rest)
+
+
+def test_ndjson_and_sarif_writers(tmp_path: Path) -> None:
+    _write_tree(tmp_path)
+    summary = ScanSummary()
+    lines = list(iter_ndjson(iter_scan(tmp_path, summary=summary), summary, str(tmp_path)))
+    records = [json.loads(line) for line in lines]
+    assert records[-1]["summary"]["findings"] == len(records) - 1 == summary.findings
+
+    sarif = json.loads("".join(iter_sarif(iter_scan(tmp_path))))
+    run = sarif["runs"][0]
+    assert sarif["version"] == "2.1.0"
+    assert run["tool"]["driver"]["name"] == "Terraform Guardrail MCP"
+    assert {rule["id"] for rule in run["tool"]["driver"]["rules"]} == {"TG001", "TG002"}
+    levels = {result["ruleId"]: result["level"] for result in run["results"]}
+    assert levels == {"TG001": "warning", "TG002": "error"}
+    location = run["results"][0]["locations"][0]["physicalLocation"]["artifactLocation"]
+    assert location["uri"] == str(tmp_path / "main.tf")
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from terraform_guardrail.scanner.walk import iter_scan_files
+
+
+def _touch(root: Path, *names: str) -> None:
+    for name in names:
+        target = root / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("", encoding="utf-8")
+
+
+def _relative(root: Path, paths: list[Path]) -> list[str]:
+    return [path.relative_to(root).as_posix() for path in paths]
+
+
+def test_walk_prunes_default_excludes(tmp_path: Path) -> None:
+    _touch(
+        tmp_path,
+        "main.tf",
+        "README.md",
+        ".git/config.tf",
+        ".terraform/modules/vpc/main.tf",
+        "node_modules/pkg/main.tf",
+        "modules/vpc/main.tf",
+        "env/prod.tfvars",
+    )
+    files = iter_scan_files(tmp_path)
+    assert _relative(tmp_path, files) == ["env/prod.tfvars", "main.tf", "modules/vpc/main.tf"]
+    assert files == sorted(files)
+
+
+def test_walk_honours_guardrailignore(tmp_path: Path) -> None:
+    _touch(
+        tmp_path,
+        "main.tf",
+        "examples/demo.tf",
+        "examples/keep.tf",
+        "modules/a/main.tf",
+        "modules/a/generated.tf",
+        "vendor/keep/main.tf",
+    )
+    (tmp_path / ".guardrailignore").write_text(
+        "# comments are skipped\nexamples/\n!vendor/\n", encoding="utf-8"
+    )
+    (tmp_path / "modules" / ".guardrailignore").write_text("generated.tf\n", encoding="utf-8")
+
+    files = iter_scan_files(tmp_path)
+    assert _relative(tmp_path, files) == ["main.tf", "modules/a/main.tf", "vendor/keep/main.tf"]
+
+
+def test_walk_include_and_exclude_globs(tmp_path: Path) -> None:
+    _touch(tmp_path, "main.tf", "modules/a/main.tf", "modules/b/main.tf", "modules/b/x.tfvars")
+
+    included = iter_scan_files(tmp_path, include=["modules/"], exclude=["**/b/*.tfvars"])
+    assert _relative(tmp_path, included) == ["modules/a/main.tf", "modules/b/main.tf"]
+
+    excluded = iter_scan_files(tmp_path, exclude=["modules/b"])
+    assert _relative(tmp_path, excluded) == ["main.tf", "modules/a/main.tf"]